@@ -0,0 +1,97 @@
+-- Generated by fir_hdl.py - edit the design script, not this file.
+-- Symmetry-folded FIR: 51 taps, 26 multipliers, 16-bit coefficients,
+-- 28-bit accumulator, data_out = sum(26 DOWNTO 15) + 2048
+LIBRARY ieee;
+USE ieee.std_logic_1164.ALL;
+USE ieee.numeric_std.ALL;
+
+ENTITY fir_filter_folded IS
+  PORT (
+    clk : IN STD_LOGIC;
+    reset_n : IN STD_LOGIC;
+    sample_enable : IN STD_LOGIC;
+    data_in : IN STD_LOGIC_VECTOR(11 DOWNTO 0);
+    data_out : OUT STD_LOGIC_VECTOR(11 DOWNTO 0)
+  );
+END ENTITY fir_filter_folded;
+
+ARCHITECTURE folded OF fir_filter_folded IS
+  CONSTANT TAPS_COUNT : INTEGER := 51;
+  CONSTANT DATA_WIDTH : INTEGER := 12;
+  CONSTANT COEFF_WIDTH : INTEGER := 16;
+  CONSTANT ACC_WIDTH : INTEGER := 28;
+  CONSTANT HALF_COUNT : INTEGER := 25;  -- Pre-added tap pairs
+
+  TYPE coeff_array_t IS ARRAY (0 TO 25) OF SIGNED(COEFF_WIDTH - 1 DOWNTO 0);
+  CONSTANT coeffs : coeff_array_t := (
+    0 => x"0013", -- 19
+    1 => x"001B", -- 27
+    2 => x"0026", -- 38
+    3 => x"0033", -- 51
+    4 => x"0044", -- 68
+    5 => x"0056", -- 86
+    6 => x"0067", -- 103
+    7 => x"0073", -- 115
+    8 => x"0076", -- 118
+    9 => x"0069", -- 105
+    10 => x"0047", -- 71
+    11 => x"000B", -- 11
+    12 => x"FFB1", -- -79
+    13 => x"FF36", -- -202
+    14 => x"FE99", -- -359
+    15 => x"FDDE", -- -546
+    16 => x"FD07", -- -761
+    17 => x"FC1C", -- -996
+    18 => x"FB26", -- -1242
+    19 => x"FA2F", -- -1489
+    20 => x"F943", -- -1725
+    21 => x"F86E", -- -1938
+    22 => x"F7BB", -- -2117
+    23 => x"F734", -- -2252
+    24 => x"F6DF", -- -2337
+    25 => x"76D1" -- 30417
+  );
+
+  TYPE tap_array_t IS ARRAY (0 TO TAPS_COUNT - 1) OF SIGNED(DATA_WIDTH - 1 DOWNTO 0);
+  SIGNAL taps : tap_array_t := (OTHERS => (OTHERS => '0'));
+
+  SIGNAL sum : SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+
+BEGIN
+  -- Shifter
+  shift_reg_proc : PROCESS (clk, reset_n)
+  BEGIN
+    IF reset_n = '0' THEN
+      taps <= (OTHERS => (OTHERS => '0'));
+    ELSIF rising_edge(clk) THEN
+      IF sample_enable = '1' THEN
+        taps(1 TO TAPS_COUNT - 1) <= taps(0 TO TAPS_COUNT - 2);
+        -- data_in - 2048
+        taps(0) <= SIGNED((NOT data_in(DATA_WIDTH - 1)) & data_in(DATA_WIDTH - 2 DOWNTO 0));
+      END IF;
+    END IF;
+  END PROCESS shift_reg_proc;
+
+  -- Folded MAC: taps(i) + taps(TAPS_COUNT-1-i) share one multiplier
+  mac_proc : PROCESS (taps)
+    VARIABLE pre : SIGNED(DATA_WIDTH DOWNTO 0);
+    VARIABLE product : SIGNED(DATA_WIDTH + COEFF_WIDTH DOWNTO 0);
+    VARIABLE acc : SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+  BEGIN
+    acc := (OTHERS => '0');
+    FOR i IN 0 TO HALF_COUNT - 1 LOOP
+      pre := resize(taps(i), DATA_WIDTH + 1) + resize(taps(TAPS_COUNT - 1 - i), DATA_WIDTH + 1);
+      product := pre * coeffs(i);
+      acc := acc + product(ACC_WIDTH - 1 DOWNTO 0);
+    END LOOP;
+    -- Centre tap (odd length) has no partner
+    pre := resize(taps(HALF_COUNT), DATA_WIDTH + 1);
+    product := pre * coeffs(HALF_COUNT);
+    acc := acc + product(ACC_WIDTH - 1 DOWNTO 0);
+    sum <= acc;
+  END PROCESS mac_proc;
+
+  -- Rescale output: sum(26 DOWNTO 15) + 2048
+  data_out <= (NOT sum(26)) & STD_LOGIC_VECTOR(sum(25 DOWNTO 15));
+
+END ARCHITECTURE folded;
@@ -50,7 +50,34 @@ ARCHITECTURE rtl OF FP_VHDL IS
   CONSTANT CLKS_PER_BIT : INTEGER := 17; -- 3Mbaud pada 50MHz clock
   CONSTANT SAMPLE_RATE_DIV : INTEGER := 2000; -- 50MHz / 2000 = 25kHz sample rate
 
+  -- FALSE: [AE][BC][CH0][FIR] (fpga frame in protocol.py)
+  -- TRUE : [AE][BD][MASK][CHx for every set mask bit, lowest first][FIR]
+  -- The unused low nibbles of the first two words carry frame_seq, so the
+  -- host can count lost frames (only the low half if FIR is the only word)
+  -- 8 channels + FIR take 21 bytes > one sample period at 3Mbaud, the frame
+  -- then goes out every second sample (12.5kHz)
+  CONSTANT MULTI_CHANNEL : BOOLEAN := FALSE;
+  CONSTANT CHANNEL_MASK : STD_LOGIC_VECTOR(7 DOWNTO 0) := x"FF";
+
+  -- Packed blocks instead of one frame per sample (packed frame in protocol.py):
+  -- [AE][BE][MASK][SEQ][OVR][BLOCK_SAMPLES samples, 2 words in 3 bytes][CRC-8]
+  -- MASK is CHANNEL_MASK (or 01 = CH0 only), every sample is its channel words
+  -- followed by the FIR word. CRC-8 (poly 07) covers MASK up to the last data byte.
+  -- OVR counts (modulo 256) the samples overwritten before they could be sent;
+  -- the host adds its steps to the lost samples.
+  -- CH0 + FIR: 3.4 instead of 6 bytes per sample
+  -- Limit at 25kHz and 3Mbaud: 6 ADC channels + FIR (10.9 bytes, 36us of the
+  -- 40us sample period). A wider MASK (x"FF": 13.9 bytes, 46us) cannot keep up
+  -- and stops elaboration, see the assertion after BEGIN.
+  CONSTANT PACKED_BLOCKS : BOOLEAN := FALSE;
+  CONSTANT BLOCK_SAMPLES : INTEGER := 16; -- Must be even
+
   SIGNAL ch0, ch1, ch2, ch3, ch4, ch5, ch6, ch7 : STD_LOGIC_VECTOR(11 DOWNTO 0);
+
+  TYPE t_channel_array IS ARRAY (0 TO 7) OF STD_LOGIC_VECTOR(11 DOWNTO 0);
+  TYPE t_word_array IS ARRAY (0 TO 8) OF STD_LOGIC_VECTOR(11 DOWNTO 0);
+  SIGNAL adc_channels : t_channel_array;
+
   SIGNAL reset_pos : STD_LOGIC;
 
   SIGNAL uart_tx_data : STD_LOGIC_VECTOR(7 DOWNTO 0);
@@ -66,21 +93,87 @@ ARCHITECTURE rtl OF FP_VHDL IS
   TYPE t_fsm_state IS (
     IDLE,
     SEND_HEADER,
-    SEND_D0_HIGH,
-    SEND_D0_LOW,
-    SEND_D1_HIGH,
-    SEND_D1_LOW,
+    SEND_MASK,
+    SEND_HIGH,
+    SEND_LOW,
+    PACK_HEADER,
+    PACK_MASK,
+    PACK_SEQ,
+    PACK_OVR,
+    PACK_LOAD,
+    PACK_WAIT,
     SEND_EOL
   );
   SIGNAL state : t_fsm_state := IDLE;
 
-  SIGNAL adc_data0_reg, adc_data1_reg : STD_LOGIC_VECTOR(11 DOWNTO 0);
+  -- Words of the next frame (selected channels + FIR), latched per sample
+  SIGNAL frame_words, tx_words : t_word_array;
+  SIGNAL frame_last, tx_last : INTEGER RANGE 0 TO 8;
+  SIGNAL word_index : INTEGER RANGE 0 TO 8;
+  SIGNAL frame_seq : UNSIGNED(7 DOWNTO 0);
+  SIGNAL seq_nibble : STD_LOGIC_VECTOR(3 DOWNTO 0);
+
+  -- Packed block state: one sample waits here while the previous one is sent
+  SIGNAL pending_words : t_word_array;
+  SIGNAL pending_last : INTEGER RANGE 0 TO 8;
+  SIGNAL sample_pending : STD_LOGIC;
+  SIGNAL tx_mask : STD_LOGIC_VECTOR(7 DOWNTO 0);
+  SIGNAL block_seq : UNSIGNED(7 DOWNTO 0);
+  SIGNAL overrun_count : UNSIGNED(7 DOWNTO 0);
+  SIGNAL block_sample : INTEGER RANGE 0 TO BLOCK_SAMPLES - 1;
+  SIGNAL pack_phase : INTEGER RANGE 0 TO 2;
+  SIGNAL pack_carry : STD_LOGIC_VECTOR(7 DOWNTO 0);
+  SIGNAL words_done, sample_sent : STD_LOGIC;
+  SIGNAL crc : STD_LOGIC_VECTOR(7 DOWNTO 0);
+
+  -- CRC-8, polynomial x^8 + x^2 + x + 1, one byte at a time
+  FUNCTION crc8(crc_in : STD_LOGIC_VECTOR(7 DOWNTO 0); data : STD_LOGIC_VECTOR(7 DOWNTO 0))
+    RETURN STD_LOGIC_VECTOR IS
+    VARIABLE c : STD_LOGIC_VECTOR(7 DOWNTO 0);
+  BEGIN
+    c := crc_in XOR data;
+    FOR i IN 0 TO 7 LOOP
+      IF c(7) = '1' THEN
+        c := (c(6 DOWNTO 0) & '0') XOR x"07";
+      ELSE
+        c := c(6 DOWNTO 0) & '0';
+      END IF;
+    END LOOP;
+    RETURN c;
+  END FUNCTION crc8;
+
+  -- Words per packed sample: the masked channels (CH0 without MULTI_CHANNEL) + FIR
+  FUNCTION packed_words(multi : BOOLEAN; mask : STD_LOGIC_VECTOR(7 DOWNTO 0)) RETURN INTEGER IS
+    VARIABLE n : INTEGER := 1;
+  BEGIN
+    IF NOT multi THEN
+      RETURN 2;
+    END IF;
+    FOR i IN mask'RANGE LOOP
+      IF mask(i) = '1' THEN
+        n := n + 1;
+      END IF;
+    END LOOP;
+    RETURN n;
+  END FUNCTION packed_words;
+
+  -- One byte on the wire: start + 8 data + stop bits and the handshake cycles
+  CONSTANT BYTE_CLKS : INTEGER := 10 * CLKS_PER_BIT + 3;
+  -- Header, MASK, SEQ, OVR and CRC plus the packed samples of one block
+  CONSTANT PACKED_BLOCK_BYTES : INTEGER :=
+    6 + 3 * BLOCK_SAMPLES * packed_words(MULTI_CHANNEL, CHANNEL_MASK) / 2;
 
   SIGNAL tx_done_prev : STD_LOGIC;
 
 BEGIN
   reset_pos <= NOT reset_n;
 
+  -- A block must leave within BLOCK_SAMPLES sample periods, otherwise samples
+  -- are overwritten in pending_words on every block
+  ASSERT NOT PACKED_BLOCKS OR PACKED_BLOCK_BYTES * BYTE_CLKS <= BLOCK_SAMPLES * SAMPLE_RATE_DIV
+    REPORT "PACKED_BLOCKS: too many channels in CHANNEL_MASK for the UART at this sample rate"
+    SEVERITY FAILURE;
+
   adc_inst : adc_ip
   PORT MAP(
     CLOCK => clk,
@@ -127,15 +220,62 @@ BEGIN
       END IF;
     END PROCESS sample_trigger_proc;
 
+    adc_channels <= (ch0, ch1, ch2, ch3, ch4, ch5, ch6, ch7);
+
+    -- Frame payload: the masked channels packed to the front, FIR output last.
+    -- CHANNEL_MASK is constant, so this is only wiring.
+    frame_words_proc : PROCESS (adc_channels, filtered_data_out)
+      VARIABLE words : t_word_array;
+      VARIABLE n : INTEGER RANGE 0 TO 8;
+    BEGIN
+      words := (OTHERS => (OTHERS => '0'));
+      n := 0;
+      IF MULTI_CHANNEL THEN
+        FOR i IN 0 TO 7 LOOP
+          IF CHANNEL_MASK(i) = '1' THEN
+            words(n) := adc_channels(i);
+            n := n + 1;
+          END IF;
+        END LOOP;
+      ELSE
+        words(0) := ch0;
+        n := 1;
+      END IF;
+      words(n) := filtered_data_out;
+      frame_words <= words;
+      frame_last <= n;
+    END PROCESS frame_words_proc;
+
+    tx_mask <= CHANNEL_MASK WHEN MULTI_CHANNEL ELSE x"01";
+
+    -- Frame counter in the low nibbles: upper half after word 0, lower half after word 1
+    seq_nibble <= STD_LOGIC_VECTOR(frame_seq(7 DOWNTO 4)) WHEN word_index = 0 AND tx_last > 0 ELSE
+                  STD_LOGIC_VECTOR(frame_seq(3 DOWNTO 0)) WHEN word_index <= 1 ELSE
+                  "0000";
+
     fsm_proc : PROCESS (clk)
+      VARIABLE tx_byte : STD_LOGIC_VECTOR(7 DOWNTO 0);
     BEGIN
       IF rising_edge(clk) THEN
         IF reset_n = '0' THEN
           state <= IDLE;
           uart_tx_dv <= '0';
           uart_tx_data <= x"00";
-          adc_data0_reg <= (OTHERS => '0');
-          adc_data1_reg <= (OTHERS => '0');
+          tx_words <= (OTHERS => (OTHERS => '0'));
+          tx_last <= 0;
+          word_index <= 0;
+          frame_seq <= (OTHERS => '0');
+          pending_words <= (OTHERS => (OTHERS => '0'));
+          pending_last <= 0;
+          sample_pending <= '0';
+          block_seq <= (OTHERS => '0');
+          overrun_count <= (OTHERS => '0');
+          block_sample <= 0;
+          pack_phase <= 0;
+          pack_carry <= (OTHERS => '0');
+          words_done <= '0';
+          sample_sent <= '0';
+          crc <= (OTHERS => '0');
           tx_done_prev <= '0';
         ELSE
           -- Register the uart_tx_done signal to detect its rising edge
@@ -144,10 +284,26 @@ BEGIN
           CASE state IS
             WHEN IDLE =>
               -- Wiat for new sample
-              IF new_sample_ready = '1' AND uart_tx_active = '0' THEN
+              IF PACKED_BLOCKS THEN
+                IF sample_pending = '1' AND uart_tx_active = '0' THEN
+                  tx_words <= pending_words;
+                  tx_last <= pending_last;
+                  word_index <= 0;
+                  words_done <= '0';
+                  sample_pending <= '0';
+                  IF block_sample = 0 THEN
+                    uart_tx_data <= x"AE";
+                    uart_tx_dv <= '1';
+                    state <= PACK_HEADER;
+                  ELSE
+                    state <= PACK_LOAD;
+                  END IF;
+                END IF;
+              ELSIF new_sample_ready = '1' AND uart_tx_active = '0' THEN
                 -- Latch ADC & FIR data
-                adc_data0_reg <= ch0;
-                adc_data1_reg <= filtered_data_out;
+                tx_words <= frame_words;
+                tx_last <= frame_last;
+                word_index <= 0;
 
                 uart_tx_data <= x"AE";
                 uart_tx_dv <= '1';
@@ -159,49 +315,152 @@ BEGIN
                 uart_tx_dv <= '0';
               END IF;
               IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
-                uart_tx_data <= x"BC";
                 uart_tx_dv <= '1';
-                state <= SEND_D0_HIGH;
+                IF MULTI_CHANNEL THEN
+                  uart_tx_data <= x"BD";
+                  state <= SEND_MASK;
+                ELSE
+                  uart_tx_data <= x"BC";
+                  state <= SEND_HIGH;
+                END IF;
+              END IF;
+
+            WHEN SEND_MASK =>
+              IF uart_tx_active = '1' THEN
+                uart_tx_dv <= '0';
+              END IF;
+              IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
+                uart_tx_data <= CHANNEL_MASK;
+                uart_tx_dv <= '1';
+                state <= SEND_HIGH;
               END IF;
 
-            WHEN SEND_D0_HIGH =>
+            WHEN SEND_HIGH =>
               IF uart_tx_active = '1' THEN
                 uart_tx_dv <= '0';
               END IF;
               IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
-                uart_tx_data <= adc_data0_reg(11 DOWNTO 4);
+                uart_tx_data <= tx_words(word_index)(11 DOWNTO 4);
                 uart_tx_dv <= '1';
-                state <= SEND_D0_LOW;
+                state <= SEND_LOW;
               END IF;
 
-            WHEN SEND_D0_LOW =>
+            WHEN SEND_LOW =>
               IF uart_tx_active = '1' THEN
                 uart_tx_dv <= '0';
               END IF;
               IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
-                uart_tx_data <= adc_data0_reg(3 DOWNTO 0) & "0000";
+                uart_tx_data <= tx_words(word_index)(3 DOWNTO 0) & seq_nibble;
                 uart_tx_dv <= '1';
-                state <= SEND_D1_HIGH;
+                IF word_index = tx_last THEN
+                  frame_seq <= frame_seq + 1;
+                  state <= SEND_EOL;
+                ELSE
+                  word_index <= word_index + 1;
+                  state <= SEND_HIGH;
+                END IF;
               END IF;
 
-            WHEN SEND_D1_HIGH =>
+            WHEN PACK_HEADER =>
               IF uart_tx_active = '1' THEN
                 uart_tx_dv <= '0';
               END IF;
               IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
-                uart_tx_data <= adc_data1_reg(11 DOWNTO 4);
+                uart_tx_data <= x"BE";
                 uart_tx_dv <= '1';
-                state <= SEND_D1_LOW;
+                state <= PACK_MASK;
               END IF;
 
-            WHEN SEND_D1_LOW =>
+            WHEN PACK_MASK =>
               IF uart_tx_active = '1' THEN
                 uart_tx_dv <= '0';
               END IF;
               IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
-                uart_tx_data <= adc_data1_reg(3 DOWNTO 0) & "0000";
+                uart_tx_data <= tx_mask;
                 uart_tx_dv <= '1';
-                state <= SEND_EOL;
+                crc <= crc8(x"00", tx_mask);
+                state <= PACK_SEQ;
+              END IF;
+
+            WHEN PACK_SEQ =>
+              IF uart_tx_active = '1' THEN
+                uart_tx_dv <= '0';
+              END IF;
+              IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
+                uart_tx_data <= STD_LOGIC_VECTOR(block_seq);
+                uart_tx_dv <= '1';
+                crc <= crc8(crc, STD_LOGIC_VECTOR(block_seq));
+                state <= PACK_OVR;
+              END IF;
+
+            WHEN PACK_OVR =>
+              IF uart_tx_active = '1' THEN
+                uart_tx_dv <= '0';
+              END IF;
+              IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
+                uart_tx_data <= STD_LOGIC_VECTOR(overrun_count);
+                uart_tx_dv <= '1';
+                crc <= crc8(crc, STD_LOGIC_VECTOR(overrun_count));
+                pack_phase <= 0;
+                sample_sent <= '0';
+                state <= PACK_WAIT;
+              END IF;
+
+            WHEN PACK_LOAD =>
+              -- Two words in three bytes: [a(11:4)] [a(3:0) b(11:8)] [b(7:0)]
+              CASE pack_phase IS
+                WHEN 0 =>
+                  tx_byte := tx_words(word_index)(11 DOWNTO 4);
+                  pack_carry <= x"0" & tx_words(word_index)(3 DOWNTO 0);
+                WHEN 1 =>
+                  tx_byte := pack_carry(3 DOWNTO 0) & tx_words(word_index)(11 DOWNTO 8);
+                  pack_carry <= tx_words(word_index)(7 DOWNTO 0);
+                WHEN OTHERS =>
+                  tx_byte := pack_carry;
+              END CASE;
+              uart_tx_data <= tx_byte;
+              uart_tx_dv <= '1';
+              crc <= crc8(crc, tx_byte);
+
+              -- A sample is sent once its words are used up and no byte of
+              -- it is left in pack_carry (phase 1 carries over to the next sample)
+              IF pack_phase = 2 THEN
+                pack_phase <= 0;
+                sample_sent <= words_done;
+              ELSE
+                pack_phase <= pack_phase + 1;
+                IF word_index = tx_last THEN
+                  words_done <= '1';
+                  IF pack_phase = 0 THEN
+                    sample_sent <= '1';
+                  ELSE
+                    sample_sent <= '0';
+                  END IF;
+                ELSE
+                  word_index <= word_index + 1;
+                  sample_sent <= '0';
+                END IF;
+              END IF;
+              state <= PACK_WAIT;
+
+            WHEN PACK_WAIT =>
+              IF uart_tx_active = '1' THEN
+                uart_tx_dv <= '0';
+              END IF;
+              IF uart_tx_done = '1' AND tx_done_prev = '0' THEN
+                IF sample_sent = '0' THEN
+                  state <= PACK_LOAD;
+                ELSIF block_sample = BLOCK_SAMPLES - 1 THEN
+                  -- Block complete: checksum, then the next block starts with a header
+                  uart_tx_data <= crc;
+                  uart_tx_dv <= '1';
+                  block_sample <= 0;
+                  block_seq <= block_seq + 1;
+                  state <= SEND_EOL;
+                ELSE
+                  block_sample <= block_sample + 1;
+                  state <= IDLE;
+                END IF;
               END IF;
 
             WHEN SEND_EOL =>
@@ -215,6 +474,18 @@ BEGIN
             WHEN OTHERS =>
               state <= IDLE;
           END CASE;
+
+          -- Packed mode latches every sample; one may wait while a block header
+          -- or the previous sample is still on the wire. A waiting sample that
+          -- IDLE does not take in this cycle is overwritten and counted in OVR.
+          IF PACKED_BLOCKS AND new_sample_ready = '1' THEN
+            IF sample_pending = '1' AND NOT (state = IDLE AND uart_tx_active = '0') THEN
+              overrun_count <= overrun_count + 1;
+            END IF;
+            pending_words <= frame_words;
+            pending_last <= frame_last;
+            sample_pending <= '1';
+          END IF;
         END IF;
       END IF;
     END PROCESS fsm_proc;
@@ -0,0 +1,381 @@
+import io
+import os
+import selectors
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import serial
+
+from frame_decoder import FrameDecoder, FrameReader
+
+# --- Drop policies of a BlockQueue once it holds maxsize blocks ---
+DROP_OLDEST = "drop_oldest"  # Live views: discard the oldest block, keep the freshest data
+DROP_NEWEST = "drop_newest"  # Discard the incoming block, keep what is queued
+BLOCK = "block"  # Never drop: stop reading the board until the consumer catches up
+
+
+class BlockQueue:
+    """
+    Bounded queue of decoded (channels, n) blocks for one consumer.
+
+    The acquisition loop put()s every block of its board; the consumer takes
+    them with get() (one at a time, e.g. a recorder thread) or drain() (all
+    at once, e.g. a GUI frame). What happens when the queue is full is the
+    policy's choice; dropped blocks and samples are counted. A full BLOCK
+    queue makes the loop pause its board instead, so the bytes wait in the
+    serial driver and sequence counters show any loss there.
+    """
+
+    def __init__(self, channels, maxsize=256, policy=DROP_OLDEST, on_space=None):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown drop policy '{policy}'")
+        self.channels = channels
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_space = on_space  # Called when a BLOCK queue frees a slot
+
+        self.blocks = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.dropped_blocks = 0
+        self.dropped_samples = 0
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def full(self):
+        return len(self.blocks) >= self.maxsize
+
+    def put(self, block):
+        with self.condition:
+            if self.full():
+                if self.policy == DROP_NEWEST:
+                    self.dropped_blocks += 1
+                    self.dropped_samples += block.shape[1]
+                    return
+                if self.policy == DROP_OLDEST:
+                    self.dropped_blocks += 1
+                    self.dropped_samples += self.blocks.popleft().shape[1]
+                # BLOCK keeps it: the loop pauses the board before the next read
+            self.blocks.append(block)
+            self.condition.notify()
+
+    def _taken(self, count):
+        if count and self.policy == BLOCK and self.on_space is not None:
+            self.on_space()
+
+    def get(self, timeout=None):
+        """Next block, or None on timeout or once the queue is closed and empty"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.blocks or self.closed, timeout):
+                return None
+            block = self.blocks.popleft() if self.blocks else None
+        self._taken(block is not None)
+        return block
+
+    def drain(self):
+        """Everything queued as one (channels, n) array, without waiting"""
+        with self.condition:
+            blocks = list(self.blocks)
+            self.blocks.clear()
+        self._taken(len(blocks))
+        if not blocks:
+            return np.empty((self.channels, 0), dtype=np.int16)
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks, axis=1)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class Board:
+    """One byte source, its frame reader and the queues of its consumers"""
+
+    def __init__(self, name, ser, decoder, wake=None, report_interval=1.0):
+        self.name = name
+        self.ser = ser
+        self.reader = FrameReader(ser, decoder, report_interval=report_interval, name=name)
+        self.queues = []
+        self.wake = wake
+        self.paused = False
+        self.empty_reads = 0  # Readable descriptor without data: the device went away
+
+        # Real serial ports can be waited on; replay/synthetic sources are polled
+        try:
+            self.fd = ser.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            self.fd = None
+
+    @property
+    def spec(self):
+        return self.reader.decoder.spec
+
+    def subscribe(self, maxsize=256, policy=DROP_OLDEST):
+        """New consumer queue that receives every block decoded from now on"""
+        queue = BlockQueue(self.spec.channels, maxsize, policy, on_space=self.wake)
+        self.queues.append(queue)
+        return queue
+
+    def blocked(self):
+        return any(queue.policy == BLOCK and queue.full() for queue in self.queues)
+
+    def read(self):
+        """Decode whatever has arrived and hand it to every consumer"""
+        waiting = self.ser.in_waiting
+        self.empty_reads = 0 if waiting else self.empty_reads + 1
+        block = self.reader.poll()
+        if block.shape[1]:
+            for queue in self.queues:
+                queue.put(block)
+        return block
+
+
+class Acquisition:
+    """
+    Acquisition loop for any number of boards on one thread.
+
+    The loop sleeps in selector.select() on the serial file descriptors of
+    all boards, so an idle link costs no CPU. Once data arrives, every ready
+    board is read and its decoded block fanned out to its consumer queues.
+    A cycle lasts at least poll_interval, so a busy 3 Mbaud link is read in
+    chunks of a few kilobytes instead of a few bytes per wake-up. Sources
+    without a descriptor (replay:, synthetic:) are read every cycle. A
+    wake-up pipe lets stop() and draining BLOCK consumers interrupt the wait.
+    """
+
+    def __init__(self, poll_interval=0.01, report_interval=1.0):
+        self.poll_interval = poll_interval
+        self.report_interval = report_interval
+        self.boards = []
+        self.removed = []  # Boards that failed, kept for summary()
+        self.selector = selectors.DefaultSelector()
+        self.thread = None
+        self.running = False
+
+        self.wake_read, self.wake_write = os.pipe()
+        self.wake_lock = threading.Lock()  # close() must not close the pipe under a running wake()
+        os.set_blocking(self.wake_read, False)
+        os.set_blocking(self.wake_write, False)
+        self.selector.register(self.wake_read, selectors.EVENT_READ, None)
+
+    def add_board(self, ser, decoder=None, name=None):
+        """Attach an open byte source; returns the Board to subscribe() to"""
+        name = name or f"board{len(self.boards)}"
+        board = Board(name, ser, decoder or FrameDecoder(), self.wake, self.report_interval)
+        self.boards.append(board)
+        if board.fd is not None:
+            self.selector.register(board.fd, selectors.EVENT_READ, board)
+        return board
+
+    def wake(self):
+        # Consumers of BLOCK queues may still drain after close(): nothing left to wake then
+        with self.wake_lock:
+            if self.wake_write is None:
+                return
+            try:
+                os.write(self.wake_write, b"\0")
+            except BlockingIOError:
+                pass  # A wake-up is already pending
+
+    def remove_board(self, board):
+        """Stop reading a board, close its source and end the stream for its consumers"""
+        if board.fd is not None and not board.paused:
+            self.selector.unregister(board.fd)
+        self.boards.remove(board)
+        self.removed.append(board)
+        for queue in board.queues:
+            queue.close()
+        try:
+            board.ser.close()
+        except (serial.SerialException, OSError) as e:
+            print(f"[{board.name}] error closing the source: {e}")
+
+    def pause(self, board):
+        """Stop reading a board whose BLOCK consumer is full"""
+        board.paused = True
+        if board.fd is not None:
+            self.selector.unregister(board.fd)
+
+    def resume(self):
+        for board in self.boards:
+            if board.paused and not board.blocked():
+                board.paused = False
+                if board.fd is not None:
+                    self.selector.register(board.fd, selectors.EVENT_READ, board)
+
+    def service(self, board):
+        # Any failure (port gone, decoder error) ends this board only; the
+        # loop and the other boards keep running
+        try:
+            board.read()
+        except Exception as e:
+            print(f"[{board.name}] read failed, removing board: {type(e).__name__}: {e}")
+            self.remove_board(board)
+            return
+        if board.fd is not None and board.empty_reads >= 3:
+            print(f"[{board.name}] readable but no data - device disconnected, removing board")
+            self.remove_board(board)
+        elif board.blocked():
+            self.pause(board)
+
+    def run(self):
+        while self.running:
+            start = time.monotonic()
+            polled = [board for board in self.boards if board.fd is None and not board.paused]
+            timeout = self.poll_interval if polled else None
+            ready = list(polled)
+            for key, _ in self.selector.select(timeout):
+                if key.data is None:
+                    try:
+                        while os.read(self.wake_read, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif not key.data.paused:
+                    ready.append(key.data)
+
+            for board in ready:
+                self.service(board)
+            self.resume()
+
+            # Let data accumulate so the next read is a decent chunk
+            remaining = start + self.poll_interval - time.monotonic()
+            if ready and remaining > 0 and self.running:
+                time.sleep(remaining)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="acquisition", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the loop and close every consumer queue (sources stay open)"""
+        self.running = False
+        self.wake()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        for board in self.boards:
+            for queue in board.queues:
+                queue.close()
+
+    def close(self):
+        self.stop()
+        for board in self.boards:
+            board.ser.close()
+        self.selector.close()
+        with self.wake_lock:
+            os.close(self.wake_read)
+            os.close(self.wake_write)
+            self.wake_write = None
+
+    def summary(self):
+        """One line per board: decoder counters and what each consumer dropped"""
+        lines = []
+        for board in self.boards + self.removed:
+            counters = board.reader.decoder.counters()
+            drops = ", ".join(f"{queue.policy} queue dropped {queue.dropped_samples} samples"
+                              for queue in board.queues)
+            lines.append(f"[{board.name}] {counters['samples_decoded']} samples, "
+                         f"{counters['frames_lost']} frames lost, {counters['checksum_errors']} checksum errors, "
+                         f"{counters['samples_overrun']} samples overrun"
+                         + (" (removed after an error)" if board in self.removed else "")
+                         + (f"; {drops}" if drops else ""))
+        return lines
+
+
+class ConsumerThread(threading.Thread):
+    """Calls handle(block) for every block of a queue until the queue is closed"""
+
+    def __init__(self, queue, handle, name=None):
+        super().__init__(name=name, daemon=True)
+        self.queue = queue
+        self.handle = handle
+
+    def run(self):
+        while True:
+            block = self.queue.get()
+            if block is None:
+                break
+            self.handle(block)
+
+
+def main():
+    # Configuration
+    # One entry per board: name -> port (or "synthetic:" / "replay:capture.bin", see byte_source.py)
+    BOARDS = {
+        "board0": "/dev/ttyUSB0",
+        "board1": "/dev/ttyUSB1",
+    }
+    BAUD_RATE = 3000000
+    FRAME_FORMAT = "fpga"  # Same format on every board (see protocol.py)
+    SAMPLE_RATE = 25000
+    DURATION_SECONDS = 10
+    RECORD_PATTERN = "{name}.fpcap"  # Capture file per board (see capture.py)
+    RECORDER_BLOCKS = 1024  # Recorder backlog before the board is paused (~10 s)
+    STATS_WINDOW = 25000  # Samples in the per-board statistics window
+
+    from byte_source import open_source
+    from capture import CaptureWriter
+    from protocol import frame_spec
+    from running_stats import RunningStats
+
+    spec = frame_spec(FRAME_FORMAT)
+    acquisition = Acquisition()
+    writers = []
+    recorders = []
+    monitors = []
+    for name, port in BOARDS.items():
+        try:
+            ser = open_source(port, BAUD_RATE, timeout=1, spec=spec)
+        except serial.SerialException as e:
+            print(f"[{name}] could not open {port}: {e}")
+            continue
+        board = acquisition.add_board(ser, FrameDecoder(spec), name=name)
+
+        # Recorder: never drops, pauses the board if the disk falls behind
+        writer = CaptureWriter(RECORD_PATTERN.format(name=name), SAMPLE_RATE, channels=spec.field_names)
+        queue = board.subscribe(RECORDER_BLOCKS, policy=BLOCK)
+        writers.append(writer)
+        recorders.append(ConsumerThread(queue, writer.write, name=f"{name}-recorder"))
+
+        # Statistics: only the newest data matters
+        monitors.append((name, board.subscribe(256, policy=DROP_OLDEST),
+                         RunningStats(STATS_WINDOW, channels=spec.channels), queue))
+
+    if not monitors:
+        print("No boards opened")
+        return
+
+    print(f"Recording {len(monitors)} board(s) for {DURATION_SECONDS} s... Ctrl+C to stop")
+    for recorder in recorders:
+        recorder.start()
+    acquisition.start()
+
+    try:
+        end = time.monotonic() + DURATION_SECONDS
+        while time.monotonic() < end:
+            time.sleep(1)
+            for name, queue, stats, recorder_queue in monitors:
+                stats.extend(queue.drain())
+                print(f"[{name}] P-P: {', '.join(map(str, stats.peak_to_peak()))}  "
+                      f"RMS: {', '.join(f'{rms:.1f}' for rms in stats.rms())}  "
+                      f"recorder backlog: {len(recorder_queue)} blocks")
+    except KeyboardInterrupt:
+        print("Interrupted")
+    finally:
+        acquisition.close()
+        for recorder in recorders:
+            recorder.join()
+        for writer in writers:
+            writer.close()
+            print(f"Saved {writer.sample_count} samples to '{writer.filename}'")
+        for line in acquisition.summary():
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
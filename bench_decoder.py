@@ -0,0 +1,198 @@
+import time
+import numpy as np
+
+from byte_source import SyntheticSource
+from frame_decoder import FrameDecoder, FrameReader
+from protocol import FPGA_FRAME, multichannel_frame, packed_frame
+
+# Benchmark settings
+NUM_FRAMES = 200000  # Frames in the synthetic stream (~1.2 MB)
+CHUNK_SIZE = 4096  # Bytes per ser.read(ser.in_waiting) call at 3 Mbaud
+DROP_EVERY = 5000  # Drop one byte every N bytes to exercise resync (0 = clean)
+
+
+def make_stream(num_frames, seed=0):
+    """Build a synthetic byte stream in the FP_VHDL.vhd frame format"""
+    rng = np.random.default_rng(seed)
+    ch0 = rng.integers(0, 4096, num_frames, dtype=np.int16)
+    ch1 = rng.integers(0, 4096, num_frames, dtype=np.int16)
+    return FPGA_FRAME.encode(ch0, ch1), ch0, ch1
+
+
+def drop_bytes(stream, every):
+    """Remove one byte every `every` bytes to simulate UART overruns"""
+    if every <= 0:
+        return stream
+    keep = np.ones(len(stream), dtype=bool)
+    keep[every::every] = False
+    return np.frombuffer(stream, dtype=np.uint8)[keep].tobytes()
+
+
+def legacy_fsm_decode(chunks):
+    """The original per-byte state machine from plotter.serial_reader_thread"""
+    STATE_WAIT_HEADER_1 = 0
+    STATE_WAIT_HEADER_2 = 1
+    STATE_READ_DATA = 2
+
+    current_state = STATE_WAIT_HEADER_1
+    data_buffer = []
+    out = []
+    for bytes_in in chunks:
+        for byte_in in bytes_in:
+            if current_state == STATE_WAIT_HEADER_1:
+                if byte_in == 0xAE:
+                    current_state = STATE_WAIT_HEADER_2
+            elif current_state == STATE_WAIT_HEADER_2:
+                if byte_in == 0xBC:
+                    data_buffer = []
+                    current_state = STATE_READ_DATA
+                else:
+                    current_state = STATE_WAIT_HEADER_1
+            elif current_state == STATE_READ_DATA:
+                data_buffer.append(byte_in)
+                if len(data_buffer) == 4:
+                    d0_h, d0_l, d1_h, d1_l = data_buffer
+                    out.append(((d0_h << 4) | (d0_l >> 4), (d1_h << 4) | (d1_l >> 4)))
+                    current_state = STATE_WAIT_HEADER_1
+    return out
+
+
+def vector_decode(chunks):
+    """Decode the same chunks with FrameDecoder"""
+    decoder = FrameDecoder()
+    ch0_blocks = []
+    ch1_blocks = []
+    for chunk in chunks:
+        ch0, ch1 = decoder.decode(chunk)
+        ch0_blocks.append(ch0)
+        ch1_blocks.append(ch1)
+    ch0, ch1 = decoder.flush()
+    ch0_blocks.append(ch0)
+    ch1_blocks.append(ch1)
+    return np.concatenate(ch0_blocks), np.concatenate(ch1_blocks), decoder
+
+
+def bench_spec(spec, num_samples, chunk_size, corrupt_every=0, seed=0):
+    """
+    Round-trip random samples through spec and FrameDecoder.
+
+    Prints decode speed and what the format leaves of the 3 Mbaud link in
+    samples/s. With corrupt_every, one byte in that many is flipped; formats
+    with a checksum must then drop exactly the damaged frames.
+    """
+    rng = np.random.default_rng(seed)
+    num_samples -= num_samples % spec.samples_per_frame
+    data = rng.integers(0, 4096, (spec.channels, num_samples), dtype=np.int16)
+    stream = spec.encode(data)
+    if corrupt_every:
+        damaged = np.frombuffer(stream, dtype=np.uint8).copy()
+        damaged[corrupt_every::corrupt_every] ^= 0x10
+        stream = damaged.tobytes()
+
+    decoder = FrameDecoder(spec)
+    start = time.perf_counter()
+    blocks = [decoder.decode(chunk) for chunk in split_chunks(stream, chunk_size)]
+    blocks.append(decoder.flush())
+    elapsed = time.perf_counter() - start
+    out = np.concatenate(blocks, axis=1)
+
+    bytes_per_sample = spec.length / spec.samples_per_frame
+    print(f"{spec.name:<16} {elapsed * 1000:9.1f} ms  {len(stream) / elapsed / 1e6:8.2f} MB/s  "
+          f"{spec.channels} ch, {bytes_per_sample:.2f} bytes/sample -> "
+          f"{3000000 / 10 / bytes_per_sample / 1e3:.1f} kS/s at 3 Mbaud")
+    if corrupt_every:
+        print(f"{'':<16} corrupted stream: {out.shape[1]} of {num_samples} samples kept, "
+              f"{decoder.checksum_errors} checksum errors, {decoder.resync_events} resyncs, "
+              f"{decoder.frames_lost} frames lost")
+        assert decoder.frames_decoded + decoder.frames_lost == num_samples // spec.samples_per_frame
+    else:
+        assert np.array_equal(out, data)
+
+
+def check_byte_at_a_time(spec, num_samples=64, seed=0):
+    """Feeding the stream one byte per decode() call must give the same samples (incomplete chunks included)"""
+    rng = np.random.default_rng(seed)
+    num_samples -= num_samples % spec.samples_per_frame
+    data = rng.integers(0, 4096, (spec.channels, num_samples), dtype=np.int16)
+    stream = spec.encode(data)
+
+    decoder = FrameDecoder(spec)
+    empty = decoder.decode(b"")
+    assert empty.shape == (spec.channels, 0), empty.shape
+    blocks = [decoder.decode(stream[i : i + 1]) for i in range(len(stream))]
+    blocks.append(decoder.flush())
+    assert np.array_equal(np.concatenate(blocks, axis=1), data)
+    print(f"{spec.name:<16} byte-at-a-time decode identical ({len(stream)} single-byte chunks)")
+
+
+def split_chunks(stream, chunk_size):
+    return [stream[i : i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+
+def run(name, func, chunks, num_bytes):
+    start = time.perf_counter()
+    result = func(chunks)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16} {elapsed * 1000:9.1f} ms  {num_bytes / elapsed / 1e6:8.2f} MB/s")
+    return result, elapsed
+
+
+def bench_reader(seconds=1.0):
+    """End-to-end FrameReader throughput on an unthrottled synthetic source"""
+    source = SyntheticSource(sample_rate=50000, speed=0)
+    reader = FrameReader(source, report_interval=None)
+    frames = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        adc, _ = reader.read_block()
+        frames += len(adc)
+    elapsed = time.perf_counter() - start
+    print(f"{'FrameReader':<16} {frames / elapsed / 1e3:9.1f} kframes/s  "
+          f"{source.position / elapsed / 1e6:8.2f} MB/s (synthetic source)")
+
+
+def main():
+    stream, ch0, ch1 = make_stream(NUM_FRAMES)
+    print(f"Synthetic stream: {NUM_FRAMES} frames, {len(stream)} bytes, chunk {CHUNK_SIZE} bytes")
+    print(f"Link budget at 3 Mbaud: {3000000 / 10 / 1e6:.2f} MB/s")
+    print("-" * 50)
+
+    # Clean stream: both decoders must agree sample for sample
+    chunks = split_chunks(stream, CHUNK_SIZE)
+    fsm_out, fsm_time = run("Per-byte FSM", legacy_fsm_decode, chunks, len(stream))
+    (v0, v1, _), vec_time = run("FrameDecoder", vector_decode, chunks, len(stream))
+
+    fsm_array = np.array(fsm_out, dtype=np.int16)
+    assert np.array_equal(fsm_array[:, 0], v0) and np.array_equal(fsm_array[:, 1], v1)
+    assert np.array_equal(v0, ch0) and np.array_equal(v1, ch1)
+    print(f"Speedup: {fsm_time / vec_time:.1f}x (outputs identical)")
+
+    # Lossy stream: FSM reads truncated frames as data, decoder resyncs
+    if DROP_EVERY > 0:
+        print("-" * 50)
+        lossy = drop_bytes(stream, DROP_EVERY)
+        chunks = split_chunks(lossy, CHUNK_SIZE)
+        fsm_out, _ = run("Per-byte FSM", legacy_fsm_decode, chunks, len(lossy))
+        (v0, _, decoder), _ = run("FrameDecoder", vector_decode, chunks, len(lossy))
+        print(f"FSM frames: {len(fsm_out)}, decoder frames: {len(v0)}, "
+              f"discarded bytes: {decoder.bytes_discarded}, resyncs: {decoder.resync_events}")
+
+        # The frame counter must account for every frame that did not arrive
+        print(f"Frames lost (sequence gaps): {decoder.frames_lost} in {decoder.gap_events} gaps, "
+              f"decoded + lost = {len(v0) + decoder.frames_lost} of {NUM_FRAMES}")
+        assert len(v0) + decoder.frames_lost == NUM_FRAMES
+
+    # Frame formats side by side: decode speed and link capacity
+    print("-" * 50)
+    for spec in (FPGA_FRAME, packed_frame(0x01), multichannel_frame(0xFF), packed_frame(0xFF)):
+        bench_spec(spec, NUM_FRAMES, CHUNK_SIZE)
+    bench_spec(packed_frame(0x01), NUM_FRAMES, CHUNK_SIZE, corrupt_every=DROP_EVERY)
+    for spec in (FPGA_FRAME, multichannel_frame(0xFF), packed_frame(0x01), packed_frame(0xFF)):
+        check_byte_at_a_time(spec)
+
+    print("-" * 50)
+    bench_reader()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import time
+import matplotlib
+
+matplotlib.use("Agg")  # Offscreen: measures rendering, not the window system
+import matplotlib.pyplot as plt
+import numpy as np
+
+from envelope import MinMaxEnvelope, RawWindow, plot_columns
+from live_plot import LiveRenderer
+
+# Benchmark settings
+SAMPLE_RATE = 50000  # Samples per second per channel
+WINDOW_SECONDS = 5.0  # Live window length
+FRAME_INTERVAL_S = 0.05  # 20 FPS: new samples per redraw = SAMPLE_RATE * FRAME_INTERVAL_S
+CHANNELS = 2
+FRAMES = 40  # Redraws per measurement
+
+
+def make_signal(num_samples, channels, seed=0):
+    """ADC-like test signal: two tones plus noise around mid-scale"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples) / SAMPLE_RATE
+    tones = 600 * np.sin(2 * np.pi * 300 * t) + 600 * np.sin(2 * np.pi * 2500 * t)
+    noise = rng.normal(0, 20, (channels, num_samples))
+    return np.clip(2048 + tones + noise, 0, 4095).astype(np.int16)
+
+
+def bench(name, make_window, signal, blit=False):
+    """Feed the window frame by frame and time extend + artist update + full (or blitted) draw"""
+    capacity = int(SAMPLE_RATE * WINDOW_SECONDS)
+    step = int(SAMPLE_RATE * FRAME_INTERVAL_S)
+
+    fig, axes = plt.subplots(CHANNELS, 1, figsize=(15, 8), squeeze=False)
+    axes = axes[:, 0]
+    for ax in axes:
+        ax.set_xlim(0, capacity)
+        ax.set_ylim(0, 4096)
+    fig.canvas.draw()
+    window = make_window(capacity, plot_columns(axes[0]))
+    lines = [window.add_artist(ax, "C0") for ax in axes]
+    renderer = LiveRenderer(fig, axes, lines, capacity, report_interval=None) if blit else None
+
+    # Fill the window first so every measured frame draws the full length
+    window.extend(signal[:, :capacity])
+    position = capacity
+    update_time = 0.0
+
+    def update():
+        nonlocal position, update_time
+        start = time.perf_counter()
+        window.extend(signal[:, position : position + step])
+        position += step
+        window.update_artists(lines)
+        update_time += time.perf_counter() - start
+
+    if renderer:
+        renderer.frame(update)  # First frame renders and caches the background
+
+    start = time.perf_counter()
+    update_time = 0.0
+    for _ in range(FRAMES):
+        if renderer:
+            renderer.frame(update)
+        else:
+            update()
+            fig.canvas.draw()
+    draw_time = time.perf_counter() - start - update_time
+    points = len(window.xy()[0])
+    plt.close(fig)
+
+    frame_time = (update_time + draw_time) / FRAMES
+    print(f"{name:<16} {points:>8} points/line  update {update_time / FRAMES * 1000:6.2f} ms  "
+          f"draw {draw_time / FRAMES * 1000:7.2f} ms  -> {1 / frame_time:6.1f} FPS")
+    return frame_time
+
+
+def main():
+    capacity = int(SAMPLE_RATE * WINDOW_SECONDS)
+    step = int(SAMPLE_RATE * FRAME_INTERVAL_S)
+    signal = make_signal(capacity + FRAMES * step, CHANNELS)
+    print(f"Window: {WINDOW_SECONDS} s at {SAMPLE_RATE} S/s = {capacity} samples x {CHANNELS} channels, "
+          f"{step} new samples per frame")
+    print("-" * 80)
+
+    raw = bench("Raw samples", lambda cap, cols: RawWindow(cap, CHANNELS), signal)
+    env = bench("Min/max envelope", lambda cap, cols: MinMaxEnvelope(cap, cols, CHANNELS), signal)
+    blit = bench("Envelope + blit", lambda cap, cols: MinMaxEnvelope(cap, cols, CHANNELS), signal,
+                 blit=True)
+    print("-" * 80)
+    print(f"Speedup: envelope {raw / env:.1f}x, envelope + blit {raw / blit:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
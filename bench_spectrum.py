@@ -0,0 +1,53 @@
+import time
+import numpy as np
+
+from spectrum import StreamingSpectrum
+
+# Benchmark settings
+SAMPLE_RATE = 50000  # Samples per second per channel
+SECONDS = 20  # Signal length
+BLOCK = 2500  # Samples per update (one 50 ms GUI frame at 50 kS/s)
+FFT_SIZE = 1024
+FFT_OVERLAP = 512
+
+
+def make_signal(num_samples, channels, seed=0):
+    """300 Hz and 2.5 kHz test tones (the tex/ bench shots) plus noise, 12-bit offset binary"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_samples) / SAMPLE_RATE
+    tones = 900 * np.sin(2 * np.pi * 300 * t) + 900 * np.sin(2 * np.pi * 2500 * t)
+    noise = rng.normal(0, 5, (channels, num_samples))
+    return np.clip(2048 + tones + noise, 0, 4095).astype(np.int16)
+
+
+def bench(channels):
+    signal = make_signal(SAMPLE_RATE * SECONDS, channels)
+    spectrum = StreamingSpectrum(SAMPLE_RATE, FFT_SIZE, FFT_OVERLAP, channels=channels)
+
+    start = time.perf_counter()
+    for i in range(0, signal.shape[1], BLOCK):
+        spectrum.extend(signal[:, i : i + BLOCK])
+        spectrum.average()
+    elapsed = time.perf_counter() - start
+
+    expected = (signal.shape[1] - FFT_SIZE) // (FFT_SIZE - FFT_OVERLAP) + 1
+    assert spectrum.frames == expected, (spectrum.frames, expected)
+    frequencies, levels = spectrum.peak()
+    assert np.allclose(frequencies, 2490.234375) or np.allclose(frequencies, 292.96875), frequencies
+
+    realtime = SECONDS / elapsed
+    print(f"{channels} channel(s): {spectrum.frames} spectra in {elapsed * 1000:7.1f} ms, "
+          f"{signal.size / elapsed / 1e6:6.2f} MS/s -> {realtime:6.0f}x real time "
+          f"({100 / realtime:.2f}% of one core at {SAMPLE_RATE} S/s per channel)")
+
+
+def main():
+    print(f"Streaming spectrum: {FFT_SIZE}-point frames, {FFT_OVERLAP} overlap, "
+          f"{BLOCK}-sample blocks, {SECONDS} s at {SAMPLE_RATE} S/s")
+    print("-" * 80)
+    for channels in (1, 2, 9):
+        bench(channels)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import abc
+import os
+import time
+import numpy as np
+import serial
+
+from protocol import FPGA_FRAME, multichannel_frame, packed_frame
+
+# --- Byte sources ---
+# Everything that reads the UART stream only uses read(size), in_waiting,
+# is_open and close(), i.e. a small subset of serial.Serial. The classes below
+# provide that same interface for recorded files and generated data, so the
+# plotters and benchmarks can run without the FPGA attached.
+#
+# open_source() picks the implementation from the port string:
+#   "/dev/ttyUSB0", "COM3"           live serial port
+#   "replay:capture.bin"             replay a raw recording in real time
+#   "replay:capture.bin?speed=4"     ... 4x faster (speed=0: as fast as possible)
+#   "replay:capture.bin?rate=25000"  ... paced at the recorded sample rate
+#                                    instead of the full link rate
+#   "synthetic:"                     generated frames at 25 kHz
+#   "synthetic:?rate=50000&speed=0"  ... at 50 kHz, unthrottled
+#   "synthetic:?mask=255"            ... multi-channel frames for ADC inputs
+#                                    0-7 (mask is the decimal channel mask)
+#   "synthetic:?packed=1&mask=1"     ... packed 12-bit blocks (CH0 + FIR)
+
+REPLAY_PREFIX = "replay:"
+SYNTHETIC_PREFIX = "synthetic:"
+
+
+class PacedSource(abc.ABC):
+    """
+    Base class for sources that hand out bytes at a fixed rate.
+
+    byte_rate is the nominal link rate in bytes/s and speed scales it; with
+    speed=0 the source is unthrottled and every byte is available at once.
+    Subclasses implement generate().
+    """
+
+    def __init__(self, byte_rate, speed=1.0, timeout=1):
+        self.byte_rate = byte_rate
+        self.speed = speed
+        self.timeout = timeout
+        self.is_open = True
+
+        self.start_time = time.perf_counter()
+        self.position = 0  # Bytes handed out so far
+
+    def total_bytes(self):
+        """Bytes the source can deliver in total (None = endless)"""
+        return None
+
+    def exhausted(self):
+        """True once a finite source has delivered everything"""
+        total = self.total_bytes()
+        return total is not None and self.position >= total
+
+    @abc.abstractmethod
+    def generate(self, size):
+        """Produce the next `size` bytes of the stream"""
+
+    def released(self):
+        """Bytes the pacing clock allows to have been delivered by now"""
+        if not self.speed:
+            released = float("inf")
+        else:
+            elapsed = time.perf_counter() - self.start_time
+            released = int(elapsed * self.byte_rate * self.speed)
+        total = self.total_bytes()
+        return released if total is None else min(released, total)
+
+    @property
+    def in_waiting(self):
+        available = self.released() - self.position
+        if available == float("inf"):
+            # Unthrottled endless source: offer a generous chunk
+            return 65536
+        return max(0, int(available))
+
+    def read(self, size=1):
+        """Like serial.Serial.read(): wait up to timeout for `size` bytes"""
+        deadline = time.perf_counter() + (self.timeout or 0)
+        waiting = self.in_waiting
+        while waiting < size:
+            total = self.total_bytes()
+            if total is not None and self.released() >= total:
+                break  # The rest of the recording is already available
+            if not self.speed or time.perf_counter() >= deadline:
+                break
+            time.sleep(min(0.01, (size - waiting) / (self.byte_rate * self.speed)))
+            waiting = self.in_waiting
+
+        size = min(size, self.in_waiting)
+        data = self.generate(size) if size > 0 else b""
+        self.position += len(data)
+        return data
+
+    def close(self):
+        self.is_open = False
+
+
+class ReplaySource(PacedSource):
+    """
+    Replay a raw byte recording made with RecordingSource.
+
+    The recording is memory-mapped, so only the bytes handed out are read
+    and captures of any length replay in constant memory.
+    """
+
+    def __init__(self, filename, byte_rate=300000, speed=1.0, timeout=1, loop=False):
+        super().__init__(byte_rate, speed, timeout)
+        self.filename = filename
+        self.loop = loop
+        if os.path.getsize(filename) == 0:
+            raise serial.SerialException(f"{filename} is empty")
+        self.data = np.memmap(filename, dtype=np.uint8, mode="r")
+
+    def total_bytes(self):
+        return None if self.loop else len(self.data)
+
+    def generate(self, size):
+        start = self.position % len(self.data)
+        if not self.loop or start + size <= len(self.data):
+            return self.data[start : start + size].tobytes()
+        # Wrap around to the start of the recording, slice by slice
+        pieces = []
+        while size > 0:
+            piece = self.data[start : start + size]
+            pieces.append(piece)
+            size -= len(piece)
+            start = 0
+        return np.concatenate(pieces).tobytes()
+
+
+class SyntheticSource(PacedSource):
+    """
+    Generate valid frames without hardware.
+
+    The ADC channel is a mid-scale mix of a tone below and a tone above the
+    filter cutoff (like the 300 Hz / 2.5 kHz bench tests) plus a little noise.
+    The filtered channel carries only the high tone, which is roughly what the
+    high-pass FIR would produce. With a multi-channel spec every further ADC
+    input gets the same mix at a smaller amplitude, so the traces differ.
+    """
+
+    def __init__(self, sample_rate=25000, spec=FPGA_FRAME, byte_rate=300000,
+                 speed=1.0, timeout=1, low_hz=300.0, high_hz=2500.0, seed=0):
+        # Bytes leave at the frame rate, capped by what the link can carry
+        frame_rate = min(sample_rate / spec.samples_per_frame, byte_rate / spec.length)
+        super().__init__(frame_rate * spec.length, speed, timeout)
+        self.sample_rate = sample_rate
+        self.spec = spec
+        self.low_hz = low_hz
+        self.high_hz = high_hz
+        self.rng = np.random.default_rng(seed)
+        self.pending = b""
+        self.next_sample = 0
+        self.next_frame = 0
+
+    def make_frames(self, frames):
+        """Encode the next `frames` frames (samples_per_frame samples each)"""
+        count = frames * self.spec.samples_per_frame
+        t = (self.next_sample + np.arange(count)) / self.sample_rate
+        self.next_sample += count
+
+        low = 600 * np.sin(2 * np.pi * self.low_hz * t)
+        high = 600 * np.sin(2 * np.pi * self.high_hz * t)
+        noise = self.rng.normal(0, 4, (self.spec.channels - 1, count))
+
+        # Raw inputs scale down channel by channel, the last field is the FIR output
+        gain = 1.0 / (1 + np.arange(self.spec.channels - 1))[:, None]
+        block = np.empty((self.spec.channels, count))
+        block[:-1] = gain * (low + high) + noise
+        block[-1] = high
+        data = self.spec.encode(np.clip(np.round(2048 + block), 0, 4095), sequence=self.next_frame)
+        self.next_frame += frames
+        return data
+
+    def generate(self, size):
+        if len(self.pending) < size:
+            frames_needed = (size - len(self.pending)) // self.spec.length + 1
+            self.pending += self.make_frames(frames_needed)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+class RecordingSource:
+    """Pass-through wrapper that tees every byte read into a raw file"""
+
+    def __init__(self, source, filename):
+        self.source = source
+        self.file = open(filename, "wb")
+
+    @property
+    def in_waiting(self):
+        return self.source.in_waiting
+
+    @property
+    def is_open(self):
+        return self.source.is_open
+
+    def exhausted(self):
+        # Finite sources (replay) report the end of the recording; ports never do
+        return getattr(self.source, "exhausted", lambda: False)()
+
+    def fileno(self):
+        # Lets acquisition.py wait on the wrapped port (AttributeError for paced sources)
+        return self.source.fileno()
+
+    def read(self, size=1):
+        data = self.source.read(size)
+        self.file.write(data)
+        return data
+
+    def close(self):
+        self.file.close()
+        self.source.close()
+
+
+def parse_options(spec):
+    """Split 'name?key=value&...' into (name, {key: float})"""
+    name, _, query = spec.partition("?")
+    options = {}
+    for item in filter(None, query.split("&")):
+        key, _, value = item.partition("=")
+        options[key] = float(value)
+    return name, options
+
+
+def open_source(port, baud_rate=3000000, timeout=1, record_to=None, spec=FPGA_FRAME):
+    """
+    Open the byte source named by `port` (see the table at the top of the file).
+
+    Raises serial.SerialException if the source cannot be opened. If record_to
+    is given, every byte read is also written to that raw file. spec=None
+    (frame format still to be detected) paces sources like FPGA_FRAME.
+    """
+    spec = spec or FPGA_FRAME
+    byte_rate = baud_rate / 10  # 8N1: 10 bits on the wire per byte
+
+    if port.startswith(REPLAY_PREFIX):
+        filename, options = parse_options(port[len(REPLAY_PREFIX):])
+        if "rate" in options:
+            byte_rate = options["rate"] * spec.length / spec.samples_per_frame
+        try:
+            source = ReplaySource(filename, byte_rate, options.get("speed", 1.0),
+                                  timeout, loop=bool(options.get("loop", 0)))
+        except OSError as e:
+            raise serial.SerialException(f"Could not open replay file {filename}: {e}")
+    elif port.startswith(SYNTHETIC_PREFIX):
+        _, options = parse_options(port[len(SYNTHETIC_PREFIX):])
+        if options.get("packed"):
+            spec = packed_frame(int(options.get("mask", 1)))
+        elif "mask" in options:
+            spec = multichannel_frame(int(options["mask"]))
+        source = SyntheticSource(int(options.get("rate", 25000)), spec, byte_rate,
+                                 options.get("speed", 1.0), timeout)
+    else:
+        source = serial.Serial(port, baud_rate, timeout=timeout)
+
+    if record_to:
+        source = RecordingSource(source, record_to)
+    return source
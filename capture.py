@@ -0,0 +1,126 @@
+import json
+import numpy as np
+
+# --- Capture file layout ---
+# [8-byte magic][HEADER_SIZE - 8 bytes of space-padded JSON][interleaved samples]
+# The JSON header carries sample_rate, channel names and dtype. Samples follow
+# as one row per frame (adc, filtered, ...), so the number of samples is simply
+# derived from the file size and the file can be memory-mapped while it is
+# still being written.
+CAPTURE_MAGIC = b"FPCAP01\n"
+HEADER_SIZE = 512
+
+
+class CaptureWriter:
+    """
+    Streaming recorder for decoded sample blocks.
+
+    Each block is appended to the file as soon as it is written, so memory use
+    stays constant however long the capture runs, and at most flush_interval
+    samples are lost if the process dies.
+    """
+
+    def __init__(self, filename, sample_rate, channels=("adc", "filtered"),
+                 dtype=np.int16, flush_interval=50000):
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.channels = list(channels)
+        self.dtype = np.dtype(dtype)
+        self.flush_interval = flush_interval
+
+        self.sample_count = 0
+        self.unflushed = 0
+
+        header = json.dumps({
+            "sample_rate": sample_rate,
+            "channels": self.channels,
+            "dtype": self.dtype.str,
+            "layout": "interleaved",
+        }).encode()
+        if len(header) > HEADER_SIZE - len(CAPTURE_MAGIC):
+            raise ValueError("Capture header too large")
+
+        self.file = open(filename, "wb")
+        self.file.write(CAPTURE_MAGIC + header.ljust(HEADER_SIZE - len(CAPTURE_MAGIC)))
+        self.file.flush()
+
+    def write(self, *columns):
+        """Append one block; one array per channel, all the same length, or one (channels, n) array"""
+        if len(columns) == 1 and np.ndim(columns[0]) == 2:
+            columns = columns[0]
+        count = len(columns[0])
+        if count == 0:
+            return
+        if len(columns) != len(self.channels):
+            raise ValueError(f"Expected {len(self.channels)} channels, got {len(columns)}")
+        block = np.empty((count, len(self.channels)), dtype=self.dtype)
+        block.T[:] = columns
+        self.file.write(block.tobytes())
+
+        self.sample_count += count
+        self.unflushed += count
+        if self.unflushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self.unflushed = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_header(filename):
+    """Return the JSON header of a capture file as a dict"""
+    with open(filename, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if not raw.startswith(CAPTURE_MAGIC):
+        raise ValueError(f"{filename} is not a capture file")
+    return json.loads(raw[len(CAPTURE_MAGIC):].decode())
+
+
+def open_capture(filename):
+    """
+    Memory-map a capture file.
+
+    Returns (samples, header) where samples is a read-only (n, channels) view
+    of every complete row currently on disk. Call again to pick up rows
+    appended since.
+    """
+    header = read_header(filename)
+    dtype = np.dtype(header["dtype"])
+    row_size = dtype.itemsize * len(header["channels"])
+
+    with open(filename, "rb") as f:
+        f.seek(0, 2)
+        rows = (f.tell() - HEADER_SIZE) // row_size
+
+    if rows == 0:
+        return np.empty((0, len(header["channels"])), dtype=dtype), header
+    samples = np.memmap(filename, dtype=dtype, mode="r", offset=HEADER_SIZE,
+                        shape=(rows, len(header["channels"])))
+    return samples, header
+
+
+def input_channel(header, name=None):
+    """
+    Column index of the FIR input in a capture.
+
+    `name` picks a channel explicitly; by default it is the first channel
+    that is not "filtered" - "adc" in fpga captures, the lowest recorded
+    ADC input (ch0, ...) in multi-channel and packed captures.
+    """
+    channels = header["channels"]
+    if name is not None:
+        return channels.index(name)
+    for index, channel in enumerate(channels):
+        if channel != "filtered":
+            return index
+    raise ValueError(f"No input channel among {channels}")
@@ -1,15 +1,22 @@
 import serial
 import time
 
+from byte_source import open_source
+from frame_decoder import FrameDecoder
+from protocol import FPGA_FRAME
+
 class SerialDebugger:
-    def __init__(self, port, baud_rate=3000000):
-        self.port = port
+    def __init__(self, port, baud_rate=3000000, spec=FPGA_FRAME, record_to=None):
+        self.port = port  # Serial port, or a replay:/synthetic: source (see byte_source.py)
+        self.record_to = record_to  # Optional raw byte recording of the session
         self.baud_rate = baud_rate
+        self.spec = spec  # Wire format, see protocol.py
         self.ser = None
         
     def connect_serial(self):
         try:
-            self.ser = serial.Serial(self.port, self.baud_rate, timeout=1)
+            self.ser = open_source(self.port, self.baud_rate, timeout=1,
+                                   record_to=self.record_to, spec=self.spec)
             print(f"Connected to {self.port} at {self.baud_rate} baud")
             print("Waiting for data...\n")
             return True
@@ -25,6 +32,7 @@ class SerialDebugger:
         byte_count = 0
         packet_count = 0
         line_bytes = []
+        header = list(self.spec.header)
         
         print("Raw Serial Data Debug:")
         print("Format: [ByteCount] HEX (DEC) 'ASCII'")
@@ -46,8 +54,8 @@ class SerialDebugger:
                     line_bytes.append(byte_val)
                     byte_count += 1
                     
-                    # Check for sync pattern (0xFF 0xFF)
-                    if len(line_bytes) >= 2 and line_bytes[-2:] == [0xFF, 0xFF]:
+                    # Check for the sync header of the configured frame format
+                    if line_bytes[-len(header):] == header:
                         print(f"*** SYNC HEADER DETECTED at byte {byte_count-1} ***")
                         packet_count += 1
                         
@@ -55,8 +63,8 @@ class SerialDebugger:
                     if len(line_bytes) > 10:
                         line_bytes.pop(0)
                         
-                    # Print packet boundary every 6 bytes after sync
-                    if byte_count % 6 == 0:
+                    # Print packet boundary every frame length after sync
+                    if byte_count % self.spec.length == 0:
                         print("-" * 30)
                         
         except KeyboardInterrupt:
@@ -72,64 +80,56 @@ class SerialDebugger:
             return
             
         print("Packet Structure Debug:")
-        print("Looking for: [0xFF][0xFF][ADC_H][ADC_L][FILT_H][FILT_L]")
+        print(f"Looking for: {self.spec.describe()}")
         print("-" * 60)
         
-        packet_buffer = []
+        decoder = FrameDecoder(self.spec)
+        labels = self.spec.byte_labels()
         packet_count = 0
-        byte_count = 0
         
         try:
             while True:
-                byte_data = self.ser.read(1)
-                if len(byte_data) > 0:
-                    byte_val = byte_data[0]
-                    byte_count += 1
-                    
-                    print(f"[{byte_count:06d}] 0x{byte_val:02X} ({byte_val:3d})", end="")
+                # Frames are located and decoded in bulk, then printed one by one
+                lost_before = decoder.frames_lost
+                overrun_before = decoder.samples_overrun
+                frames = decoder.decode_frames(self.ser.read(max(1, self.ser.in_waiting)))
+                values = self.spec.unpack(frames)
+                sequence = self.spec.sequence(frames)
+                
+                # Gaps in the frame counter (bytes dropped, resync, bad checksum)
+                if decoder.frames_lost > lost_before:
+                    print(f"*** {decoder.frames_lost - lost_before} FRAMES LOST ***")
+                    print()
+                if decoder.samples_overrun > overrun_before:
+                    print(f"*** {decoder.samples_overrun - overrun_before} SAMPLES OVERRUN IN THE FPGA ***")
+                    print()
+                
+                for i, frame in enumerate(frames):
+                    packet_count += 1
+                    if sequence is not None:
+                        print(f"SEQ {int(sequence[i])}")
+                    for byte_val, label in zip(frame, labels):
+                        print(f"0x{byte_val:02X} ({byte_val:3d}) <- {label}")
                     
-                    # Look for sync pattern
-                    if byte_val == 0xFF:
-                        if len(packet_buffer) == 0:
-                            packet_buffer.append(byte_val)
-                            print(" <- First sync byte")
-                        elif len(packet_buffer) == 1 and packet_buffer[0] == 0xFF:
-                            packet_buffer.append(byte_val)
-                            print(" <- Second sync byte - PACKET START")
-                            packet_count += 1
-                        else:
-                            packet_buffer = [byte_val]
-                            print(" <- Possible sync start")
-                    else:
-                        if len(packet_buffer) >= 2:
-                            packet_buffer.append(byte_val)
-                            
-                            if len(packet_buffer) == 3:
-                                print(" <- ADC High Byte")
-                            elif len(packet_buffer) == 4:
-                                adc_val = (packet_buffer[2] << 8) | packet_buffer[3]
-                                print(f" <- ADC Low Byte (ADC = {adc_val})")
-                            elif len(packet_buffer) == 5:
-                                print(" <- Filter High Byte")
-                            elif len(packet_buffer) == 6:
-                                filt_val = (packet_buffer[4] << 8) | packet_buffer[5]
-                                # Convert to signed
-                                if filt_val > 32767:
-                                    filt_val -= 65536
-                                print(f" <- Filter Low Byte (FILT = {filt_val})")
-                                
-                                # Complete packet received
-                                adc_final = (packet_buffer[2] << 8) | packet_buffer[3]
-                                adc_final &= 0x0FFF  # 12-bit mask
-                                print(f"*** PACKET {packet_count} COMPLETE: ADC={adc_final}, FILT={filt_val} ***")
-                                print()
-                                packet_buffer = []
+                    # Packed blocks carry samples_per_frame samples per packet
+                    per = self.spec.samples_per_frame
+                    samples = values[:, i * per : (i + 1) * per].T
+                    for k, sample in enumerate(samples):
+                        fields = ", ".join(f"{name.upper()}={int(value)}"
+                                           for name, value in zip(self.spec.field_names, sample))
+                        if per == 1:
+                            print(f"*** PACKET {packet_count} COMPLETE: {fields} ***")
                         else:
-                            packet_buffer = []
-                            print(" <- Data byte (no sync)")
+                            print(f"    sample {k}: {fields}")
+                    if per > 1:
+                        print(f"*** BLOCK {packet_count} COMPLETE: {per} samples ***")
+                    print()
                             
         except KeyboardInterrupt:
-            print(f"\nStopped. Processed {byte_count} bytes, {packet_count} complete packets")
+            print(f"\nStopped. {packet_count} complete packets, "
+                  f"{decoder.bytes_discarded} bytes discarded, {decoder.resync_events} resync events, "
+                  f"{decoder.checksum_errors} checksum errors, {decoder.frames_lost} frames lost "
+                  f"in {decoder.gap_events} gaps, {decoder.samples_overrun} samples overrun")
         finally:
             if self.ser and self.ser.is_open:
                 self.ser.close()
@@ -192,7 +192,7 @@ def main():
     
     print("Serial Debug Tool")
     print("1. Raw byte debug (every byte with details)")
-    print("2. Packet structure debug (interpret as packets)")
+    print(f"2. Packet structure debug (interpret as {debugger.spec.describe()})")
     print("3. Hex dump debug (hex dump format)")
     
     choice = input("Enter choice (1, 2, or 3): ").strip()
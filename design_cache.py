@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import scipy
+
+from fir_design import FirDesign, design
+
+# --- On-disk cache of FIR designs ---
+# Entries are keyed by a hash of the complete FirSpec (plus the scipy version,
+# which can change firwin/remez results), so a spec that has been designed
+# before is loaded instead of recomputed:
+#   <key>.npz           float + fixed coefficients
+#   <key>.npy           (frequencies, h, h_fixed) rows, memory-mapped on load
+#   <key>-<plot>.png    rendered response plot for given plot settings
+# Reading an entry touches its mtime; once the directory grows past max_bytes
+# the least recently used files are deleted. Writes go through a temporary
+# file and os.replace(), so sweep workers can share one cache directory.
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".fir_cache"
+
+
+def _json_default(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Cannot hash {type(value).__name__} in a FirSpec")
+
+
+def spec_key(spec):
+    """Stable content hash of everything that determines a design"""
+    payload = json.dumps({"version": CACHE_VERSION, "scipy": scipy.__version__,
+                          "spec": spec.to_dict()},
+                         sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class DesignCache:
+    """
+    Content-addressed store for FirDesign results.
+
+    design(spec) returns a FirDesign with its response already attached,
+    computing and storing it only on a miss. Eviction is checked every
+    `prune_interval` stores and can be forced with prune().
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=1024 ** 3,
+                 prune_interval=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key, suffix=".npz"):
+        return os.path.join(self.directory, key + suffix)
+
+    def _touch(self, filename):
+        try:
+            os.utime(filename)
+        except OSError:
+            pass  # Evicted by another process in the meantime
+
+    def _atomic_write(self, filename, write):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, filename)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get(self, spec):
+        """Cached FirDesign for spec, or None"""
+        key = spec_key(spec)
+        try:
+            with np.load(self.path(key)) as data:
+                result = FirDesign(spec, data["coefficients"])
+                result.fixed_coefficients = data["fixed_coefficients"]
+            response = np.load(self.path(key, ".npy"), mmap_mode="r")
+        except (OSError, KeyError, ValueError):
+            return None
+        result._response = (response[0].real, response[1], response[2])
+        self._touch(self.path(key))
+        self._touch(self.path(key, ".npy"))
+        result.from_cache = True
+        return result
+
+    def put(self, result):
+        """Store a design together with its (computed if needed) response"""
+        key = spec_key(result.spec)
+        response = np.array(result.response(), dtype=np.complex128)
+        # Response first: get() treats a missing .npy as a miss
+        self._atomic_write(self.path(key, ".npy"), lambda f: np.save(f, response))
+        self._atomic_write(self.path(key), lambda f: np.savez(
+            f, coefficients=result.coefficients, fixed_coefficients=result.fixed_coefficients))
+
+        self._stores += 1
+        if self.prune_interval and self._stores % self.prune_interval == 0:
+            self.prune()
+
+    def design(self, spec):
+        """Like fir_design.design(), but served from the cache when possible"""
+        result = self.get(spec)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = design(spec)
+        self.put(result)
+        return result
+
+    def plot(self, result, filename, show=False, dpi=300, xlim=10000):
+        """FirDesign.plot(), copying a previously rendered PNG when one exists"""
+        plot_key = hashlib.sha256(f"{dpi}/{xlim}".encode()).hexdigest()[:8]
+        cached_png = self.path(spec_key(result.spec), f"-{plot_key}.png")
+
+        if os.path.exists(cached_png):
+            self._touch(cached_png)
+            if filename:
+                shutil.copyfile(cached_png, filename)
+            if show:
+                result.plot(show=True, dpi=dpi, xlim=xlim)
+            return
+
+        result.plot(filename, show=show, dpi=dpi, xlim=xlim)
+        if filename:
+            with open(filename, "rb") as png:
+                self._atomic_write(cached_png, lambda f: shutil.copyfileobj(png, f))
+
+    def entries(self):
+        """(mtime, size, path) of every cache file, oldest first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp"):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, filename))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self):
+        """Delete least recently used files until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, filename in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for _, _, filename in self.entries():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
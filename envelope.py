@@ -0,0 +1,174 @@
+import numpy as np
+from matplotlib.patches import Polygon
+
+from ring_buffer import HistoryBuffer
+
+
+class MinMaxEnvelope:
+    """
+    Level-of-detail view of a long sample window.
+
+    A window of `capacity` samples drawn into `columns` pixel columns shows
+    at most one vertical stroke per column, so each column only needs the
+    minimum and maximum of the samples that fall into it. Samples are folded
+    into fixed-size buckets as they arrive (vectorized, O(new samples)) and
+    the per-bucket min/max live in two mirrored HistoryBuffers, so a redraw
+    costs O(columns) whatever the window length.
+
+    xy() returns the envelope as one polyline: every bucket contributes its
+    min and its max at the same x. For drawing, band() gives the same data as
+    a closed outline (maxima left to right, minima back) that add_artist()
+    renders as one filled polygon - Agg fills it about 100x faster than it
+    strokes the zig-zag. Samples of a bucket that is not complete yet are
+    held back until it fills (at most `bucket` samples).
+
+    With channels=N, extend() takes (N, n) blocks and xy() returns (N, m) y data.
+    """
+
+    def __init__(self, capacity, columns, channels=None, dtype=np.int16):
+        self.capacity = capacity
+        self.columns = columns
+        self.channels = channels
+        self.bucket = max(1, -(-capacity // columns))  # Samples per column, rounded up
+        self.buckets = max(1, capacity // self.bucket)
+
+        self.mins = HistoryBuffer(self.buckets, dtype, channels)
+        self.maxs = HistoryBuffer(self.buckets, dtype, channels)
+
+        lead = () if channels is None else (channels,)
+        self.partial = np.zeros(lead + (self.bucket,), dtype=dtype)
+        self.partial_count = 0
+
+        # Output arrays, filled in place by xy()
+        self.x = np.repeat(np.arange(self.buckets) * self.bucket, 2)
+        self.y = np.zeros(lead + (2 * self.buckets,), dtype=dtype)
+        self.vertices = np.zeros(lead + (2 * self.buckets, 2))
+        self.band_count = -1  # Bucket count the vertex x column was laid out for
+
+    def __len__(self):
+        """Number of complete buckets in the envelope"""
+        return len(self.mins)
+
+    def clear(self):
+        self.mins.clear()
+        self.maxs.clear()
+        self.partial_count = 0
+
+    def _push(self, blocks):
+        """Reduce (..., k, bucket) complete buckets and append them"""
+        self.mins.extend(blocks.min(axis=-1))
+        self.maxs.extend(blocks.max(axis=-1))
+
+    def extend(self, values):
+        """Fold a block of new samples into the envelope"""
+        values = np.asarray(values)
+        n = values.shape[-1]
+        if n == 0:
+            return
+
+        # Top up the bucket left open by the previous block
+        start = 0
+        if self.partial_count:
+            start = min(n, self.bucket - self.partial_count)
+            self.partial[..., self.partial_count : self.partial_count + start] = values[..., :start]
+            self.partial_count += start
+            if self.partial_count < self.bucket:
+                return
+            self._push(self.partial[..., None, :])
+            self.partial_count = 0
+
+        # Whole buckets in one reshape; only the newest `buckets` can be seen
+        full = (n - start) // self.bucket
+        first = start + max(0, full - self.buckets) * self.bucket
+        end = start + full * self.bucket
+        if end > first:
+            shape = values.shape[:-1] + (-1, self.bucket)
+            self._push(values[..., first:end].reshape(shape))
+
+        rest = n - end
+        self.partial[..., :rest] = values[..., end:]
+        self.partial_count = rest
+
+    def xy(self):
+        """(x, y) of the envelope polyline, oldest first (valid until the next call)"""
+        count = len(self.mins)
+        y = self.y[..., : 2 * count]
+        y[..., 0::2] = self.mins.view()
+        y[..., 1::2] = self.maxs.view()
+        return self.x[: 2 * count], y
+
+    def band(self):
+        """(..., 2 * buckets, 2) vertices of the closed min/max band (valid until the next call)"""
+        count = len(self.mins)
+        vertices = self.vertices[..., : 2 * count, :]
+        if count != self.band_count:
+            # x only changes while the window fills up
+            steps = self.x[0::2]
+            vertices[..., :count, 0] = steps[:count]
+            vertices[..., count:, 0] = steps[count - 1 :: -1] if count else steps[:0]
+            self.band_count = count
+        vertices[..., :count, 1] = self.maxs.view()
+        vertices[..., count:, 1] = self.mins.view()[..., ::-1]
+        return vertices
+
+    def add_artist(self, ax, color, linewidth=0.8, label=None):
+        """Filled band artist for one channel - the edge keeps flat stretches visible"""
+        band = Polygon(np.zeros((0, 2)), closed=True, facecolor=color, edgecolor=color,
+                       linewidth=linewidth, label=label)
+        ax.add_patch(band)
+        return band
+
+    def update_artists(self, artists):
+        """Point the add_artist() artists (one per channel) at the current data"""
+        vertices = self.band()
+        for artist, channel in zip(artists, vertices if self.channels is not None else (vertices,)):
+            artist.set_xy(channel)
+
+
+class RawWindow:
+    """Same interface as MinMaxEnvelope for windows short enough to draw every sample"""
+
+    def __init__(self, capacity, channels=None, dtype=np.int16):
+        self.capacity = capacity
+        self.channels = channels
+        self.history = HistoryBuffer(capacity, dtype, channels)
+        self.x = np.arange(capacity)
+
+    def __len__(self):
+        return len(self.history)
+
+    def clear(self):
+        self.history.clear()
+
+    def extend(self, values):
+        self.history.extend(values)
+
+    def xy(self):
+        count = len(self.history)
+        return self.x[:count], self.history.view()
+
+    def add_artist(self, ax, color, linewidth=0.8, label=None):
+        (line,) = ax.plot([], [], color=color, linewidth=linewidth, label=label)
+        return line
+
+    def update_artists(self, artists):
+        x, data = self.xy()
+        for artist, values in zip(artists, data if self.channels is not None else (data,)):
+            artist.set_data(x, values)
+
+
+def plot_window(capacity, columns, channels=None, dtype=np.int16):
+    """
+    Live plot data for the newest `capacity` samples across `columns` pixels.
+
+    Up to two samples per pixel column are drawn as they are; longer windows
+    are reduced to a MinMaxEnvelope.
+    """
+    if capacity <= 2 * columns:
+        return RawWindow(capacity, channels, dtype)
+    return MinMaxEnvelope(capacity, columns, channels, dtype)
+
+
+def plot_columns(ax):
+    """Width of an axes in device pixels - the useful envelope resolution"""
+    return max(1, int(ax.get_window_extent().width))
@@ -0,0 +1,259 @@
+import math
+import numpy as np
+from scipy import signal
+
+# --- Headless FIR design API ---
+# design(FirSpec(...)) returns a FirDesign holding float and fixed-point
+# coefficients. Frequency responses, plots and coefficient files are only
+# computed when asked for, so the designer can run thousands of times in a
+# sweep without touching matplotlib.
+
+
+class FirSpec:
+    """
+    Everything that determines a filter design.
+
+    cutoff is a single edge in Hz or a list of edges for band filters.
+    cutoff_scale multiplies the edges before design (fir_designer16.py uses
+    0.82 to pull the -3 dB point onto the nominal cutoff). method is 'firwin'
+    (windowed, uses `window`) or 'remez' (equiripple, uses `transition` Hz).
+    """
+
+    def __init__(self, fs=25000, cutoff=1100, taps=51, window="hamming",
+                 pass_zero="highpass", cutoff_scale=1.0, coeff_bits=16,
+                 method="firwin", transition=None, worN=8000):
+        self.fs = fs
+        self.cutoff = cutoff
+        self.taps = taps
+        self.window = window
+        self.pass_zero = pass_zero
+        self.cutoff_scale = cutoff_scale
+        self.coeff_bits = coeff_bits
+        self.method = method
+        self.transition = transition
+        self.worN = worN
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def edges(self):
+        """Scaled band edges in Hz"""
+        return np.atleast_1d(np.asarray(self.cutoff, dtype=np.float64)) * self.cutoff_scale
+
+    def normalized_cutoff(self):
+        """Edges normalized to Nyquist (0 to 1), as firwin expects"""
+        edges = self.edges() / (self.fs / 2)
+        return float(edges[0]) if np.isscalar(self.cutoff) else edges
+
+    def __repr__(self):
+        args = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"FirSpec({args})"
+
+
+class FirDesign:
+    """Result of design(): coefficients plus lazily computed analysis stages"""
+
+    def __init__(self, spec, coefficients):
+        self.spec = spec
+        self.coefficients = coefficients
+
+        # Fixed-point version for the FPGA
+        self.scale_factor = 2 ** (spec.coeff_bits - 1) - 1
+        fixed = np.round(coefficients * self.scale_factor).astype(np.int64)
+        self.fixed_coefficients = np.clip(fixed, -2 ** (spec.coeff_bits - 1),
+                                          2 ** (spec.coeff_bits - 1) - 1)
+
+        self._response = None
+        self.from_cache = False  # Set by DesignCache.get()
+
+    @property
+    def taps(self):
+        return len(self.coefficients)
+
+    def quantized_float(self):
+        """Fixed-point coefficients converted back to float"""
+        return self.fixed_coefficients.astype(np.float64) / self.scale_factor
+
+    def quantization_error(self):
+        return self.coefficients - self.quantized_float()
+
+    def quantization_stats(self):
+        """(max |coeff|, dynamic range utilization %, SNR dB, RMS error)"""
+        error = self.quantization_error()
+        rms = np.sqrt(np.mean(error ** 2))
+        max_coeff = np.max(np.abs(self.coefficients))
+        utilization = max_coeff * 100
+        snr_db = 20 * np.log10(self.scale_factor) - 20 * np.log10(rms) if rms > 0 else np.inf
+        return max_coeff, utilization, snr_db, rms
+
+    def response(self):
+        """(frequencies Hz, float response, fixed-point response), cached"""
+        if self._response is None:
+            w, h = signal.freqz(self.coefficients, worN=self.spec.worN)
+            _, h_fixed = signal.freqz(self.quantized_float(), worN=self.spec.worN)
+            self._response = (w * self.spec.fs / (2 * np.pi), h, h_fixed)
+        return self._response
+
+    def plot(self, filename=None, show=False, dpi=300, xlim=10000):
+        """Magnitude and phase comparison plot; matplotlib is only imported here"""
+        import matplotlib.pyplot as plt
+
+        frequencies, h, h_fixed = self.response()
+        fc = self.spec.cutoff
+        fixed_label = f"{self.spec.coeff_bits}-bit Fixed Point"
+
+        fig = plt.figure(figsize=(15, 10))
+
+        # Magnitude response
+        plt.subplot(1, 2, 1)
+        plt.plot(frequencies, 20 * np.log10(abs(h)), 'b-', label='Floating Point', linewidth=2)
+        plt.plot(frequencies, 20 * np.log10(abs(h_fixed)), 'r--', label=fixed_label, linewidth=1)
+        plt.axvline(fc, color='g', linestyle='--', label=f'Cutoff: {fc} Hz')
+        plt.axhline(-3, color='orange', linestyle='--', label='-3 dB')
+        plt.xlabel('Frequency (Hz)')
+        plt.ylabel('Magnitude (dB)')
+        plt.title('FIR Filter Frequency Response - Magnitude Comparison')
+        plt.grid(True)
+        plt.legend()
+        plt.xlim(0, xlim)
+
+        # Phase response
+        plt.subplot(1, 2, 2)
+        plt.plot(frequencies, np.angle(h) * 180 / np.pi, 'b-', label='Floating Point', linewidth=2)
+        plt.plot(frequencies, np.angle(h_fixed) * 180 / np.pi, 'r--', label=fixed_label, linewidth=1)
+        plt.axvline(fc, color='g', linestyle='--', label=f'Cutoff: {fc} Hz')
+        plt.xlabel('Frequency (Hz)')
+        plt.ylabel('Phase (degrees)')
+        plt.title('FIR Filter Frequency Response - Phase Comparison')
+        plt.grid(True)
+        plt.legend()
+        plt.xlim(0, xlim)
+
+        plt.tight_layout()
+        if filename:
+            plt.savefig(filename, dpi=dpi, bbox_inches='tight')
+        if show:
+            plt.show()
+        else:
+            plt.close(fig)
+
+    def hex_coefficients(self):
+        """Two's complement hex strings of the fixed-point coefficients"""
+        bits = self.spec.coeff_bits
+        digits = (bits + 3) // 4
+        return [f"{int(c) % (1 << bits):0{digits}X}" for c in self.fixed_coefficients]
+
+    def write_vhdl_constants(self, filename):
+        """Write the `CONSTANT coeffs` table used by FIR.vhd"""
+        with open(filename, 'w') as f:
+            f.write("CONSTANT coeffs : coeff_array_t := (\n")
+            hex_values = self.hex_coefficients()
+            for i, coeff_val in enumerate(self.fixed_coefficients):
+                # Add a comma only for all but the last item
+                comma = "," if i < self.taps - 1 else ""
+                f.write(f"  {i} => x\"{hex_values[i]}\"{comma} -- {int(coeff_val):d}\n")
+            f.write(");\n")
+
+    def write_verilog(self, filename, input_bits=12):
+        """Write Verilog parameters and a combinational MAC for the coefficients"""
+        spec = self.spec
+        bits = spec.coeff_bits
+        hex_values = self.hex_coefficients()
+
+        with open(filename, 'w') as f:
+            f.write(f"// FIR Filter Coefficients ({bits}-bit)\n")
+            f.write(f"// Sampling Rate: {spec.fs} Hz\n")
+            f.write(f"// Cutoff Frequency: {spec.cutoff} Hz\n")
+            f.write(f"// Filter Order: {spec.taps}\n")
+            f.write(f"// Number of Taps: {self.taps}\n")
+            f.write(f"// Scale Factor: 2^{bits - 1} - 1 = {self.scale_factor}\n\n")
+
+            f.write(f"parameter taps = {self.taps};\n")
+            f.write(f"parameter input_size = {input_bits};\n")
+            output_size = bits + input_bits + math.ceil(np.log2(self.taps))
+            f.write(f"parameter output_size = {output_size};\n")
+
+            # Write parameter declarations in copy-paste friendly format
+            f.write(f"// FIR coefficients ({self.taps} taps) - {bits}-bit coefficients\n")
+
+            # Group coefficients in sets of 4 for better readability
+            for i in range(0, self.taps, 4):
+                params = [f"h{j:<2} = {bits}'h{hex_values[j]}"
+                          for j in range(i, min(i + 4, self.taps))]
+                f.write(f"parameter signed [{bits - 1}:0] " + ", ".join(params) + ";\n")
+
+            f.write("\n")
+
+            f.write("reg [input_size-1:0] FIR [1:taps-1];\n")
+            f.write(f"wire signed [{input_bits - 1}:0] data_in_signed = data_in - {input_bits}'d{1 << (input_bits - 1)};\n")
+
+            # Write MAC operation in copy-paste friendly format
+            f.write("// Combinational MAC operation\n")
+            f.write("wire signed [output_size-1:0] mac_result;\n")
+            f.write("assign mac_result = ")
+
+            mac_terms = ["h0  * data_in_signed"]
+            mac_terms += [f"h{i:<2} * FIR[{i}]" for i in range(1, self.taps)]
+
+            # Format MAC operation with proper line breaks
+            for i, term in enumerate(mac_terms):
+                if i == 0:
+                    f.write(f"{term} +\n")
+                elif i == len(mac_terms) - 1:
+                    f.write(f"                        {term};\n")
+                else:
+                    f.write(f"                        {term} +\n")
+
+    def print_summary(self, num_coeffs=10):
+        """Print the design information the designer scripts report"""
+        spec = self.spec
+        print(f"FIR Filter Design:")
+        print(f"Sampling Rate: {spec.fs} Hz")
+        print(f"Cutoff Frequency: {spec.cutoff} Hz")
+        print(f"Filter Order: {spec.taps}")
+        print(f"Number of Taps: {self.taps}")
+        print(f"Normalized Cutoff: {spec.normalized_cutoff():.4f}")
+
+        print(f"\nFIR Coefficients (floating point, first {num_coeffs}):")
+        for i in range(min(num_coeffs, self.taps)):
+            print(f"h[{i}] = {self.coefficients[i]:.8f}")
+
+        bits = spec.coeff_bits
+        print(f"\nFixed-Point Coefficients ({bits}-bit):")
+        for i, hex_val in enumerate(self.hex_coefficients()):
+            print(f"coeff[{i:3d}] = {bits}'h{hex_val};  // {self.coefficients[i]:12.8f}")
+
+    def print_quantization(self):
+        max_coeff, utilization, snr_db, rms = self.quantization_stats()
+        print(f"\n{self.spec.coeff_bits}-bit Fixed-Point Analysis:")
+        print(f"Scale Factor: {self.scale_factor}")
+        print(f"Maximum coefficient magnitude: {max_coeff:.8f}")
+        print(f"Dynamic range utilization: {utilization:.1f}%")
+        print(f"Quantization SNR: {snr_db:.1f} dB")
+        print(f"RMS quantization error: {rms:.2e}")
+
+
+def design_coefficients(spec):
+    """Float coefficients for a spec (no quantization, no analysis)"""
+    if spec.method == "firwin":
+        return signal.firwin(spec.taps, spec.normalized_cutoff(), window=spec.window,
+                             pass_zero=spec.pass_zero)
+
+    if spec.method == "remez":
+        if spec.transition is None:
+            raise ValueError("remez design needs a transition width")
+        edges = spec.edges()
+        nyquist = spec.fs / 2
+        highpass = spec.pass_zero in (False, "highpass")
+        if len(edges) != 1:
+            raise ValueError("remez design supports a single cutoff edge")
+        bands = [0, edges[0] - spec.transition / 2, edges[0] + spec.transition / 2, nyquist]
+        desired = [0, 1] if highpass else [1, 0]
+        return signal.remez(spec.taps, bands, desired, fs=spec.fs)
+
+    raise ValueError(f"Unknown design method {spec.method!r}")
+
+
+def design(spec):
+    """Design a filter for spec and return a FirDesign"""
+    return FirDesign(spec, design_coefficients(spec))
@@ -0,0 +1,478 @@
+import sys
+import numpy as np
+
+from fir_headroom import HeadroomAnalysis, signed_bits
+from fir_model import (FirModel, FoldedFirModel, fold_coefficients, polyphase_components,
+                       MacCycleModel, load_vhdl_coefficients, INPUT_BITS, OUT_LSB,
+                       CLOCKS_PER_SAMPLE)
+
+# --- VHDL generation for the FIR datapath ---
+# FirHdl turns a coefficient set (or a fir_design result) into a complete FIR
+# entity with the FIR.vhd port list (clk, reset_n, sample_enable, data_in,
+# data_out), so any architecture can replace fir_inst in FP_VHDL.vhd:
+#   parallel  one multiplier per tap, single combinational sum (FIR.vhd)
+#   folded    symmetric taps pre-added, half the multipliers
+#   tree      pairwise adder tree with a configurable number of pipeline stages
+#   mac       one multiplier, coefficient ROM and circular sample RAM, taps + 3
+#             clocks per sample (fir_model.MacCycleModel)
+# Every architecture has a bit-exact counterpart in fir_model.py (FirHdl.model).
+#
+# The +-2048 offsets are written as an MSB inversion, which is the same
+# operation modulo 2^12 without the integer-to-vector truncation warning.
+
+ARCHITECTURES = ("parallel", "folded", "tree", "mac")
+
+HEADER_TEMPLATE = """\
+-- Generated by fir_hdl.py - edit the design script, not this file.
+-- {title}: {taps} taps, {multipliers}, {coeff_bits}-bit coefficients,
+-- {acc_bits}-bit accumulator, data_out = sum({out_msb} DOWNTO {out_lsb}) + {offset}
+LIBRARY ieee;
+USE ieee.std_logic_1164.ALL;
+USE ieee.numeric_std.ALL;
+
+ENTITY {entity} IS
+  PORT (
+    clk : IN STD_LOGIC;
+    reset_n : IN STD_LOGIC;
+    sample_enable : IN STD_LOGIC;
+    data_in : IN STD_LOGIC_VECTOR({input_msb} DOWNTO 0);
+    data_out : OUT STD_LOGIC_VECTOR({out_port_msb} DOWNTO 0)
+  );
+END ENTITY {entity};
+
+ARCHITECTURE {architecture} OF {entity} IS
+  CONSTANT TAPS_COUNT : INTEGER := {taps};
+  CONSTANT DATA_WIDTH : INTEGER := {input_bits};
+  CONSTANT COEFF_WIDTH : INTEGER := {coeff_bits};
+  CONSTANT ACC_WIDTH : INTEGER := {acc_bits};
+{constants}
+  TYPE coeff_array_t IS ARRAY (0 TO {coeff_last}) OF SIGNED(COEFF_WIDTH - 1 DOWNTO 0);
+  CONSTANT coeffs : coeff_array_t := (
+{coeff_table}
+  );
+
+{signals}
+  SIGNAL sum : SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+
+BEGIN
+{mac}
+  -- Rescale output: sum({out_msb} DOWNTO {out_lsb}) + {offset}
+  data_out <= (NOT sum({out_msb})) & STD_LOGIC_VECTOR(sum({out_msb_1} DOWNTO {out_lsb}));
+
+END ARCHITECTURE {architecture};
+"""
+
+SHIFTER_SIGNALS = """\
+  TYPE tap_array_t IS ARRAY (0 TO TAPS_COUNT - 1) OF SIGNED(DATA_WIDTH - 1 DOWNTO 0);
+  SIGNAL taps : tap_array_t := (OTHERS => (OTHERS => '0'));
+"""
+
+SHIFTER_TEMPLATE = """\
+  -- Shifter
+  shift_reg_proc : PROCESS (clk, reset_n)
+  BEGIN
+    IF reset_n = '0' THEN
+      taps <= (OTHERS => (OTHERS => '0'));
+    ELSIF rising_edge(clk) THEN
+      IF sample_enable = '1' THEN
+        taps(1 TO TAPS_COUNT - 1) <= taps(0 TO TAPS_COUNT - 2);
+        -- data_in - {offset}
+        taps(0) <= SIGNED((NOT data_in(DATA_WIDTH - 1)) & data_in(DATA_WIDTH - 2 DOWNTO 0));
+      END IF;
+    END IF;
+  END PROCESS shift_reg_proc;
+
+"""
+
+PARALLEL_TEMPLATE = """\
+  -- MAC (Multiply Accumulate Unit): one multiplier per tap, combinational sum
+  mac_proc : PROCESS (taps)
+    VARIABLE product : SIGNED(DATA_WIDTH + COEFF_WIDTH - 1 DOWNTO 0);
+    VARIABLE acc : SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+  BEGIN
+    acc := (OTHERS => '0');
+    FOR i IN 0 TO TAPS_COUNT - 1 LOOP
+      product := taps(i) * coeffs(i);
+      acc := acc + {product_to_acc};
+    END LOOP;
+    sum <= acc;
+  END PROCESS mac_proc;
+"""
+
+FOLDED_TEMPLATE = """\
+  -- Folded MAC: taps(i) + taps(TAPS_COUNT-1-i) share one multiplier
+  mac_proc : PROCESS (taps)
+    VARIABLE pre : SIGNED(DATA_WIDTH DOWNTO 0);
+    VARIABLE product : SIGNED(DATA_WIDTH + COEFF_WIDTH DOWNTO 0);
+    VARIABLE acc : SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+  BEGIN
+    acc := (OTHERS => '0');
+    FOR i IN 0 TO HALF_COUNT - 1 LOOP
+      pre := resize(taps(i), DATA_WIDTH + 1) + resize(taps(TAPS_COUNT - 1 - i), DATA_WIDTH + 1);
+      product := pre * coeffs(i);
+      acc := acc + {product_to_acc};
+    END LOOP;
+{center_term}    sum <= acc;
+  END PROCESS mac_proc;
+"""
+
+FOLDED_CENTER_TEMPLATE = """\
+    -- Centre tap (odd length) has no partner
+    pre := resize(taps(HALF_COUNT), DATA_WIDTH + 1);
+    product := pre * coeffs(HALF_COUNT);
+    acc := acc + {product_to_acc};
+"""
+
+TREE_TEMPLATE = """\
+  -- Adder tree: products, then {levels} levels of pairwise adds. {stages} of the {points}
+  -- level outputs are registered; sum is valid {stages} clocks after a shift
+{combinational}{registered}
+  sum <= level{last}(0);
+"""
+
+TREE_FUNCTIONS = """\
+  -- Product reduced to ACC_WIDTH bits (modulo 2^ACC_WIDTH, like the plain sum)
+  FUNCTION to_acc(p : SIGNED) RETURN SIGNED IS
+    VARIABLE wide : SIGNED(p'LENGTH + ACC_WIDTH - 1 DOWNTO 0);
+  BEGIN
+    wide := resize(p, p'LENGTH + ACC_WIDTH);
+    RETURN wide(ACC_WIDTH - 1 DOWNTO 0);
+  END FUNCTION to_acc;
+
+  TYPE sum_array_t IS ARRAY (NATURAL RANGE <>) OF SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+"""
+
+TREE_PROCESS_TEMPLATE = """\
+  tree_proc : PROCESS (clk, reset_n)
+  BEGIN
+    IF reset_n = '0' THEN
+{reset}
+    ELSIF rising_edge(clk) THEN
+{body}
+    END IF;
+  END PROCESS tree_proc;
+"""
+
+
+MAC_TEMPLATE = """\
+  -- Time-multiplexed MAC: one product per clock. On sample_enable the new
+  -- sample is written to the circular RAM, then taps(i) (the sample written i
+  -- samples ago) and coeffs(i) are read for i = 0 .. TAPS_COUNT-1 and summed.
+  -- sum updates TAPS_COUNT + 2 clocks after sample_enable, so sample_enable
+  -- must be at least TAPS_COUNT + 3 clocks apart.
+  mac_proc : PROCESS (clk, reset_n)
+    VARIABLE product : SIGNED(DATA_WIDTH + COEFF_WIDTH - 1 DOWNTO 0);
+  BEGIN
+    IF reset_n = '0' THEN
+      wr_ptr <= (OTHERS => '0');
+      filled <= 0;
+      tap <= TAPS_COUNT;
+      term_q <= '0';
+      last_q <= '0';
+      done <= '0';
+      acc <= (OTHERS => '0');
+      sum <= (OTHERS => '0');
+    ELSIF rising_edge(clk) THEN
+      -- Stage 1: store a new sample, or read the next sample/coefficient pair
+      term_q <= '0';
+      last_q <= '0';
+      IF sample_enable = '1' THEN
+        -- data_in - {offset}
+        samples(to_integer(wr_ptr)) <= SIGNED((NOT data_in(DATA_WIDTH - 1)) & data_in(DATA_WIDTH - 2 DOWNTO 0));
+        wr_ptr <= wr_ptr + 1;
+        IF filled < TAPS_COUNT THEN
+          filled <= filled + 1;
+        END IF;
+        tap <= 0;
+        acc <= (OTHERS => '0');
+      ELSIF tap < TAPS_COUNT THEN
+        sample_q <= samples(to_integer(wr_ptr - 1 - tap));
+        coeff_q <= coeffs(tap);
+        -- Taps older than the last reset are zero, as in the shift register
+        IF tap < filled THEN
+          term_q <= '1';
+        END IF;
+        IF tap = TAPS_COUNT - 1 THEN
+          last_q <= '1';
+        END IF;
+        tap <= tap + 1;
+      END IF;
+
+      -- Stage 2: accumulate
+      IF term_q = '1' THEN
+        product := sample_q * coeff_q;
+        acc <= acc + {product_to_acc};
+      END IF;
+
+      -- Stage 3: publish the finished sum
+      done <= last_q;
+      IF done = '1' THEN
+        sum <= acc;
+      END IF;
+    END IF;
+  END PROCESS mac_proc;
+"""
+
+MAC_SIGNALS = """\
+  TYPE sample_ram_t IS ARRAY (0 TO RAM_DEPTH - 1) OF SIGNED(DATA_WIDTH - 1 DOWNTO 0);
+  SIGNAL samples : sample_ram_t := (OTHERS => (OTHERS => '0'));
+  SIGNAL wr_ptr : UNSIGNED(ADDR_WIDTH - 1 DOWNTO 0);
+  SIGNAL filled : INTEGER RANGE 0 TO TAPS_COUNT;  -- Samples written since reset
+  SIGNAL tap : INTEGER RANGE 0 TO TAPS_COUNT;     -- TAPS_COUNT = idle
+  SIGNAL sample_q : SIGNED(DATA_WIDTH - 1 DOWNTO 0);
+  SIGNAL coeff_q : SIGNED(COEFF_WIDTH - 1 DOWNTO 0);
+  SIGNAL term_q, last_q, done : STD_LOGIC;
+  SIGNAL acc : SIGNED(ACC_WIDTH - 1 DOWNTO 0);
+"""
+
+
+def plural(count, word):
+    return f"{count} {word}" + ("" if count == 1 else "s")
+
+
+def to_hex(value, bits):
+    """Two's complement hex digits of value"""
+    return f"{int(value) % (1 << bits):0{(bits + 3) // 4}X}"
+
+
+def coefficient_table(coeffs, bits, indent="    "):
+    """`i => x"...", -- value` lines as used in FIR.vhd's coeffs constant"""
+    lines = []
+    for i, value in enumerate(coeffs):
+        comma = "," if i < len(coeffs) - 1 else ""
+        lines.append(f"{indent}{i} => x\"{to_hex(value, bits)}\"{comma} -- {int(value):d}")
+    return "\n".join(lines)
+
+
+def fit_product(product_bits, acc_bits):
+    """VHDL expression reducing `product` to the accumulator width modulo 2^acc_bits"""
+    if product_bits >= acc_bits:
+        return "product(ACC_WIDTH - 1 DOWNTO 0)"
+    return "resize(product, ACC_WIDTH)"
+
+
+def tree_levels(count):
+    """Number of inputs at each level of a pairwise adder tree, down to 1"""
+    sizes = [count]
+    while sizes[-1] > 1:
+        sizes.append((sizes[-1] + 1) // 2)
+    return sizes
+
+
+def register_points(levels, stages=None):
+    """
+    Tree outputs (0 = products, k = adder level k) followed by a register.
+
+    `stages` registers are spread evenly over the levels + 1 outputs, the last
+    one always at the root; None registers every output.
+    """
+    points = levels + 1
+    stages = points if stages is None else stages
+    if not 0 <= stages <= points:
+        raise ValueError(f"A {levels}-level tree takes 0 to {points} pipeline stages, not {stages}")
+    return {round((j + 1) * points / stages) - 1 for j in range(stages)}
+
+
+def tree_level_lines(k, sizes, indent, loop):
+    """VHDL computing level k of the tree, as a process loop or a generate"""
+    lines = []
+    if k == 0:
+        target, expr, count = "level0(i)", "to_acc(taps(i) * coeffs(i))", sizes[0]
+    else:
+        target, expr, count = f"level{k}(i)", f"level{k - 1}(2 * i) + level{k - 1}(2 * i + 1)", sizes[k - 1] // 2
+
+    if loop:
+        lines.append(f"{indent}FOR i IN 0 TO {count - 1} LOOP")
+        lines.append(f"{indent}  {target} <= {expr};")
+        lines.append(f"{indent}END LOOP;")
+    else:
+        lines.append(f"{indent}level{k}_gen : FOR i IN 0 TO {count - 1} GENERATE")
+        lines.append(f"{indent}  {target} <= {expr};")
+        lines.append(f"{indent}END GENERATE level{k}_gen;")
+    if k > 0 and sizes[k - 1] % 2:
+        lines.append(f"{indent}level{k}({count}) <= level{k - 1}({sizes[k - 1] - 1});  -- Odd one out")
+    return lines
+
+
+def write_folded_constants(coeffs, filename, bits=16):
+    """Folded coefficient table: entry i multiplies taps(i) + taps(N-1-i)"""
+    half, center = fold_coefficients(coeffs)
+    values = list(half) + ([center] if center is not None else [])
+    with open(filename, "w") as f:
+        f.write(f"-- Folded coefficients: {len(coeffs)} taps, {len(values)} multipliers\n")
+        if center is not None:
+            f.write(f"-- Entry {len(half)} is the centre tap and is not pre-added\n")
+        f.write("CONSTANT coeffs : coeff_array_t := (\n")
+        f.write(coefficient_table(values, bits, indent="  ") + "\n")
+        f.write(");\n")
+
+
+def write_polyphase_constants(coeffs, factor, filename, bits=16):
+    """Polyphase sub-filters for decimation by factor, one constant per phase"""
+    components = polyphase_components(coeffs, factor)
+    length = components.shape[1]
+    with open(filename, "w") as f:
+        f.write(f"-- Polyphase decomposition of {len(coeffs)} taps for decimation by {factor}\n")
+        f.write(f"-- Phase k holds h[k], h[k+{factor}], ... ({length} coefficients, zero padded)\n")
+        f.write(f"TYPE phase_array_t IS ARRAY (0 TO {length - 1}) OF STD_LOGIC_VECTOR({bits - 1} DOWNTO 0);\n")
+        for k, component in enumerate(components):
+            f.write(f"CONSTANT phase{k} : phase_array_t := (\n")
+            f.write(coefficient_table(component, bits, indent="  ") + "\n")
+            f.write(");\n")
+
+
+class FirHdl:
+    """
+    VHDL generator for one coefficient set.
+
+    Widths not given are derived from the coefficients: the coefficient width
+    from the largest magnitude, the accumulator from the worst-case sum
+    (fir_headroom) but at least wide enough for the output slice. out_lsb
+    sets the filter gain, as sum(26 DOWNTO 15) does in FIR.vhd.
+    """
+
+    def __init__(self, coeffs, coeff_bits=None, input_bits=INPUT_BITS, out_bits=None,
+                 out_lsb=OUT_LSB, acc_bits=None, entity="fir_filter", pipeline_stages=None,
+                 clocks_per_sample=CLOCKS_PER_SAMPLE):
+        self.coeffs = np.asarray(coeffs, dtype=np.int64)
+        self.taps = len(self.coeffs)
+        self.coeff_bits = coeff_bits or signed_bits(int(self.coeffs.min()), int(self.coeffs.max()))
+        self.input_bits = input_bits
+        self.out_bits = out_bits or input_bits
+        self.out_lsb = out_lsb
+        self.out_msb = out_lsb + self.out_bits - 1
+        worst_bits = HeadroomAnalysis(self.coeffs, input_bits=input_bits).worst_bits
+        self.acc_bits = acc_bits or max(worst_bits, self.out_msb + 1)
+        self.entity = entity
+        self.pipeline_stages = pipeline_stages  # 'tree' only, None = register every level
+        self.clocks_per_sample = clocks_per_sample
+
+    @classmethod
+    def from_design(cls, design, **kwargs):
+        """Generator for a fir_design.FirDesign result"""
+        return cls(design.fixed_coefficients, coeff_bits=design.spec.coeff_bits, **kwargs)
+
+    def pipeline_clocks(self, architecture="parallel"):
+        """Clocks between a tap shift and the matching sum"""
+        if architecture == "tree":
+            return len(register_points(len(tree_levels(self.taps)) - 1, self.pipeline_stages))
+        if architecture == "mac":
+            return self.taps + 2
+        return 0
+
+    def check_rate(self, architecture="parallel"):
+        """Raise ValueError if the datapath cannot keep up with clocks_per_sample"""
+        if architecture == "mac" and self.clocks_per_sample < self.taps + 3:
+            raise ValueError(f"The time-multiplexed MAC needs {self.taps + 3} clocks per sample, "
+                             f"only {self.clocks_per_sample} are available")
+
+    def model(self, architecture="parallel"):
+        """The bit-exact fir_model counterpart of an architecture, latency included"""
+        model_class = FoldedFirModel if architecture == "folded" else FirModel
+        return model_class(self.coeffs, acc_bits=self.acc_bits, out_msb=self.out_msb,
+                           out_lsb=self.out_lsb, input_bits=self.input_bits,
+                           pipeline_clocks=self.pipeline_clocks(architecture),
+                           clocks_per_sample=self.clocks_per_sample)
+
+    def multipliers(self, architecture="parallel"):
+        if architecture == "folded":
+            return self.model("folded").multipliers
+        if architecture == "mac":
+            return 1
+        return self.taps
+
+    def _parallel(self):
+        product_bits = self.input_bits + self.coeff_bits
+        mac = PARALLEL_TEMPLATE.format(product_to_acc=fit_product(product_bits, self.acc_bits))
+        return "Parallel FIR", self.coeffs, "", "", mac
+
+    def _folded(self):
+        half, center = fold_coefficients(self.coeffs)
+        values = list(half) + ([center] if center is not None else [])
+        product_to_acc = fit_product(self.input_bits + 1 + self.coeff_bits, self.acc_bits)
+        center_term = ""
+        if center is not None:
+            center_term = FOLDED_CENTER_TEMPLATE.format(product_to_acc=product_to_acc)
+        mac = FOLDED_TEMPLATE.format(product_to_acc=product_to_acc, center_term=center_term)
+        constants = f"  CONSTANT HALF_COUNT : INTEGER := {len(half)};  -- Pre-added tap pairs\n"
+        return "Symmetry-folded FIR", np.array(values), constants, "", mac
+
+    def _tree(self):
+        sizes = tree_levels(self.taps)
+        levels = len(sizes) - 1
+        registered = register_points(levels, self.pipeline_stages)
+
+        signals = [f"  SIGNAL level{k} : sum_array_t(0 TO {n - 1});" for k, n in enumerate(sizes)]
+        combinational, body, reset = [], [], []
+        for k in range(len(sizes)):
+            if k in registered:
+                body += tree_level_lines(k, sizes, "      ", loop=True)
+                reset.append(f"      level{k} <= (OTHERS => (OTHERS => '0'));")
+            else:
+                combinational += tree_level_lines(k, sizes, "  ", loop=False)
+
+        process = ""
+        if registered:
+            process = TREE_PROCESS_TEMPLATE.format(reset="\n".join(reset), body="\n".join(body))
+        mac = TREE_TEMPLATE.format(
+            levels=levels, points=levels + 1, stages=len(registered), last=levels,
+            combinational="\n".join(combinational) + "\n\n" if combinational else "",
+            registered=process,
+        )
+        return ("Pipelined adder-tree FIR", self.coeffs, "",
+                TREE_FUNCTIONS + "\n".join(signals) + "\n", mac)
+
+    def _mac(self):
+        addr_bits = max(1, (self.taps - 1).bit_length())
+        constants = (f"  CONSTANT ADDR_WIDTH : INTEGER := {addr_bits};\n"
+                     f"  CONSTANT RAM_DEPTH : INTEGER := {1 << addr_bits};  -- Circular sample buffer\n")
+        product_to_acc = fit_product(self.input_bits + self.coeff_bits, self.acc_bits)
+        mac = MAC_TEMPLATE.format(offset=1 << (self.input_bits - 1), product_to_acc=product_to_acc)
+        return "Time-multiplexed MAC FIR", self.coeffs, constants, MAC_SIGNALS, mac
+
+    def vhdl(self, architecture="parallel"):
+        """Complete VHDL source of the entity for one of ARCHITECTURES"""
+        if architecture not in ARCHITECTURES:
+            raise ValueError(f"Unknown architecture {architecture!r}, expected one of {ARCHITECTURES}")
+        self.check_rate(architecture)
+        title, table, constants, signals, mac = getattr(self, f"_{architecture}")()
+        if architecture != "mac":
+            # Everything but the MAC reads the taps from a shift register
+            signals = SHIFTER_SIGNALS + ("\n" + signals if signals else "")
+            mac = SHIFTER_TEMPLATE.format(offset=1 << (self.input_bits - 1)) + mac
+
+        return HEADER_TEMPLATE.format(
+            title=title, entity=self.entity, architecture="rtl" if architecture == "parallel" else architecture,
+            taps=self.taps, multipliers=plural(self.multipliers(architecture), "multiplier"),
+            coeff_bits=self.coeff_bits,
+            input_bits=self.input_bits, input_msb=self.input_bits - 1, acc_bits=self.acc_bits,
+            out_port_msb=self.out_bits - 1, out_msb=self.out_msb, out_msb_1=self.out_msb - 1,
+            out_lsb=self.out_lsb, offset=1 << (self.input_bits - 1), constants=constants,
+            coeff_last=len(table) - 1, coeff_table=coefficient_table(table, self.coeff_bits),
+            signals=signals, mac=mac,
+        )
+
+    def write(self, filename, architecture="parallel"):
+        with open(filename, "w") as f:
+            f.write(self.vhdl(architecture))
+
+
+def main():
+    # Configuration: python fir_hdl.py [architecture] [output file]
+    SOURCE = 'fir_coefficients_16bit.txt'
+    SAMPLE_RATE = 25000
+    architecture = sys.argv[1] if len(sys.argv) > 1 else "parallel"
+    output_file = sys.argv[2] if len(sys.argv) > 2 else f'FIR_{architecture}.vhd'
+
+    entity = "fir_filter" if architecture == "parallel" else f"fir_filter_{architecture}"
+    hdl = FirHdl(load_vhdl_coefficients(SOURCE), entity=entity)
+    hdl.write(output_file, architecture)
+    print(f"{hdl.taps} taps from {SOURCE}: {hdl.coeff_bits}-bit coefficients, "
+          f"{hdl.acc_bits}-bit accumulator, {plural(hdl.multipliers(architecture), 'multiplier')}")
+    print(f"{architecture} FIR entity saved to '{output_file}'")
+    if architecture == "mac":
+        MacCycleModel(hdl.coeffs, hdl.acc_bits, hdl.out_msb, hdl.out_lsb).report(SAMPLE_RATE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import sys
+import numpy as np
+
+from fir_model import FirModel, load_vhdl_coefficients, INPUT_BITS
+
+# --- Headroom analysis for the FIR.vhd accumulator ---
+# The MAC is one combinational sum, so the hardware result is the true sum
+# modulo 2^ACC_BITS: intermediate overflow is harmless, only the final value
+# has to fit. data_out then keeps sum(OUT_MSB DOWNTO OUT_LSB), so the final
+# sum must also fit in OUT_MSB + 1 signed bits or the output wraps.
+
+
+def signed_bits(low, high):
+    """Smallest two's complement width holding every value in [low, high]"""
+    bits = 1
+    while low < -(1 << (bits - 1)) or high > (1 << (bits - 1)) - 1:
+        bits += 1
+    return bits
+
+
+class HeadroomAnalysis:
+    """
+    Accumulator growth of one coefficient set.
+
+    Computes the worst-case range over all 12-bit inputs, a k-sigma estimate
+    for full-scale random input, and optionally the range actually reached on
+    recorded ADC data, then recommends the accumulator width and output slice.
+    """
+
+    def __init__(self, coeffs, name="", out_bits=12, out_lsb=15, sigma=6.0,
+                 input_bits=INPUT_BITS):
+        self.name = name
+        self.coeffs = np.asarray(coeffs, dtype=np.int64)
+        self.out_bits = out_bits
+        self.out_lsb = out_lsb
+        self.sigma = sigma
+
+        in_min = -(1 << (input_bits - 1))
+        in_max = (1 << (input_bits - 1)) - 1
+        pos = self.coeffs[self.coeffs > 0].sum()
+        neg = self.coeffs[self.coeffs < 0].sum()
+
+        # Worst case: every tap at the extreme matching its coefficient's sign
+        self.worst_min = int(pos * in_min + neg * in_max)
+        self.worst_max = int(pos * in_max + neg * in_min)
+        self.worst_bits = signed_bits(self.worst_min, self.worst_max)
+
+        # Statistical: uniformly distributed full-scale input
+        input_std = (in_max - in_min + 1) / np.sqrt(12)
+        self.acc_std = float(input_std * np.sqrt(np.sum(self.coeffs.astype(np.float64) ** 2)))
+        # The sum can never leave the worst-case range, so the estimate is clamped to it
+        bound = int(np.ceil(self.sigma * self.acc_std))
+        self.stat_min = max(-bound, self.worst_min)
+        self.stat_max = min(bound, self.worst_max)
+        self.stat_clamped = self.stat_min > -bound or self.stat_max < bound
+        self.stat_bits = signed_bits(self.stat_min, self.stat_max)
+
+        self.observed_min = None
+        self.observed_max = None
+        self.observed_bits = None
+        self.observed_wraps = None
+
+    def observe(self, adc, block_size=1 << 20):
+        """Accumulator range reached when filtering recorded ADC data"""
+        model = FirModel(self.coeffs, acc_bits=62)  # Wide enough to never wrap
+        limit = 1 << (self.out_lsb + self.out_bits - 1)
+        low, high, wraps = 0, 0, 0
+        for start in range(0, len(adc), block_size):
+            history = adc[max(0, start - model.taps + 1) : start]
+            acc = model.accumulate(adc[start : start + block_size], history)
+            low = min(low, int(acc.min()))
+            high = max(high, int(acc.max()))
+            wraps += int(np.count_nonzero((acc < -limit) | (acc >= limit)))
+
+        self.observed_min = low
+        self.observed_max = high
+        self.observed_bits = signed_bits(low, high)
+        self.observed_wraps = wraps
+        return self
+
+    def slice_msb(self):
+        return self.out_lsb + self.out_bits - 1
+
+    def recommended(self):
+        """
+        (acc_bits, out_msb, out_lsb) that cannot wrap for any input.
+
+        The gain (out_lsb) is kept when the worst case fits the current slice;
+        otherwise the slice is moved up until it does, which lowers the gain.
+        """
+        out_lsb = max(self.out_lsb, self.worst_bits - self.out_bits)
+        out_msb = out_lsb + self.out_bits - 1
+        return out_msb + 1, out_msb, out_lsb
+
+    def report(self, acc_bits=None):
+        """Print the analysis, optionally checked against the current acc_bits"""
+        msb = self.slice_msb()
+        print(f"=== {self.name or 'coefficients'} ({len(self.coeffs)} taps) ===")
+        print(f"Worst-case sum: [{self.worst_min}, {self.worst_max}] -> {self.worst_bits} bits")
+        if self.stat_clamped:
+            print(f"{self.sigma:.0f}-sigma sum (full-scale noise): beyond the worst case, no saving")
+        else:
+            print(f"{self.sigma:.0f}-sigma sum (full-scale noise): [{self.stat_min}, {self.stat_max}] "
+                  f"-> {self.stat_bits} bits")
+        if self.observed_bits is not None:
+            print(f"Observed sum: [{self.observed_min}, {self.observed_max}] -> {self.observed_bits} bits, "
+                  f"{self.observed_wraps} samples outside sum({msb} DOWNTO {self.out_lsb})")
+
+        if acc_bits is not None and self.worst_bits > acc_bits:
+            print(f"WARNING: worst case needs {self.worst_bits} bits but the accumulator has {acc_bits}")
+        if self.worst_bits > msb + 1:
+            print(f"WARNING: worst-case input wraps data_out - slice sum({msb} DOWNTO {self.out_lsb}) "
+                  f"holds only {msb + 1} bits")
+
+        acc, out_msb, out_lsb = self.recommended()
+        print(f"Recommended: accumulator {acc} bits, data_out = sum({out_msb} DOWNTO {out_lsb})")
+        if out_lsb != self.out_lsb:
+            print(f"  (gain reduced by 2^{out_lsb - self.out_lsb} to avoid wraparound; "
+                  f"or keep sum({msb} DOWNTO {self.out_lsb}) with {msb + 1} bits and saturate)")
+        elif acc_bits is not None and acc < acc_bits:
+            print(f"  ({acc_bits - acc} accumulator bit(s) can be removed without changing data_out)")
+        if self.stat_bits < self.worst_bits:
+            print(f"  Accepting {self.sigma:.0f}-sigma risk instead: {self.stat_bits}-bit sum")
+        print()
+
+
+def analyze_candidates(candidates, adc=None, **kwargs):
+    """HeadroomAnalysis for each {name: coeffs} entry, smallest worst case first"""
+    analyses = []
+    for name, coeffs in candidates.items():
+        analysis = HeadroomAnalysis(coeffs, name, **kwargs)
+        if adc is not None:
+            analysis.observe(adc)
+        analyses.append(analysis)
+    return sorted(analyses, key=lambda a: a.worst_bits)
+
+
+def main():
+    # Configuration
+    ACC_BITS = 28  # Width of `sum` in FIR.vhd
+    CANDIDATES = {
+        'FIR.vhd': 'FIR.vhd',
+        'fir_coefficients_16bit.txt': 'fir_coefficients_16bit.txt',
+    }
+
+    # Optional recorded ADC data: python fir_headroom.py capture.fpcap
+    adc = None
+    if len(sys.argv) > 1:
+        from capture import input_channel, open_capture
+        samples, header = open_capture(sys.argv[1])
+        adc = samples[:, input_channel(header)]
+        print(f"Evaluating against {len(adc)} recorded samples from {sys.argv[1]}\n")
+
+    candidates = {name: load_vhdl_coefficients(filename) for name, filename in CANDIDATES.items()}
+    for analysis in analyze_candidates(candidates, adc):
+        analysis.report(ACC_BITS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+import re
+import sys
+import time
+import numpy as np
+
+# --- Fixed-point parameters of FIR.vhd ---
+# taps(0) <= SIGNED(data_in) - 2048                 12-bit signed input
+# sum     <= sum of taps(i) * coeffs(i)              28-bit, wraps on overflow
+# data_out <= resize(signed(sum(26 DOWNTO 15)), 12) + 2048
+INPUT_BITS = 12
+INPUT_OFFSET = 2048
+ACC_BITS = 28
+OUT_MSB = 26
+OUT_LSB = 15
+
+# FP_VHDL.vhd latches filtered_data_out on the same clock edge that shifts the
+# new sample into the FIR, so the filtered value in frame k is the filter
+# output for samples up to k-1.
+FRAME_LATENCY = 1
+CLOCKS_PER_SAMPLE = 2000  # SAMPLE_RATE_DIV in FP_VHDL.vhd (50 MHz / 25 kHz)
+
+VHDL_COEFF_PATTERN = re.compile(r'(\d+)\s*=>\s*x"([0-9A-Fa-f]+)"')
+
+
+def load_vhdl_coefficients(filename="FIR.vhd", bits=16):
+    """Read the `coeffs` constant from FIR.vhd (or fir_coefficients_16bit.txt)"""
+    with open(filename) as f:
+        entries = VHDL_COEFF_PATTERN.findall(f.read())
+    if not entries:
+        raise ValueError(f"No coefficients found in {filename}")
+
+    coeffs = np.zeros(len(entries), dtype=np.int64)
+    for index, hex_val in entries:
+        value = int(hex_val, 16)
+        if value >= 1 << (bits - 1):
+            value -= 1 << bits  # Two's complement
+        coeffs[int(index)] = value
+    return coeffs
+
+
+def wrap(values, bits):
+    """Two's complement wraparound of int64 values to `bits` bits"""
+    half = 1 << (bits - 1)
+    return ((values + half) & ((1 << bits) - 1)) - half
+
+
+def frame_latency(pipeline_clocks=0, clocks_per_sample=CLOCKS_PER_SAMPLE):
+    """
+    Frames between a sample and the filtered value sent with it.
+
+    A datapath with pipeline_clocks registers after the tap shift needs
+    pipeline_clocks + 1 edges before FP_VHDL.vhd can latch its result, and
+    latching only happens on sample_enable edges clocks_per_sample apart.
+    """
+    return -(-(pipeline_clocks + 1) // clocks_per_sample)
+
+
+def fold_coefficients(coeffs):
+    """
+    Split a symmetric (linear-phase) coefficient set for pre-add folding.
+
+    Returns (half, center): half[i] multiplies taps(i) + taps(N-1-i), center
+    multiplies the middle tap of an odd-length filter (None for even lengths).
+    """
+    coeffs = np.asarray(coeffs, dtype=np.int64)
+    if not np.array_equal(coeffs, coeffs[::-1]):
+        raise ValueError("Coefficients are not symmetric and cannot be folded")
+    half = coeffs[: len(coeffs) // 2]
+    center = int(coeffs[len(coeffs) // 2]) if len(coeffs) % 2 else None
+    return half, center
+
+
+def polyphase_components(coeffs, factor):
+    """
+    Polyphase decomposition for decimation by `factor`.
+
+    Row k of the (factor, ceil(N/factor)) result holds h[k], h[k+factor], ...
+    zero padded at the end.
+    """
+    coeffs = np.asarray(coeffs, dtype=np.int64)
+    length = -(-len(coeffs) // factor)
+    padded = np.zeros(length * factor, dtype=np.int64)
+    padded[: len(coeffs)] = coeffs
+    return padded.reshape(length, factor).T
+
+
+class FirModel:
+    """
+    Bit-exact model of the FIR.vhd datapath.
+
+    Whole arrays are filtered at once: the MAC is an int64 convolution, then
+    the accumulator wraparound, the output bit slice and the +2048 offset are
+    applied exactly as in the hardware.
+    """
+
+    def __init__(self, coeffs, acc_bits=ACC_BITS, out_msb=OUT_MSB, out_lsb=OUT_LSB,
+                 input_bits=INPUT_BITS, pipeline_clocks=0, clocks_per_sample=CLOCKS_PER_SAMPLE):
+        self.coeffs = np.asarray(coeffs, dtype=np.int64)
+        self.acc_bits = acc_bits
+        self.out_msb = out_msb
+        self.out_lsb = out_lsb
+        self.input_bits = input_bits
+        self.out_bits = out_msb - out_lsb + 1
+        self.taps = len(self.coeffs)
+
+        # Registers between the taps and data_out (fir_hdl 'tree' architecture)
+        self.pipeline_clocks = pipeline_clocks
+        self.latency = frame_latency(pipeline_clocks, clocks_per_sample)
+
+    @classmethod
+    def from_vhdl(cls, filename="FIR.vhd", **kwargs):
+        return cls(load_vhdl_coefficients(filename), **kwargs)
+
+    def to_taps(self, adc):
+        """ADC codes (0..4095) to the signed values held in the tap registers"""
+        return wrap(np.asarray(adc, dtype=np.int64) - INPUT_OFFSET, self.input_bits)
+
+    def tap_sequence(self, adc, history=None):
+        """
+        Tap register values for adc, preceded by taps-1 values of history.
+
+        `history` holds the ADC samples preceding `adc`; without it the shift
+        register starts cleared, as after reset.
+        """
+        x = self.to_taps(adc)
+        if history is None:
+            pad = np.zeros(self.taps - 1, dtype=np.int64)
+        else:
+            pad = self.to_taps(history)[-(self.taps - 1):]
+            pad = np.concatenate((np.zeros(self.taps - 1 - len(pad), dtype=np.int64), pad))
+        return np.concatenate((pad, x))
+
+    def accumulate(self, adc, history=None):
+        """Accumulator value after each sample is shifted in"""
+        full = np.convolve(self.tap_sequence(adc, history), self.coeffs, mode="valid")
+        return wrap(full, self.acc_bits)
+
+    def output(self, acc):
+        """Rescale accumulator values the way data_out does"""
+        mask = (1 << self.out_bits) - 1
+        sliced = (acc >> self.out_lsb) & mask
+        return ((sliced + INPUT_OFFSET) & mask).astype(np.int16)
+
+    def filter(self, adc, history=None):
+        """data_out after each ADC sample has been shifted in"""
+        return self.output(self.accumulate(adc, history))
+
+    def expected_frames(self, adc, history=None, latency=None):
+        """
+        Filtered values the board should send alongside the ADC values in adc.
+
+        `history` holds the ADC samples sent before adc; anything older is
+        taken to be the reset state. latency defaults to the model's own.
+        """
+        latency = self.latency if latency is None else latency
+        prev = np.asarray(history if history is not None else [], dtype=np.int64)
+        full = np.concatenate((prev, np.asarray(adc, dtype=np.int64)))
+        out = self.filter(full)
+        if latency:
+            reset_out = self.output(np.zeros(latency, dtype=np.int64))
+            out = np.concatenate((reset_out, out[:-latency]))
+        return out[len(prev):]
+
+    def align(self, adc, filtered, latency=None):
+        """
+        Time-align a capture: (adc, filtered) trimmed so that filtered[i] is
+        the output after adc[i] was shifted in.
+        """
+        latency = self.latency if latency is None else latency
+        if latency == 0:
+            return adc, filtered
+        return adc[:-latency], filtered[latency:]
+
+    def estimate_latency(self, adc, filtered, max_latency=8, samples=100_000):
+        """
+        Frame latency that best explains a capture, for datapaths whose
+        pipelining is unknown. Returns (latency, fraction of samples matching).
+        """
+        adc = np.asarray(adc[:samples])
+        filtered = np.asarray(filtered[:samples])
+        out = self.filter(adc)
+        skip = self.taps - 1  # Samples with unknown filter state
+        best = (0, 0.0)
+        for latency in range(max_latency + 1):
+            n = len(adc) - latency - skip
+            if n <= 0:
+                break
+            matching = np.mean(out[skip : skip + n] == filtered[skip + latency : skip + latency + n])
+            if matching > best[1]:
+                best = (latency, float(matching))
+        return best
+
+    def verify(self, adc, filtered, latency=None, block_size=1 << 20):
+        """
+        Compare captured (adc, filtered) pairs against the model.
+
+        Works through the capture in blocks so memory-mapped captures of any
+        length can be checked. The first taps-1+latency samples are skipped as
+        their filter state is unknown. Returns the indices of mismatching
+        samples.
+        """
+        latency = self.latency if latency is None else latency
+        adc = np.asarray(adc)
+        filtered = np.asarray(filtered)
+        warmup = self.taps - 1 + latency
+        mismatches = []
+
+        for start in range(0, len(adc), block_size):
+            end = min(start + block_size, len(adc))
+            hist_start = max(0, start - warmup)
+            expected = self.expected_frames(adc[start:end], adc[hist_start:start], latency)
+            bad = np.flatnonzero(expected != filtered[start:end]) + start
+            mismatches.append(bad[bad >= warmup])
+
+        return np.concatenate(mismatches) if mismatches else np.empty(0, dtype=np.intp)
+
+
+class FoldedFirModel(FirModel):
+    """
+    Symmetry-folded datapath (the 'folded' architecture in fir_hdl.py).
+
+    taps(i) and taps(N-1-i) are added in an input_bits+1 wide pre-adder before
+    the multiply, so ceil(N/2) multipliers replace N. The pre-add cannot
+    overflow and the products are reduced modulo 2^acc_bits, so the result is
+    expected to equal FirModel bit for bit; main() checks this.
+    """
+
+    def __init__(self, coeffs, **kwargs):
+        super().__init__(coeffs, **kwargs)
+        self.folded, self.center = fold_coefficients(self.coeffs)
+        self.pre_bits = self.input_bits + 1
+
+    @property
+    def multipliers(self):
+        return len(self.folded) + (self.center is not None)
+
+    def accumulate(self, adc, history=None):
+        x = self.tap_sequence(adc, history)
+        n = len(x) - self.taps + 1
+        newest = self.taps - 1  # x[newest + j] is taps(0) for output j
+
+        acc = np.zeros(n, dtype=np.int64)
+        for i, coeff in enumerate(self.folded):
+            # taps(i) + taps(N-1-i)
+            pre = wrap(x[newest - i : newest - i + n] + x[i : i + n], self.pre_bits)
+            acc += pre * coeff
+        if self.center is not None:
+            mid = self.taps // 2
+            acc += x[newest - mid : newest - mid + n] * self.center
+        return wrap(acc, self.acc_bits)
+
+
+class PolyphaseFirModel(FirModel):
+    """
+    Polyphase decimator: the FIR output computed only for every factor-th sample.
+
+    Sub-filter k (polyphase_components row k) runs on every factor-th input
+    at offset k, at 1/factor of the input rate. Outputs are produced after
+    samples factor-1, 2*factor-1, ... and match FirModel output[factor-1::factor].
+    """
+
+    def __init__(self, coeffs, factor, **kwargs):
+        super().__init__(coeffs, **kwargs)
+        self.factor = factor
+        self.components = polyphase_components(self.coeffs, factor)
+
+    def accumulate(self, adc, history=None):
+        x = self.tap_sequence(adc, history)
+        count = (len(x) - self.taps + 1) // self.factor
+        # Output m is taken after input x[base + m*factor]
+        base = self.taps - 1 + self.factor - 1
+        sub_len = self.components.shape[1]
+
+        acc = np.zeros(count, dtype=np.int64)
+        for k, component in enumerate(self.components):
+            # Inputs x[base + m*factor - k - j*factor] for j = 0..sub_len-1
+            start = base - k - (sub_len - 1) * self.factor
+            if start < 0:
+                # Reach back before the register contents: those taps are zero
+                lead = -(-start // self.factor)
+                phase = np.concatenate((np.zeros(lead, dtype=np.int64),
+                                        x[start + lead * self.factor :: self.factor]))
+            else:
+                phase = x[start :: self.factor]
+            acc += np.convolve(phase, component, mode="valid")[:count]
+        return wrap(acc, self.acc_bits)
+
+
+class MacCycleModel:
+    """
+    Clock-by-clock model of the time-multiplexed MAC ('mac' in fir_hdl.py).
+
+    Mirrors the generated registers: the circular sample RAM, the read stage
+    (sample_q, coeff_q), the accumulate stage and the registered sum. Only the
+    clocks where the MAC is busy are simulated, so long sample periods cost
+    nothing. With clocks_per_sample >= cycles_per_sample the output equals
+    FirModel; below that the MAC overruns and the model shows how.
+    """
+
+    def __init__(self, coeffs, acc_bits=ACC_BITS, out_msb=OUT_MSB, out_lsb=OUT_LSB,
+                 input_bits=INPUT_BITS, clock_hz=50e6):
+        self.fir = FirModel(coeffs, acc_bits, out_msb, out_lsb, input_bits)
+        self.coeffs = [int(c) for c in self.fir.coeffs]
+        self.taps = self.fir.taps
+        self.depth = 1 << max(1, (self.taps - 1).bit_length())
+        self.clock_hz = clock_hz
+
+    @property
+    def cycles_per_sample(self):
+        """sample_enable, TAPS_COUNT reads, accumulate, publish"""
+        return self.taps + 3
+
+    def max_sample_rate(self):
+        return self.clock_hz / self.cycles_per_sample
+
+    def max_taps(self, sample_rate):
+        """Longest filter one MAC can run at sample_rate"""
+        return int(self.clock_hz // sample_rate) - 3
+
+    def channels(self, sample_rate):
+        """Filters of this length one MAC could serve in turn at sample_rate"""
+        return int(self.clock_hz // sample_rate) // self.cycles_per_sample
+
+    def run(self, adc, clocks_per_sample=CLOCKS_PER_SAMPLE):
+        """
+        data_out as FP_VHDL.vhd latches it on each sample_enable, i.e. the
+        `filtered` value of each frame. Also returns the number of samples
+        that arrived while the MAC was still busy.
+        """
+        taps, depth = self.taps, self.depth
+        ram = [0] * depth
+        wr_ptr, filled, tap = 0, 0, taps
+        sample_q = coeff_q = 0
+        term_q = last_q = done = 0
+        acc = total = 0
+        latched = np.empty(len(adc), dtype=np.int16)
+        overruns = 0
+
+        for k, value in enumerate(self.fir.to_taps(adc)):
+            latched[k] = self.fir.output(np.int64(total))
+            if tap < taps or term_q or last_q or done:
+                overruns += 1
+
+            for clock in range(clocks_per_sample):
+                sample_enable = clock == 0
+                if not sample_enable and tap == taps and not (term_q or last_q or done):
+                    break  # Idle until the next sample
+
+                # Stage 1
+                n_term = n_last = 0
+                n_sample_q, n_coeff_q, n_tap, n_acc = sample_q, coeff_q, tap, acc
+                if sample_enable:
+                    ram[wr_ptr] = int(value)  # Read ports see it from the next clock
+                    n_wr_ptr = (wr_ptr + 1) % depth
+                    filled = min(filled + 1, taps)
+                    n_tap, n_acc = 0, 0
+                else:
+                    n_wr_ptr = wr_ptr
+                    if tap < taps:
+                        n_sample_q = ram[(wr_ptr - 1 - tap) % depth]
+                        n_coeff_q = self.coeffs[tap]
+                        n_term = int(tap < filled)
+                        n_last = int(tap == taps - 1)
+                        n_tap = tap + 1
+                # Stage 2 (assigned last in the process, so it wins over the clear)
+                if term_q:
+                    n_acc = int(wrap(np.int64(acc + sample_q * coeff_q), self.fir.acc_bits))
+                # Stage 3
+                if done:
+                    total = acc
+
+                wr_ptr, tap, acc = n_wr_ptr, n_tap, n_acc
+                sample_q, coeff_q = n_sample_q, n_coeff_q
+                term_q, last_q, done = n_term, n_last, last_q
+
+        return latched, overruns
+
+    def report(self, sample_rate=None):
+        print(f"Time-multiplexed MAC: {self.taps} taps, {self.cycles_per_sample} clocks per sample "
+              f"at {self.clock_hz / 1e6:.0f} MHz")
+        print(f"Maximum sample rate: {self.max_sample_rate() / 1e3:.1f} kHz "
+              f"({self.max_sample_rate() * self.taps / 1e6:.1f} M taps/s)")
+        if sample_rate:
+            print(f"At {sample_rate / 1e3:g} kHz: up to {self.max_taps(sample_rate)} taps, or "
+                  f"{self.channels(sample_rate)} channels of {self.taps} taps per multiplier")
+
+
+def check_structures(model, adc, factors=(2, 4, 5)):
+    """Compare the folded and polyphase models against the direct form"""
+    reference = model.accumulate(adc)
+    results = {}
+    try:
+        folded = FoldedFirModel(model.coeffs, acc_bits=model.acc_bits)
+        results["folded"] = np.array_equal(folded.accumulate(adc), reference)
+    except ValueError:
+        pass  # Not symmetric
+    for factor in factors:
+        decimator = PolyphaseFirModel(model.coeffs, factor, acc_bits=model.acc_bits)
+        expected = reference[factor - 1 :: factor]
+        results[f"polyphase /{factor}"] = np.array_equal(decimator.accumulate(adc), expected)
+
+    # The cycle model is slow, a short stretch is enough
+    mac = MacCycleModel(model.coeffs, model.acc_bits, model.out_msb, model.out_lsb, model.input_bits)
+    frames, overruns = mac.run(adc[:2000])
+    results["time-multiplexed MAC"] = overruns == 0 and np.array_equal(frames, model.expected_frames(adc[:2000]))
+    return results
+
+
+def main():
+    # Configuration
+    VHDL_FILE = 'FIR.vhd'
+    model = FirModel.from_vhdl(VHDL_FILE)
+    print(f"Loaded {model.taps} coefficients from {VHDL_FILE}")
+    print(f"Accumulator: {model.acc_bits} bits, output slice: sum({model.out_msb} DOWNTO {model.out_lsb})")
+
+    if len(sys.argv) > 1:
+        # Verify a capture written by fplotter.save_data
+        from capture import input_channel, open_capture
+        samples, header = open_capture(sys.argv[1])
+        adc = samples[:, input_channel(header)]
+        filtered = samples[:, header["channels"].index("filtered")]
+        print(f"Verifying {len(adc)} samples from {sys.argv[1]}...")
+    else:
+        # Self-check on random data through the same path
+        rng = np.random.default_rng(0)
+        adc = rng.integers(0, 4096, 2_000_000)
+        filtered = model.expected_frames(adc)
+        print(f"No capture given - checking {len(adc)} random samples against themselves")
+
+    start = time.perf_counter()
+    mismatches = model.verify(adc, filtered)
+    elapsed = time.perf_counter() - start
+
+    print(f"Checked at {len(adc) / elapsed / 1e6:.1f} Msamples/s")
+    if len(mismatches) == 0:
+        print("Hardware output matches the model bit for bit")
+    else:
+        print(f"{len(mismatches)} mismatching samples, first at index {mismatches[0]}")
+        for i in mismatches[:10]:
+            print(f"  [{i}] adc={int(adc[i])} filtered={int(filtered[i])}")
+        latency, matching = model.estimate_latency(adc, filtered)
+        if latency != model.latency and matching > 0.99:
+            print(f"The capture matches with a latency of {latency} frames instead of {model.latency} "
+                  f"(pipelined datapath?)")
+
+    # Folded / polyphase structures must give the same accumulator values
+    for name, ok in check_structures(model, adc[:200_000]).items():
+        print(f"{name} datapath: {'bit-exact' if ok else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
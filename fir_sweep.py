@@ -0,0 +1,152 @@
+import csv
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from fir_design import FirSpec, design
+from design_cache import DesignCache, DEFAULT_CACHE_DIR
+from fir_headroom import HeadroomAnalysis
+
+# --- Design-space sweep ---
+# Every combination of taps x window x coefficient bits x cutoff scale is
+# designed and scored on its *quantized* response, in parallel on a process
+# pool. Designs are shared with fir_designer*.py through the design cache, so
+# repeated sweeps only compute new grid points. Results are ranked (designs
+# meeting the spec first, then cheapest) and written to a CSV table.
+
+
+class SweepCriteria:
+    """Pass/fail limits a design is scored against"""
+
+    def __init__(self, cutoff=1100, stop_edge=300, pass_edge=2500,
+                 min_attenuation=40.0, max_cutoff_error=50.0, max_ripple=1.0):
+        self.cutoff = cutoff  # Nominal -3 dB frequency (Hz)
+        self.stop_edge = stop_edge  # Stopband is 0..stop_edge (Hz)
+        self.pass_edge = pass_edge  # Passband is pass_edge..Nyquist (Hz)
+        self.min_attenuation = min_attenuation  # dB
+        self.max_cutoff_error = max_cutoff_error  # Hz
+        self.max_ripple = max_ripple  # dB peak-to-peak
+
+
+def multiplier_count(fixed_coeffs):
+    """Hardware multipliers after folding symmetric taps (zeros and +-1 are free)"""
+    c = np.asarray(fixed_coeffs)
+    half = c[: (len(c) + 1) // 2] if np.array_equal(c, c[::-1]) else c
+    return int(np.count_nonzero(np.abs(half) > 1))
+
+
+def score(spec, criteria, cache_dir=None):
+    """Design one spec (or load it from the cache) and measure its quantized response"""
+    result = DesignCache(cache_dir, prune_interval=0).design(spec) if cache_dir else design(spec)
+    frequencies, _, h_fixed = result.response()
+    mag_db = 20 * np.log10(np.maximum(np.abs(h_fixed), 1e-12))
+
+    stop = frequencies <= criteria.stop_edge
+    passband = frequencies >= criteria.pass_edge
+    attenuation = -float(mag_db[stop].max()) if np.any(stop) else np.nan
+    ripple = float(mag_db[passband].max() - mag_db[passband].min()) if np.any(passband) else np.nan
+
+    # First frequency where the high-pass response rises through -3 dB
+    above = np.flatnonzero(mag_db >= -3.0)
+    f_3db = float(frequencies[above[0]]) if len(above) else np.nan
+    cutoff_error = f_3db - criteria.cutoff
+
+    headroom = HeadroomAnalysis(result.fixed_coefficients)
+    meets = bool(attenuation >= criteria.min_attenuation
+                 and abs(cutoff_error) <= criteria.max_cutoff_error
+                 and ripple <= criteria.max_ripple)
+
+    return {
+        "taps": spec.taps,
+        "window": spec.window,
+        "coeff_bits": spec.coeff_bits,
+        "cutoff_scale": spec.cutoff_scale,
+        "stop_atten_db": round(attenuation, 2),
+        "f_3db_hz": round(f_3db, 1),
+        "cutoff_error_hz": round(cutoff_error, 1),
+        "ripple_db": round(ripple, 3),
+        "multipliers": multiplier_count(result.fixed_coefficients),
+        "acc_bits": headroom.worst_bits,
+        "meets_spec": meets,
+    }
+
+
+def _score_args(args):
+    return score(*args)
+
+
+def build_grid(base, taps, windows, coeff_bits, cutoff_scales):
+    """All FirSpec combinations of the given parameter lists"""
+    specs = []
+    for n, window, bits, scale in itertools.product(taps, windows, coeff_bits, cutoff_scales):
+        params = base.to_dict()
+        params.update(taps=n, window=window, coeff_bits=bits, cutoff_scale=scale)
+        specs.append(FirSpec(**params))
+    return specs
+
+
+def rank(rows):
+    """Designs that meet spec first, then fewest multipliers, narrowest datapath"""
+    return sorted(rows, key=lambda r: (
+        not r["meets_spec"], r["multipliers"], r["coeff_bits"], r["acc_bits"],
+        -r["stop_atten_db"] if np.isfinite(r["stop_atten_db"]) else 0,
+    ))
+
+
+def run_sweep(specs, criteria, workers=None, chunksize=8, cache_dir=DEFAULT_CACHE_DIR):
+    """Score all specs on a process pool and return the ranked rows"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [(s, criteria, cache_dir) for s in specs]
+        rows = list(pool.map(_score_args, jobs, chunksize=chunksize))
+    if cache_dir:
+        DesignCache(cache_dir).prune()  # Workers only add; evict once at the end
+    return rank(rows)
+
+
+def write_table(rows, filename):
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(rows, count=15):
+    header = f"{'taps':>4} {'window':<10} {'bits':>4} {'scale':>5} {'atten':>7} {'f3dB':>7} " \
+             f"{'ripple':>6} {'mults':>5} {'acc':>3}  ok"
+    print(header)
+    print("-" * len(header))
+    for r in rows[:count]:
+        print(f"{r['taps']:>4} {r['window']:<10} {r['coeff_bits']:>4} {r['cutoff_scale']:>5.2f} "
+              f"{r['stop_atten_db']:>7.1f} {r['f_3db_hz']:>7.1f} {r['ripple_db']:>6.3f} "
+              f"{r['multipliers']:>5} {r['acc_bits']:>3}  {'yes' if r['meets_spec'] else 'no'}")
+
+
+def main():
+    # Configuration
+    BASE = FirSpec(fs=25000, cutoff=1100, pass_zero="highpass")
+    TAPS = list(range(15, 64, 4))
+    WINDOWS = ["hamming", "hann", "blackman", "blackmanharris"]
+    COEFF_BITS = [10, 12, 14, 16]
+    CUTOFF_SCALES = [round(s, 2) for s in np.arange(0.70, 1.01, 0.04)]
+    CRITERIA = SweepCriteria(cutoff=1100, stop_edge=300, pass_edge=2500,
+                             min_attenuation=40.0, max_cutoff_error=50.0, max_ripple=1.0)
+    WORKERS = None  # One per CPU
+    CACHE_DIR = DEFAULT_CACHE_DIR  # None to always recompute
+    OUTPUT_FILE = 'fir_sweep_results.csv'
+
+    specs = build_grid(BASE, TAPS, WINDOWS, COEFF_BITS, CUTOFF_SCALES)
+    print(f"Sweeping {len(specs)} designs...")
+    start = time.perf_counter()
+    rows = run_sweep(specs, CRITERIA, WORKERS, cache_dir=CACHE_DIR)
+    elapsed = time.perf_counter() - start
+
+    write_table(rows, OUTPUT_FILE)
+    passing = sum(r["meets_spec"] for r in rows)
+    print(f"Done in {elapsed:.1f} s ({len(specs) / elapsed:.0f} designs/s), "
+          f"{passing} meet spec. Ranked table saved to '{OUTPUT_FILE}'\n")
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
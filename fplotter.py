@@ -1,29 +1,49 @@
 import serial
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from collections import deque
-import struct
 import time
 
+from acquisition import DROP_OLDEST, Acquisition
+from byte_source import open_source
+from capture import CaptureWriter
+from envelope import plot_window
+from frame_decoder import FrameDecoder, FrameReader
+from live_plot import LiveRenderer
+from protocol import FPGA_FRAME
+
 class UARTRealTimePlotter:
-    def __init__(self, port, baud_rate=3000000, sample_rate=25000, window_time=0.1):
-        self.port = port
+    def __init__(self, port, baud_rate=3000000, sample_rate=25000, window_time=0.1, spec=FPGA_FRAME,
+                 record_to=None, plot_columns=1500):
+        self.port = port  # Serial port, or a replay:/synthetic: source (see byte_source.py)
+        self.record_to = record_to  # Optional raw byte recording of the session
         self.baud_rate = baud_rate
+        self.spec = spec  # Wire format, see protocol.py (None: detect on connect)
         self.sample_rate = sample_rate  # Updated to 25kHz to match FPGA
         self.window_time = window_time  # Window time in seconds
         
         # Calculate buffer size based on sample rate and window time
         self.buffer_size = int(self.sample_rate * self.window_time)
         
-        # Data buffers - only store what we need for the window
-        self.adc_buffer = deque(maxlen=self.buffer_size)
-        self.filtered_buffer = deque(maxlen=self.buffer_size)
+        # Data buffer - one row per channel, sized to the window. Windows longer
+        # than two samples per pixel column keep only a min/max envelope (envelope.py)
+        self.plot_columns = plot_columns  # Roughly the plot width in pixels
+        self.window = None
         
-        # Serial connection
+        # Serial connection and buffered frame reader on top of it
         self.ser = None
+        self.reader = None
         self.sample_count = 0
         
+        # Live plotting reads on the acquisition thread; the GUI drains plot_queue
+        self.acquisition = None
+        self.plot_queue = None
+        
+        # Live figure, created by setup_plot() once the frame format is known
+        self.fig = None
+        self.axes = None
+        self.lines = None
+        self.renderer = None
+        
         
     def normalize_adc(self, adc_value):
         """Normalize ADC value from 0-4095 to -1 to +1"""
@@ -35,58 +55,27 @@ class UARTRealTimePlotter:
         
     def connect_serial(self):
         try:
-            self.ser = serial.Serial(self.port, self.baud_rate, timeout=1)
+            self.ser = open_source(self.port, self.baud_rate, timeout=1,
+                                   record_to=self.record_to, spec=self.spec)
+            self.reader = FrameReader(self.ser, FrameDecoder(self.spec or FPGA_FRAME))
             print(f"Connected to {self.port} at {self.baud_rate} baud")
+            if self.spec is None:
+                self.spec = self.reader.detect() or FPGA_FRAME
+                print(f"Detected frame format '{self.spec.name}'")
+            self.window = plot_window(self.buffer_size, self.plot_columns, channels=self.spec.channels)
             print(f"Sample rate: {self.sample_rate}Hz, Window: {self.window_time}s ({self.buffer_size} samples)")
             return True
         except serial.SerialException as e:
             print(f"Failed to connect to {self.port}: {e}")
             return False
             
-    def find_sync_header(self):
-        """Find the 0xAE 0xAE sync header"""
-        sync_bytes = b''
-        while len(sync_bytes) < 2:
-            byte = self.ser.read(1)
-            if len(byte) == 0:
-                continue
-                
-            if byte == b'\xae':
-                sync_bytes += byte
-                if len(sync_bytes) == 2:
-                    return True
-            else:
-                sync_bytes = b''
-        return False
-        
-    def read_packet(self):
-        """Read a complete 6-byte packet: [0xFF][0xFF][ADC_H][ADC_L][FILT_H][FILT_L]"""
-        try:
-            # Find sync header
-            if not self.find_sync_header():
-                return None, None
-                
-            # Read data bytes
-            data_bytes = self.ser.read(4)
-            if len(data_bytes) != 4:
-                return None, None
-                
-            # Parse ADC data (16-bit, but only 12 bits used)
-            adc_value = (data_bytes[0] << 8) | data_bytes[1]
-            adc_value &= 0x0FFF  # Mask to 12 bits (0-4095)
-            
-            # Parse filtered data (16-bit signed)
-            # filtered_value = struct.unpack('>h', data_bytes[2:4])[0]  # Big-endian signed short
-            
-            filtered_value = (data_bytes[2] << 8) | data_bytes[3]
-            filtered_value &= 0x0FFF  # Mask to 12 bits (0-4095)
-            
-            return adc_value, filtered_value
+    def source_finished(self, last_data=None, timeout=5.0):
+        """True once a replay is used up, or (given last_data) nothing arrived for `timeout` seconds"""
+        exhausted = getattr(self.ser, "exhausted", None)
+        if exhausted is not None and exhausted():
+            return True
+        return last_data is not None and time.time() - last_data > timeout
             
-        except Exception as e:
-            print(f"Error reading packet: {e}")
-            return None, None
-
     def plot_x_samples(self, num_samples):
         """Plot exactly X samples and display as static plot"""
         if not self.connect_serial():
@@ -94,25 +83,32 @@ class UARTRealTimePlotter:
             
         print(f"Collecting {num_samples} samples for static plot...")
         
-        raw_adc_data = []
-        raw_filtered_data = []
+        raw_blocks = []
         sample_count = 0
         
         # Progress tracking
         last_progress = 0
+        last_data = time.time()
         
         try:
             while sample_count < num_samples:
-                adc_val, filt_val = self.read_packet()
-                if adc_val is not None and filt_val is not None:
-                    raw_adc_data.append(adc_val)
-                    raw_filtered_data.append(filt_val)
-                    sample_count += 1
+                block = self.reader.read_block()
+                if block.shape[1] == 0 and self.source_finished(last_data):
+                    # Frames still waiting for a following header are complete at the end of a recording
+                    block = self.reader.decoder.flush()
+                    raw_blocks.append(block)
+                    sample_count += block.shape[1]
+                    print(f"No more data after {sample_count} samples")
+                    break
+                if block.shape[1] > 0:
+                    last_data = time.time()
+                    raw_blocks.append(block)
+                    sample_count += block.shape[1]
                     
                     # Show progress every 10%
-                    progress = int((sample_count / num_samples) * 100)
+                    progress = min(100, int((sample_count / num_samples) * 100))
                     if progress >= last_progress + 10:
-                        print(f"Progress: {progress}% ({sample_count}/{num_samples} samples)")
+                        print(f"Progress: {progress}% ({min(sample_count, num_samples)}/{num_samples} samples)")
                         last_progress = progress
                         
         except KeyboardInterrupt:
@@ -121,80 +117,80 @@ class UARTRealTimePlotter:
             if self.ser and self.ser.is_open:
                 self.ser.close()
                 
-        if len(raw_adc_data) == 0:
+        if sample_count == 0:
             print("No data collected!")
             return
             
-        # Convert to numpy arrays
-        adc_array = np.array(raw_adc_data)
-        filtered_array = np.array(raw_filtered_data)
-        sample_indices = np.arange(len(adc_array))
+        # Join the decoded blocks, trimmed to the requested count
+        data = np.concatenate(raw_blocks, axis=1)[:, :num_samples]
+        sample_indices = np.arange(data.shape[1])
         
-        # Create the plot
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
+        # Create the plot - one subplot per channel
+        fig, axes = plt.subplots(self.spec.channels, 1, figsize=(15, 5 * min(self.spec.channels, 2)),
+                                 sharex=True, squeeze=False)
+        for ax, name, values in zip(axes[:, 0], self.spec.field_names, data):
+            if name == "filtered":
+                title, style = "Filtered Data", "r-"
+            else:
+                title, style = f"Raw ADC Data ({name})", "b-"
+            ax.plot(sample_indices, values, style, linewidth=1, label=f'{title} ({len(values)} samples)')
+            ax.set_title(f'{title} - {len(values)} Samples @ {self.sample_rate}Hz')
+            ax.set_ylabel('Value (0-4095)')
+            ax.set_ylim(0, 4095)
+            ax.grid(True, alpha=0.3)
+            ax.legend()
+        axes[-1, 0].set_xlabel('Sample Index')
         
-        # Plot raw ADC data
-        ax1.plot(sample_indices, adc_array, 'b-', linewidth=1, label=f'Raw ADC Data ({len(adc_array)} samples)')
-        ax1.set_title(f'Raw ADC Data - {len(adc_array)} Samples @ {self.sample_rate}Hz')
-        ax1.set_ylabel('ADC Value (0-4095)')
-        ax1.set_xlabel('Sample Index')
-        ax1.set_ylim(0, 4095)
-        ax1.grid(True, alpha=0.3)
-        ax1.legend()
         
-        # Plot filtered data
-        ax2.plot(sample_indices, filtered_array, 'r-', linewidth=1, label=f'Filtered Data ({len(filtered_array)} samples)')
-        ax2.set_title(f'Filtered Data - {len(filtered_array)} Samples @ {self.sample_rate}Hz')
-        ax2.set_ylabel('Filtered Value (0-4095)')
-        ax2.set_xlabel('Sample Index')
-        ax2.set_ylim(0, 4095)
-        ax2.grid(True, alpha=0.3)
-        ax2.legend()
+        plt.tight_layout()
         
+        plt.show()
         
+    def setup_plot(self, update_interval=50):
+        """Create the live figure - one subplot per channel - and its blitted renderer"""
+        self.fig, axes = plt.subplots(self.spec.channels, 1, figsize=(15, 5 * min(self.spec.channels, 2)),
+                                      sharex=True, squeeze=False)
+        self.axes = axes[:, 0]
+        self.lines = []
+        for ax, name in zip(self.axes, self.spec.field_names):
+            if name == "filtered":
+                title, color = "Filtered Data", "r"
+            else:
+                title, color = f"Raw ADC Data ({name})", "b"
+            # A line, or a min/max band for long windows (envelope.py)
+            line = self.window.add_artist(ax, color, linewidth=1, label=title)
+            ax.set_title(f'{title} - last {self.window_time}s @ {self.sample_rate}Hz')
+            ax.set_ylabel('Value (0-4095)')
+            ax.set_ylim(0, 4095)
+            ax.grid(True, alpha=0.3)
+            ax.legend(loc='upper right')
+            self.lines.append(line)
+        self.axes[-1].set_xlabel('Sample Index')
         plt.tight_layout()
         
-        plt.show()
+        # The x-axis spans the whole window from the start, so it never has to move
+        self.renderer = LiveRenderer(self.fig, self.axes, self.lines, self.buffer_size,
+                                     interval_ms=update_interval)
         
-    def update_plot(self, frame):
+    def update_plot(self):
         """Animation update function"""
-        if self.ser is None or not self.ser.is_open:
-            return self.line1, self.line2
+        if self.plot_queue is None:
+            return
             
-        # Read multiple packets per frame for better performance
-        packets_per_frame = min(50, self.buffer_size // 10)  # Adaptive based on buffer size
-        
-        for _ in range(packets_per_frame):
-            # Use the main packet reading method
-            adc_val, filt_val = self.read_packet()
-            if adc_val is not None and filt_val is not None:
-                # Normalize the data to -1 to +1 range
-                normalized_adc = self.normalize_adc(adc_val)
-                normalized_filtered = self.normalize_filtered(filt_val)
-                
-                # Add to buffers (deque automatically handles overflow)
-                self.adc_buffer.append(normalized_adc)
-                self.filtered_buffer.append(normalized_filtered)
-                
-                self.sample_count += 1
-                
-        # Update plots if we have data
-        if len(self.adc_buffer) > 0:
-            # Create sample indices for x-axis
-            x_data = np.arange(len(self.adc_buffer))
-            adc_array = np.array(list(self.adc_buffer))
-            filtered_array = np.array(list(self.filtered_buffer))
+        # Take everything decoded since the last frame without blocking
+        block = self.plot_queue.drain()
+        if block.shape[1] > 0:
+            # Normalize each row with its own scaling: raw ADC inputs, then the FIR output
+            normalized = np.array([self.normalize_filtered(row) if name == "filtered" else self.normalize_adc(row)
+                                   for name, row in zip(self.spec.field_names, block)])
             
-            # Update line data
-            self.line1.set_data(x_data, adc_array)
-            self.line2.set_data(x_data, filtered_array)
+            # Add to the window (oldest samples are overwritten)
+            self.window.extend(normalized)
             
-            # Update x-axis limits to show current buffer content
-            if len(x_data) > 0:
-                self.ax1.set_xlim(0, max(len(x_data), self.buffer_size))
-                self.ax2.set_xlim(0, max(len(x_data), self.buffer_size))
-        
-        return self.line1, self.line2
+            self.sample_count += block.shape[1]
+            
+            # Update line data from the window's preallocated arrays
+            self.window.update_artists(self.lines)
         
     def start_plotting(self):
         """Start the real-time plotting"""
@@ -204,70 +200,76 @@ class UARTRealTimePlotter:
         print("Starting real-time plot... Press Ctrl+C to stop")
         print(f"Displaying last {self.window_time}s of data ({self.buffer_size} samples)")
         print("Waiting for data...")
-        print("Packet format: [0xAE][0xAE][RAW_H][RAW_L][FILT_H][FILT_L] (6 bytes total)")
+        print(f"Packet format: {self.spec.describe()} ({self.spec.length} bytes total)")
         
-        # Create animation with adaptive interval
+        # Blitted animation with adaptive interval
         update_interval = max(20, int(1000 / (self.sample_rate / 100)))  # Adaptive update rate
-        ani = animation.FuncAnimation(
-            self.fig, self.update_plot, interval=update_interval,
-            blit=True, cache_frame_data=False
-        )
+        self.setup_plot(update_interval)
+        
+        # Decoding happens on the acquisition thread; if the GUI falls behind the oldest blocks go
+        self.acquisition = Acquisition()
+        board = self.acquisition.add_board(self.ser, self.reader.decoder, name=self.port)
+        self.plot_queue = board.subscribe(maxsize=256, policy=DROP_OLDEST)
+        self.acquisition.start()
+        self.renderer.start(self.update_plot)
         
         try:
             plt.show()
         except KeyboardInterrupt:
             print("\nStopping...")
         finally:
-            if self.ser and self.ser.is_open:
-                self.ser.close()
-                print("Serial connection closed")
+            self.renderer.stop()
+            print(f"Plot: {self.renderer.summary()}")
+            self.acquisition.close()
+            for line in self.acquisition.summary():
+                print(line)
+            print("Serial connection closed")
                 
     def save_data(self, filename, duration_seconds=10):
-        """Save data to file for later analysis"""
+        """Stream data to a capture file for later analysis (see capture.py)"""
         if not self.connect_serial():
             return
             
         print(f"Collecting data for {duration_seconds} seconds...")
         
-        raw_adc_data = []
-        raw_filtered_data = []
-        normalized_adc_data = []
-        normalized_filtered_data = []
-        
         start_time = time.time()
         sample_count = 0
         
+        # Blocks go straight to disk, so RAM use does not grow with duration
+        writer = CaptureWriter(filename, self.sample_rate, channels=self.spec.field_names)
+        
         try:
             while time.time() - start_time < duration_seconds:
-                adc_val, filt_val = self.read_packet()
-                if adc_val is not None and filt_val is not None:
-                    # Store both raw and normalized data
-                    raw_adc_data.append(adc_val)
-                    raw_filtered_data.append(filt_val)
-                    normalized_adc_data.append(self.normalize_adc(adc_val))
-                    normalized_filtered_data.append(self.normalize_filtered(filt_val))
-                    sample_count += 1
+                block = self.reader.read_block()
+                count = block.shape[1]
+                if count == 0 and self.source_finished():
+                    writer.write(self.reader.decoder.flush())
+                    sample_count = writer.sample_count
+                    print("End of the replayed recording")
+                    break
+                if count > 0:
+                    writer.write(block)
                     
-                    if sample_count % 1000 == 0:
-                        print(f"Collected {sample_count} samples...")
+                    # Report roughly once per second of signal
+                    if (sample_count + count) // self.sample_rate > sample_count // self.sample_rate:
+                        print(f"Collected {sample_count + count} samples...")
+                    sample_count += count
                         
         except KeyboardInterrupt:
             print("Data collection interrupted")
         finally:
+            writer.close()
             if self.ser and self.ser.is_open:
                 self.ser.close()
-                
-        # Save to numpy file
-        np.savez(filename, 
-                raw_adc_data=np.array(raw_adc_data),
-                raw_filtered_data=np.array(raw_filtered_data),
-                normalized_adc_data=np.array(normalized_adc_data),
-                normalized_filtered_data=np.array(normalized_filtered_data),
-                sample_rate=self.sample_rate)
         
         print(f"Data saved to {filename}")
-        print(f"Collected {len(raw_adc_data)} samples")
-        print("Saved both raw and normalized data")
+        print(f"Collected {sample_count} samples")
+        decoder = self.reader.decoder
+        if decoder.frames_lost or decoder.checksum_errors or decoder.samples_overrun:
+            print(f"Warning: {decoder.frames_lost} frames lost in {decoder.gap_events} gaps, "
+                  f"{decoder.checksum_errors} checksum errors, {decoder.samples_overrun} samples "
+                  f"overrun in the FPGA - the capture is not contiguous")
+        print("Load with capture.open_capture() - normalize on read if needed")
 
     def debug_packets(self, num_packets=10):
         """Debug function to see raw packet data"""
@@ -275,25 +277,25 @@ class UARTRealTimePlotter:
             return
             
         print(f"Reading {num_packets} packets for debugging...")
-        print("Format: [Header1][Header2][RAW_H][RAW_L][FILT_H][FILT_L] -> Raw_ADC, Filtered")
+        print(f"Format: {self.spec.describe()} -> {', '.join(self.spec.field_names)}")
         
         try:
-            for i in range(num_packets):
-                if self.find_sync_header():
-                    data_bytes = self.ser.read(4)
-                    if len(data_bytes) == 4:
-                        # Parse the packet manually for debugging
-                        adc_value = (data_bytes[0] << 8) | data_bytes[1]
-                        adc_value = adc_value & 0x0FFF
-                        
-                        filtered_value = (data_bytes[2] << 8) | data_bytes[3]
-                        filtered_value = filtered_value & 0x0FFF
-                        
-                        print(f"Packet {i+1}: [0xAE][0xAE][0x{data_bytes[0]:02X}][0x{data_bytes[1]:02X}][0x{data_bytes[2]:02X}][0x{data_bytes[3]:02X}] -> ADC:{adc_value} ({adc_value:04X}), Filtered:{filtered_value} ({filtered_value:04X})")
-                    else:
-                        print(f"Packet {i+1}: Incomplete data - got {len(data_bytes)} bytes")
-                else:
-                    print(f"Packet {i+1}: No sync header found")
+            frames = self.reader.read_raw_frames(num_packets)
+            values = self.spec.unpack(frames)
+            per = self.spec.samples_per_frame  # Packed blocks hold several samples
+            for i, frame in enumerate(frames):
+                frame_str = ''.join(f'[0x{b:02X}]' for b in frame)
+                samples = values[:, i * per : (i + 1) * per].T
+                fields = "; ".join(", ".join(f"{name}:{int(v)} ({int(v):04X})"
+                                             for name, v in zip(self.spec.field_names, sample))
+                                   for sample in samples)
+                
+                print(f"Packet {i+1}: {frame_str} -> {fields}")
+            if len(frames) < num_packets:
+                print(f"Only {len(frames)} of {num_packets} packets received")
+            decoder = self.reader.decoder
+            print(f"Bytes discarded: {decoder.bytes_discarded}, resync events: {decoder.resync_events}, "
+                  f"checksum errors: {decoder.checksum_errors}, frames lost: {decoder.frames_lost}")
         except Exception as e:
             print(f"Debug error: {e}")
         finally:
@@ -306,7 +308,7 @@ class UARTRealTimePlotter:
             return
             
         print(f"Reading raw data stream for hex dump...")
-        print("Looking for 0xAE 0xAE sync patterns...")
+        print(f"Looking for {self.spec.header.hex(' ').upper()} sync patterns...")
         
         try:
             raw_data = self.ser.read(num_packets * 10)  # Read more data than expected
@@ -320,9 +322,10 @@ class UARTRealTimePlotter:
                 
             # Look for sync patterns
             print("\nSync pattern analysis:")
-            for i in range(len(raw_data) - 1):
-                if raw_data[i] == 0xAE and raw_data[i+1] == 0xAE:
-                    print(f"Found sync at offset {i:04X}")
+            sync = raw_data.find(self.spec.header)
+            while sync >= 0:
+                print(f"Found sync at offset {sync:04X}")
+                sync = raw_data.find(self.spec.header, sync + 1)
                     
         except Exception as e:
             print(f"Hex dump error: {e}")
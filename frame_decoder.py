@@ -0,0 +1,295 @@
+import time
+import numpy as np
+
+from protocol import (FPGA_FRAME, FRAME_SPECS, MULTI_HEADER, PACKED_HEADER,
+                      multichannel_frame, packed_frame)
+
+
+class FrameDecoder:
+    """
+    Bulk decoder for the ADC/FIR UART stream described by a FrameSpec.
+
+    Takes whole chunks as returned by ser.read(ser.in_waiting) and decodes every
+    complete frame with NumPy instead of walking the bytes one at a time.
+    A header only counts as a frame start once the next header is seen exactly
+    one frame later, which rejects header bytes that appear inside the payload
+    and frames truncated by dropped bytes. The unconfirmed tail of a chunk is
+    kept and prepended to the next one. Formats with a checksum (packed
+    blocks) additionally drop every frame whose checksum does not match.
+
+    Formats with a frame counter are checked for gaps: every frame missing
+    between two decoded ones - dropped bytes, a resync, a bad checksum - is
+    counted in frames_lost. A counter that does not move at all (bitstream
+    without counter) counts nothing, and gaps of a multiple of the counter
+    range (256 frames for 8 bits) cannot be seen.
+
+    Packed blocks also carry the FPGA's overrun counter: samples it had to
+    overwrite before sending are counted in samples_overrun. They leave no
+    gap in the block counter, so frames_lost does not include them.
+    """
+
+    def __init__(self, spec=FPGA_FRAME):
+        self.spec = spec
+        self.header = np.frombuffer(spec.header, dtype=np.uint8)
+        self.frame_length = spec.length
+        self.unpack = spec.unpack
+        self.offsets = np.arange(self.frame_length)
+        self.pending = np.empty(0, dtype=np.uint8)
+
+        # Running counters
+        self.frames_decoded = 0
+        self.bytes_discarded = 0
+        self.resync_events = 0
+        self.checksum_errors = 0
+        self.frames_lost = 0
+        self.gap_events = 0
+        self.samples_overrun = 0
+        self.last_sequence = None
+        self.last_overruns = None
+
+    def reset(self):
+        """Drop any partial frame carried over from the previous chunk"""
+        self.pending = np.empty(0, dtype=np.uint8)
+        self.last_sequence = None  # Continuity is unknown after a reset
+        self.last_overruns = None
+
+    def find_frames(self, buf, final=False):
+        """
+        Locate frames in buf.
+
+        Returns (starts, tail_start): offsets of all confirmed frames, and the
+        offset from which bytes must be kept for the next chunk. With final=True
+        the last frames are accepted without waiting for a following header.
+        """
+        n = len(buf)
+        header_len = len(self.header)
+        if n < header_len:
+            return np.empty(0, dtype=np.intp), 0
+
+        # Vectorized header search: every position where all header bytes match
+        is_header = np.zeros(n + 1, dtype=bool)
+        match = is_header[: n - header_len + 1]
+        match[:] = buf[: n - header_len + 1] == self.header[0]
+        for i in range(1, header_len):
+            match &= buf[i : n - header_len + 1 + i] == self.header[i]
+        candidates = np.flatnonzero(match)
+
+        # Confirm each candidate by the header that must follow it
+        next_start = candidates + self.frame_length
+        checkable = next_start + header_len <= n
+        confirmed = checkable & is_header[np.minimum(next_start, n)]
+        if final:
+            confirmed |= ~checkable & (next_start <= n)
+        starts = candidates[confirmed]
+
+        # Never hand out overlapping frames. Overlaps only happen when payload
+        # bytes mimic a header, so the greedy pass is off the common path.
+        if len(starts) > 1 and np.any(np.diff(starts) < self.frame_length):
+            keep = []
+            next_free = 0
+            for start in starts.tolist():
+                if start >= next_free:
+                    keep.append(start)
+                    next_free = start + self.frame_length
+            starts = np.array(keep, dtype=np.intp)
+
+        # Keep the tail that may still become a frame: the first header we could
+        # not check yet, or bytes that could be the start of a header.
+        if final:
+            tail_start = n
+        else:
+            unchecked = candidates[~checkable]
+            tail_start = unchecked[0] if len(unchecked) else n - (header_len - 1)
+        if len(starts):
+            tail_start = max(tail_start, starts[-1] + self.frame_length)
+        return starts, tail_start
+
+    def decode_frames(self, chunk, final=False):
+        """Decode one chunk into an (n_frames, frame_length) array of raw frames"""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if len(self.pending):
+            data = np.concatenate((self.pending, data))
+
+        starts, tail_start = self.find_frames(data, final)
+        self.pending = data[tail_start:].copy()
+
+        # Every run of bytes between accepted frames was thrown away
+        gap_begin = np.concatenate(([0], starts + self.frame_length))
+        gap_end = np.append(starts, tail_start)
+        self.resync_events += int(np.count_nonzero(gap_end > gap_begin))
+        self.bytes_discarded += int(tail_start) - len(starts) * self.frame_length
+
+        # Gather all frames into one block in a single fancy-index
+        frames = data[starts[:, None] + self.offsets]
+        if self.spec.checksum and len(frames):
+            valid = self.spec.verify(frames)
+            bad = len(frames) - int(np.count_nonzero(valid))
+            if bad:
+                self.checksum_errors += bad
+                frames = frames[valid]
+        self.frames_decoded += len(frames)
+        self.check_sequence(frames)
+        self.check_overruns(frames)
+        return frames
+
+    def check_sequence(self, frames):
+        """Count the frames missing between consecutive frame counters"""
+        seq = self.spec.sequence(frames) if len(frames) else None
+        if seq is None:
+            return
+        if self.last_sequence is not None:
+            seq = np.concatenate(([self.last_sequence], seq))
+        self.last_sequence = int(seq[-1])
+
+        # Step 1 is the normal case; step 0 (stuck counter) is not counted
+        step = np.diff(seq) % (1 << self.spec.sequence_bits)
+        moved = int(np.count_nonzero(step))
+        self.frames_lost += int(step.sum()) - moved
+        self.gap_events += moved - int(np.count_nonzero(step == 1))
+
+    def check_overruns(self, frames):
+        """Add the steps of the sender's overrun counter to samples_overrun"""
+        count = self.spec.overruns(frames) if len(frames) else None
+        if count is None:
+            return
+        if self.last_overruns is not None:
+            count = np.concatenate(([self.last_overruns], count))
+        self.last_overruns = int(count[-1])
+        self.samples_overrun += int((np.diff(count) % 256).sum())
+
+    def counters(self):
+        """Snapshot of the running counters as a dict"""
+        return {
+            "frames_decoded": self.frames_decoded,
+            "samples_decoded": self.frames_decoded * self.spec.samples_per_frame,
+            "frames_lost": self.frames_lost,
+            "gap_events": self.gap_events,
+            "samples_overrun": self.samples_overrun,
+            "bytes_discarded": self.bytes_discarded,
+            "resync_events": self.resync_events,
+            "checksum_errors": self.checksum_errors,
+        }
+
+    def decode(self, chunk, final=False):
+        """
+        Decode one chunk of raw bytes.
+
+        Returns a (fields, n) int16 array - one row per spec field (adc,
+        filtered for the FPGA frame, ch0..ch7 + filtered for the multi-channel
+        frame) - holding every sample completed by this chunk, in arrival order.
+        """
+        return self.unpack(self.decode_frames(chunk, final))
+
+    def flush(self):
+        """Decode whatever is still pending at the end of a stream"""
+        return self.decode(b"", final=True)
+
+
+def detect_spec(data, specs=None):
+    """
+    Guess the frame format of a raw byte sample.
+
+    Every known format and every channel mask seen after a multi-channel
+    (0xAE 0xBD) or packed (0xAE 0xBE) header is tried; the one that confirms
+    the most frames wins. Returns None if no format confirms at least two frames.
+    """
+    data = np.frombuffer(data, dtype=np.uint8)
+    if specs is None:
+        specs = list(FRAME_SPECS.values())
+        for prefix, make in ((MULTI_HEADER, multichannel_frame), (PACKED_HEADER, packed_frame)):
+            header = np.frombuffer(prefix, dtype=np.uint8)
+            starts = np.flatnonzero((data[:-2] == header[0]) & (data[1:-1] == header[1]))
+            specs += [make(int(mask)) for mask in np.unique(data[starts + 2])]
+
+    best, best_count = None, 1
+    for spec in specs:
+        starts, _ = FrameDecoder(spec).find_frames(data)
+        # Weigh by frame length so short formats do not win on payload matches
+        count = len(starts) * spec.length
+        if len(starts) > 1 and count > best_count:
+            best, best_count = spec, count
+    return best
+
+
+class FrameReader:
+    """
+    Buffered frame reader on top of a serial port.
+
+    Pulls large chunks instead of a few bytes per frame and hands out decoded
+    NumPy blocks. Decoding statistics are printed once per report interval.
+    """
+
+    def __init__(self, ser, decoder=None, chunk_size=4096, report_interval=1.0, name="reader"):
+        self.ser = ser
+        self.name = name  # Report prefix, e.g. the board name
+        self.decoder = decoder if decoder is not None else FrameDecoder()
+        self.chunk_size = chunk_size
+        self.report_interval = report_interval
+
+        self.last_report = time.time()
+        self.last_counters = {}
+
+    def read_chunk(self, block=True):
+        """Read everything waiting; when blocking, wait for at least chunk_size bytes"""
+        waiting = self.ser.in_waiting
+        if not block:
+            return self.ser.read(waiting) if waiting else b""
+        return self.ser.read(max(waiting, self.chunk_size))
+
+    def detect(self, size=4096):
+        """
+        Switch the decoder to the format found in the next `size` bytes.
+
+        The sampled bytes are decoded as well, so no frames are lost. Returns
+        the detected FrameSpec, or None (decoder unchanged) if nothing matched.
+        """
+        data = self.ser.read(size)
+        spec = detect_spec(data)
+        if spec is not None:
+            self.decoder = FrameDecoder(spec)
+        self.decoder.pending = np.frombuffer(data, dtype=np.uint8).copy()
+        return spec
+
+    def read_block(self, block=True):
+        """Read one chunk and return the decoded (fields, n) array"""
+        fields = self.decoder.decode(self.read_chunk(block))
+        self.report()
+        return fields
+
+    def poll(self):
+        """Non-blocking read_block() for use from the GUI thread"""
+        return self.read_block(block=False)
+
+    def read_raw_frames(self, num_frames):
+        """Collect num_frames undecoded frames as an (n, frame_length) array"""
+        blocks = []
+        total = 0
+        while total < num_frames:
+            chunk = self.read_chunk()
+            if len(chunk) == 0:
+                break
+            frames = self.decoder.decode_frames(chunk)
+            blocks.append(frames)
+            total += len(frames)
+        if not blocks:
+            return np.empty((0, self.decoder.frame_length), dtype=np.uint8)
+        return np.concatenate(blocks)[:num_frames]
+
+    def report(self):
+        """Print decode rates, losses and the effective sample rate once per interval"""
+        now = time.time()
+        elapsed = now - self.last_report
+        if self.report_interval is None or elapsed < self.report_interval:
+            return
+
+        counters = self.decoder.counters()
+        rate = {name: (value - self.last_counters.get(name, 0)) / elapsed
+                for name, value in counters.items()}
+        print(f"[{self.name}] {rate['frames_decoded']:.0f} frames/s "
+              f"({rate['samples_decoded']:.0f} samples/s effective), "
+              f"{rate['frames_lost']:.0f} frames/s lost in {rate['gap_events']:.1f} gaps/s, "
+              f"{rate['samples_overrun']:.0f} samples/s overrun in the FPGA, "
+              f"{rate['bytes_discarded']:.0f} bytes/s discarded, {rate['resync_events']:.1f} resyncs/s, "
+              f"{rate['checksum_errors']:.1f} checksum errors/s")
+        self.last_report = now
+        self.last_counters = counters
@@ -0,0 +1,149 @@
+import time
+
+
+class LiveRenderer:
+    """
+    Blitted redraw loop for live plots.
+
+    The static part of the figure (axes, ticks, grid, legends) is rendered
+    once into a cached background. Every frame restores that background and
+    draws only the animated artists (e.g. lines) on top. The x-axis is
+    only touched through set_length(), which re-renders the background when
+    the window length actually changes - steady-state frames never relayout.
+
+    Overlays (e.g. stats text) change less often than the data and are
+    expensive to rasterize, so they are drawn into a second cached layer on
+    top of the background and only re-rendered after refresh_overlays().
+
+    Frame time (update + draw) and animation frames dropped because a frame
+    overran its interval are printed once per report interval.
+    """
+
+    def __init__(self, fig, axes, artists, length, interval_ms=50, report_interval=1.0, overlays=()):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.axes = list(axes)
+        self.artists = list(artists)
+        self.overlays = list(overlays)
+        self.interval = interval_ms / 1000
+        self.report_interval = report_interval
+        self.timer = None
+
+        # Animated artists are skipped by full redraws and end up in no background
+        for artist in self.artists + self.overlays:
+            artist.set_animated(True)
+
+        self.background = None
+        self.composite = None  # Background with the overlays drawn in
+        self.length = None
+        self.set_length(length)
+
+        # Resizes and toolbar zooms redraw everything - grab the new background then
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+        self.canvas.mpl_connect("close_event", lambda event: self.stop())
+
+        # Frame statistics
+        self.frames = 0
+        self.dropped_frames = 0
+        self.frame_time = 0.0  # Total seconds spent in update + draw
+        self.max_frame_time = 0.0  # Since the last report
+        self.last_tick = None
+        self.last_report = time.perf_counter()
+        self.last_counters = {}
+
+    def set_length(self, length):
+        """Show samples 0..length on every x-axis (no-op unless the length changed)"""
+        if length == self.length:
+            return
+        for ax in self.axes:
+            ax.set_xlim(0, length)
+        self.length = length
+        self.background = None  # Tick labels moved: re-render on the next frame
+
+    def refresh_overlays(self):
+        """Re-render the overlay layer on the next frame"""
+        self.composite = None
+
+    def on_draw(self, event):
+        """Cache the freshly drawn static background and put the artists back on it"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_overlays()
+        self.draw_artists()
+
+    def draw_overlays(self):
+        for artist in self.overlays:
+            self.fig.draw_artist(artist)
+        self.composite = self.canvas.copy_from_bbox(self.fig.bbox)
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def render(self):
+        """Show the current artist data"""
+        if not getattr(self.canvas, "supports_blit", False):
+            self.canvas.draw_idle()
+        elif self.background is None:
+            self.canvas.draw()  # Full redraw, on_draw() caches the background
+        else:
+            if self.composite is None:
+                self.canvas.restore_region(self.background)
+                self.draw_overlays()
+            self.canvas.restore_region(self.composite)
+            self.draw_artists()
+            self.canvas.blit(self.fig.bbox)
+        self.canvas.flush_events()
+
+    def frame(self, update):
+        """One animation frame: update() sets the artist data, then render()"""
+        start = time.perf_counter()
+        if self.last_tick is not None:
+            # Timer ticks that could not fire because the previous frame overran
+            self.dropped_frames += max(0, int((start - self.last_tick) / self.interval) - 1)
+        self.last_tick = start
+
+        update()
+        self.render()
+
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.frame_time += elapsed
+        self.max_frame_time = max(self.max_frame_time, elapsed)
+        self.report()
+
+    def start(self, update):
+        """Call frame(update) every interval on the GUI event loop"""
+        self.timer = self.canvas.new_timer(interval=int(self.interval * 1000))
+        self.timer.add_callback(self.frame, update)
+        self.timer.start()
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.stop()
+            self.timer = None
+
+    def counters(self):
+        return {"frames": self.frames, "dropped_frames": self.dropped_frames,
+                "frame_time": self.frame_time}
+
+    def report(self):
+        """Print frame rate, frame time and dropped frames once per interval"""
+        now = time.perf_counter()
+        elapsed = now - self.last_report
+        if self.report_interval is None or elapsed < self.report_interval:
+            return
+
+        counters = self.counters()
+        delta = {name: value - self.last_counters.get(name, 0) for name, value in counters.items()}
+        average = delta["frame_time"] / delta["frames"] if delta["frames"] else 0.0
+        print(f"[plot] {delta['frames'] / elapsed:.1f} frames/s, frame time {average * 1000:.1f} ms avg / "
+              f"{self.max_frame_time * 1000:.1f} ms max (budget {self.interval * 1000:.0f} ms), "
+              f"{delta['dropped_frames']} dropped frames")
+        self.last_report = now
+        self.last_counters = counters
+        self.max_frame_time = 0.0
+
+    def summary(self):
+        average = self.frame_time / self.frames if self.frames else 0.0
+        return (f"{self.frames} frames drawn, {average * 1000:.1f} ms average frame time, "
+                f"{self.dropped_frames} dropped frames")
@@ -0,0 +1,120 @@
+import sys
+import time
+import numpy as np
+
+from design_cache import DesignCache
+from fir_designer16 import SPEC
+from transfer import design_at, excess_delay, measure_capture
+
+# --- Measured vs designed FIR response ---
+# Record the board while the ADC sees a sweep or broadband noise:
+#   UARTRealTimePlotter(...).save_data("sweep.fpcap", duration_seconds=60)
+# then run: python measure_response.py sweep.fpcap
+# filtered/raw is estimated with Welch-averaged cross-spectra over the whole
+# capture (streamed from the memory map) and plotted over the design response
+# from the design cache.
+
+
+def plot_comparison(estimate, frequencies, h, h_fixed, reliable, filename, show=False, xlim=10000):
+    """Magnitude, phase error and coherence of the measurement against the design"""
+    import matplotlib.pyplot as plt
+
+    measured = estimate.magnitude_db()
+    designed = design_at(estimate.frequencies, frequencies, h_fixed)
+    fc = SPEC.cutoff
+
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(15, 12), sharex=True,
+                                        gridspec_kw={"height_ratios": (3, 1.5, 1)})
+    ax1.plot(frequencies, 20 * np.log10(np.maximum(abs(h), 1e-12)), 'b-', label='Design (floating point)', linewidth=2)
+    ax1.plot(frequencies, 20 * np.log10(np.maximum(abs(h_fixed), 1e-12)), 'r--',
+             label=f'Design ({SPEC.coeff_bits}-bit fixed point)', linewidth=1)
+    ax1.plot(estimate.frequencies, np.where(reliable, measured, np.nan), 'k-', label='Measured', linewidth=1)
+    ax1.plot(estimate.frequencies, np.where(reliable, np.nan, measured), color='0.7', linewidth=1,
+             label='Measured (low coherence)')
+    ax1.axvline(fc, color='g', linestyle='--', label=f'Cutoff: {fc} Hz')
+    ax1.axhline(-3, color='orange', linestyle='--', label='-3 dB')
+    ax1.set_ylabel('Magnitude (dB)')
+    ax1.set_ylim(-100, 10)
+    ax1.set_title(f'Measured vs Designed FIR Response ({estimate.frames} averaged frames)')
+    ax1.grid(True)
+    ax1.legend()
+
+    phase_error = np.angle(estimate.response() / designed, deg=True)
+    ax2.plot(estimate.frequencies, np.where(reliable, phase_error, np.nan), 'k-', linewidth=1)
+    ax2.set_ylabel('Phase error (degrees)')
+    ax2.grid(True)
+
+    ax3.plot(estimate.frequencies, estimate.coherence(), 'k-', linewidth=1)
+    ax3.set_ylabel('Coherence')
+    ax3.set_xlabel('Frequency (Hz)')
+    ax3.set_ylim(0, 1.05)
+    ax3.set_xlim(0, xlim)
+    ax3.grid(True)
+
+    plt.tight_layout()
+    if filename:
+        plt.savefig(filename, dpi=150, bbox_inches='tight')
+    if show:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+def main():
+    # Configuration
+    CAPTURE_FILE = 'capture.fpcap'  # Or pass the file name on the command line
+    INPUT_CHANNEL = None  # None: first recorded channel that is not 'filtered' ('adc', 'ch0', ...)
+    OUTPUT_CHANNEL = 'filtered'
+    NFFT = 4096  # Frequency resolution fs / NFFT (~6 Hz at 25 kHz)
+    OVERLAP = 2048
+    WINDOW = 'hann'
+    CHUNK_ROWS = 1 << 20  # Capture rows read per step (~4 MB for two channels)
+    MIN_COHERENCE = 0.9  # Bins below this are dominated by noise and not compared
+    CHECK_FREQUENCIES = (300, 1100, 2500)  # The tex/ bench tones and the cutoff
+    PLOT_FILE = 'fir_measured_response.png'
+
+    filename = sys.argv[1] if len(sys.argv) > 1 else CAPTURE_FILE
+
+    # Designed response, loaded from .fir_cache/ when fir_designer16.py has run before
+    result = DesignCache().design(SPEC)
+    frequencies, h, h_fixed = result.response()
+
+    start = time.perf_counter()
+    estimate, header = measure_capture(filename, INPUT_CHANNEL, OUTPUT_CHANNEL, chunk_rows=CHUNK_ROWS,
+                                       nfft=NFFT, overlap=OVERLAP, window=WINDOW)
+    elapsed = time.perf_counter() - start
+    samples = estimate.frames * estimate.hop
+    print(f"{filename}: {samples / header['sample_rate']:.1f} s at {header['sample_rate']} Hz, "
+          f"{estimate.frames} frames averaged in {elapsed:.1f} s")
+    if header["sample_rate"] != SPEC.fs:
+        print(f"Warning: capture sample rate {header['sample_rate']} Hz, design fs {SPEC.fs} Hz")
+    if estimate.frames == 0:
+        print(f"Capture too short: need at least {NFFT} samples")
+        return
+
+    # Compare where the measurement is trustworthy
+    designed = design_at(estimate.frequencies, frequencies, h_fixed)
+    designed_db = 20 * np.log10(np.maximum(np.abs(designed), 1e-12))
+    reliable = estimate.coherence() >= MIN_COHERENCE
+    reliable[0] = False  # DC is removed per frame
+    error = estimate.magnitude_db() - designed_db
+
+    print(f"\n{np.count_nonzero(reliable)} of {len(reliable)} bins with coherence >= {MIN_COHERENCE}")
+    if np.any(reliable):
+        worst = np.argmax(np.where(reliable, np.abs(error), -1))
+        print(f"Largest magnitude error: {error[worst]:+.2f} dB at {estimate.frequencies[worst]:.0f} Hz")
+        print(f"Excess delay vs design: {excess_delay(estimate, designed, reliable):+.2f} samples")
+
+    print(f"\n{'Frequency':>10} {'Designed':>10} {'Measured':>10} {'Error':>8} {'Coherence':>10}")
+    coherence = estimate.coherence()
+    for f in CHECK_FREQUENCIES:
+        k = int(round(f * NFFT / header['sample_rate']))
+        print(f"{estimate.frequencies[k]:8.0f} Hz {designed_db[k]:8.2f} dB {estimate.magnitude_db()[k]:8.2f} dB "
+              f"{error[k]:+7.2f} {coherence[k]:10.3f}")
+
+    plot_comparison(estimate, frequencies, h, h_fixed, reliable, PLOT_FILE)
+    print(f"\nComparison plot saved to '{PLOT_FILE}'")
+
+
+if __name__ == "__main__":
+    main()
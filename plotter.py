@@ -1,32 +1,40 @@
 import serial
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import numpy as np
-from collections import deque
-import threading
-import queue
+
+from acquisition import DROP_OLDEST, Acquisition
+from byte_source import open_source
+from envelope import plot_columns, plot_window
+from frame_decoder import FrameDecoder, detect_spec
+from live_plot import LiveRenderer
+from protocol import frame_spec
+from running_stats import RunningStats
 
 # --- Configuration ---
 # IMPORTANT: Set these values to match your hardware setup.
 SERIAL_PORT = (
     "/dev/ttyUSB0"  # Change this! e.g., 'COM3' on Windows, '/dev/ttyUSB0' on Linux
 )
+# Without hardware use "synthetic:" or "replay:capture.bin" (see byte_source.py)
+RECORD_FILE = None  # Set to a filename to also save the raw byte stream
 BAUD_RATE = 3000000  # Change this to match the baud rate set in your VHDL
+# "fpga" for the default [ADC][FIR] frame, "multi-ff" for FP_VHDL.vhd built with
+# MULTI_CHANNEL, "packed-01" with PACKED_BLOCKS (hex channel mask, see protocol.py),
+# None to detect from the stream
+FRAME_FORMAT = "fpga"
 
 # Plotting settings
 MAX_SAMPLES_TO_PLOT = 500  # Number of recent samples to display on the plot
+# Windows longer than two samples per pixel are drawn as a min/max envelope
+# (envelope.py), so e.g. 250000 (5 s at 50 kS/s) still redraws quickly
 PLOT_UPDATE_INTERVAL_MS = 50  # How often to update the plot (in milliseconds)
-
-# --- State Machine for Parsing (used in reader thread) ---
-STATE_WAIT_HEADER_1 = 0
-STATE_WAIT_HEADER_2 = 1
-STATE_READ_DATA = 2
+STATS_UPDATE_INTERVAL_MS = 250  # How often to refresh the statistics text (text is slow to draw)
+PLOT_QUEUE_BLOCKS = 256  # Blocks buffered between acquisition and GUI (~2.5 s, one block per 10 ms)
 
 
-def setup_serial(port, baud):
-    """Attempts to configure and open the serial port."""
+def setup_serial(port, baud, record_to=None):
+    """Attempts to configure and open the serial port (or replay/synthetic source)."""
     try:
-        ser = serial.Serial(port, baud, timeout=1)
+        ser = open_source(port, baud, timeout=1, record_to=record_to)
         print(f"Successfully opened serial port {port} at {baud} baud.")
         return ser
     except serial.SerialException as e:
@@ -37,165 +45,129 @@ def setup_serial(port, baud):
         return None
 
 
-def serial_reader_thread(ser, data_queue, stop_event):
-    """
-    This function runs in a separate thread and continuously reads from the serial port.
-    It parses data frames and puts the results into a thread-safe queue.
-    """
-    current_state = STATE_WAIT_HEADER_1
-    data_buffer = []
-
-    while not stop_event.is_set():
-        try:
-            # Read all available bytes to process them in a batch
-            if ser.in_waiting > 0:
-                bytes_in = ser.read(ser.in_waiting)
-                for byte_in in bytes_in:
-                    # --- FSM Logic ---
-                    if current_state == STATE_WAIT_HEADER_1:
-                        if byte_in == 0xAE:
-                            current_state = STATE_WAIT_HEADER_2
-
-                    elif current_state == STATE_WAIT_HEADER_2:
-                        if byte_in == 0xBC:
-                            data_buffer = []  # Clear buffer for new data
-                            current_state = STATE_READ_DATA
-                        else:
-                            current_state = STATE_WAIT_HEADER_1
-
-                    elif current_state == STATE_READ_DATA:
-                        data_buffer.append(byte_in)
-                        if len(data_buffer) == 4:
-                            d0_h, d0_l, d1_h, d1_l = data_buffer
-                            adc_val_0 = (d0_h << 4) | (d0_l >> 4)
-                            adc_val_1_raw = (d1_h << 4) | (d1_l >> 4)
-                            
-
-                            # Put the complete data packet into the queue
-                            data_queue.put((adc_val_0, adc_val_1_raw))
-
-                            current_state = STATE_WAIT_HEADER_1
-        except Exception as e:
-            print(f"Error in reader thread: {e}")
-            break
-    print("Reader thread stopped.")
+def open_decoder(ser, name):
+    """FrameDecoder for the named format, or for the one detected on the port"""
+    if name is not None:
+        return FrameDecoder(frame_spec(name))
+    data = ser.read(4096)
+    spec = detect_spec(data)
+    if spec is None:
+        print("Could not detect the frame format - falling back to 'fpga'")
+        spec = frame_spec("fpga")
+    decoder = FrameDecoder(spec)
+    decoder.decode(data)  # Keep the partial frame at the end of the sample
+    return decoder
 
 
 def main():
-    ser = setup_serial(SERIAL_PORT, BAUD_RATE)
+    ser = setup_serial(SERIAL_PORT, BAUD_RATE, RECORD_FILE)
     if not ser:
         return
 
-    data_queue = queue.Queue()
-    ch0_data = deque(maxlen=MAX_SAMPLES_TO_PLOT)
-    ch1_data = deque(maxlen=MAX_SAMPLES_TO_PLOT)
-
-    # --- Create One Figure with Two Subplots ---
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-    
-    # Channel 0 subplot
-    (line1,) = ax1.plot(
-        [], [], marker="o", markersize=0, linestyle="-", label="ADC Channel 0"
-    )
-    ax1.set_title("Live ADC Data - Channel 0", fontsize=14)
-    ax1.set_xlabel("Sample Number (most recent)", fontsize=11)
-    ax1.set_ylabel("ADC Value (12-bit)", fontsize=11)
-    ax1.legend()
-    ax1.grid(True)
-    ax1.set_ylim(0, 4096)
-    ax1.set_xlim(0, MAX_SAMPLES_TO_PLOT)
-
-    # Add text boxes for Channel 0 statistics
-    ch0_stats_text = ax1.text(0.02, 0.98, "", transform=ax1.transAxes, 
-                             verticalalignment='top', bbox=dict(boxstyle='round', 
-                             facecolor='wheat', alpha=0.8), fontsize=10)
-
-    # Channel 1 subplot
-    (line2,) = ax2.plot(
-        [], [], marker="x", markersize=0, linestyle="-", color="r", label='ADC Channel 1 (Filtered)'
-    )
-    ax2.set_title("Live ADC Data - Channel 1 (Filtered)", fontsize=14)
-    ax2.set_xlabel("Sample Number (most recent)", fontsize=11)
-    ax2.set_ylabel("ADC Value (12-bit)", fontsize=11)
-    ax2.legend()
-    ax2.grid(True)
-    ax2.set_ylim(0, 4096)
-    ax2.set_xlim(0, MAX_SAMPLES_TO_PLOT)
-
-    # Add text boxes for Channel 1 statistics
-    ch1_stats_text = ax2.text(0.02, 0.98, "", transform=ax2.transAxes, 
-                             verticalalignment='top', bbox=dict(boxstyle='round', 
-                             facecolor='lightblue', alpha=0.8), fontsize=10)
+    decoder = open_decoder(ser, FRAME_FORMAT)
+    spec = decoder.spec
+    print(f"Frame format: {spec.describe()} ({spec.channels} channels)")
+
+    # The acquisition thread waits on the port and decodes; the GUI only drains its queue.
+    # Newest data wins if the GUI falls behind (acquisition.py)
+    acquisition = Acquisition()
+    board = acquisition.add_board(ser, decoder, name="reader")
+    plot_queue = board.subscribe(PLOT_QUEUE_BLOCKS, policy=DROP_OLDEST)
+
+    # --- Create One Figure with One Subplot per Channel ---
+    fig, axes = plt.subplots(spec.channels, 1, figsize=(12, 5 * min(spec.channels, 2)),
+                             sharex=True, squeeze=False)
+    axes = axes[:, 0]
+    colors = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+
+    labels = []
+    stats_texts = []
+    for ax, name in zip(axes, spec.field_names):
+        label = "FIR Output (Filtered)" if name == "filtered" else f"ADC {name.upper()}"
+        ax.set_title(f"Live ADC Data - {label}", fontsize=14 if spec.channels <= 2 else 10)
+        ax.set_ylabel("ADC Value (12-bit)", fontsize=11)
+        ax.grid(True)
+        ax.set_ylim(0, 4096)
+        labels.append(label)
+
+        # Add a text box for the channel statistics
+        stats_texts.append(ax.text(0.02, 0.98, "", transform=ax.transAxes,
+                                   verticalalignment='top', bbox=dict(boxstyle='round',
+                                   facecolor='wheat', alpha=0.8), fontsize=10))
+    axes[-1].set_xlabel("Sample Number (most recent)", fontsize=11)
 
     # Adjust layout to prevent overlap
     plt.tight_layout()
 
-    # --- Define single update function for both subplots ---
-    def update_plots(frame):
-        # Pull any new data from the queue
-        while not data_queue.empty():
-            try:
-                adc0, adc1 = data_queue.get_nowait()
-                ch0_data.append(adc0)
-                ch1_data.append(adc1)
-            except queue.Empty:
-                break
-        
-        # Update both lines
-        line1.set_data(np.arange(len(ch0_data)), ch0_data)
-        line2.set_data(np.arange(len(ch1_data)), ch1_data)
-        
-        # Calculate and display statistics for Channel 0
-        if len(ch0_data) > 0:
-            ch0_array = np.array(ch0_data)
-            ch0_min = np.min(ch0_array)
-            ch0_max = np.max(ch0_array)
-            ch0_pp = ch0_max - ch0_min
-            ch0_mean = np.mean(ch0_array)
-            ch0_std = np.std(ch0_array)
-            
-            ch0_stats = f"P-P: {ch0_pp}"
-            ch0_stats_text.set_text(ch0_stats)
-        
-        # Calculate and display statistics for Channel 1
-        if len(ch1_data) > 0:
-            ch1_array = np.array(ch1_data)
-            ch1_min = np.min(ch1_array)
-            ch1_max = np.max(ch1_array)
-            ch1_pp = ch1_max - ch1_min
-            ch1_mean = np.mean(ch1_array)
-            ch1_std = np.std(ch1_array)
-            
-            ch1_stats = f"P-P: {ch1_pp}"
-            ch1_stats_text.set_text(ch1_stats)
-        
-        return (line1, line2, ch0_stats_text, ch1_stats_text)
-
-    # --- Start Reader Thread ---
-    stop_event = threading.Event()
-    reader_thread = threading.Thread(
-        target=serial_reader_thread, args=(ser, data_queue, stop_event)
-    )
-    reader_thread.daemon = True
-    reader_thread.start()
+    # Newest MAX_SAMPLES_TO_PLOT samples per channel, reduced to the plot resolution
+    window = plot_window(MAX_SAMPLES_TO_PLOT, plot_columns(axes[0]), channels=spec.channels)
+
+    # One line (or envelope band) per channel, sized for the laid-out axes
+    lines = []
+    for ch, (ax, label) in enumerate(zip(axes, labels)):
+        lines.append(window.add_artist(ax, colors[ch % len(colors)], label=label))
+        ax.legend(loc="upper right")
+
+    # Blitted redraws: lines over a cached background, stats text in a cached overlay (live_plot.py)
+    renderer = LiveRenderer(fig, axes, lines, MAX_SAMPLES_TO_PLOT,
+                            interval_ms=PLOT_UPDATE_INTERVAL_MS, overlays=stats_texts)
+
+    # Window statistics, updated from the new samples only (running_stats.py)
+    stats = RunningStats(MAX_SAMPLES_TO_PLOT, channels=spec.channels)
+    shown_stats = [""] * spec.channels
+    stats_every = max(1, STATS_UPDATE_INTERVAL_MS // PLOT_UPDATE_INTERVAL_MS)  # In frames
+    frame_count = 0
+
+    # --- Define single update function for all subplots ---
+    def update_plots():
+        nonlocal frame_count
+
+        # Drain everything decoded since the last frame in one copy
+        new_data = plot_queue.drain()
+        if new_data.shape[1] == 0:
+            return
+        window.extend(new_data)
+        stats.extend(new_data)
+
+        # x comes from the window's preallocated arrays - only the y data changes
+        window.update_artists(lines)
+
+        frame_count += 1
+        if frame_count % stats_every:
+            return
+
+        # Text is only re-rendered when a value changed
+        columns = zip(stats.peak_to_peak(), stats.mean(), stats.std(), stats.rms(),
+                      stats.dc_offset(), stats.clipped())
+        for ch, (pp, mean, std, rms, dc, clipped) in enumerate(columns):
+            text = (f"P-P: {pp}  Mean: {mean:.1f}  Std: {std:.1f}\n"
+                    f"RMS: {rms:.1f}  DC: {dc:+.1f}  Clipped: {clipped}")
+            if text != shown_stats[ch]:
+                stats_texts[ch].set_text(text)
+                shown_stats[ch] = text
+                renderer.refresh_overlays()
+
+    # --- Start Acquisition Thread ---
+    acquisition.start()
 
     print("Starting data acquisition... Close the plot window to stop.")
-    print("Statistics will be displayed on the plots showing Min, Max, Peak-to-Peak, Mean, and Standard Deviation.")
+    print("Statistics will be displayed on the plots showing Peak-to-Peak, Mean, Standard Deviation, "
+          "RMS and DC offset (relative to mid-scale) and the number of clipped samples.")
 
-    # --- Create single animation for both subplots ---
-    ani = animation.FuncAnimation(
-        fig, update_plots, blit=True, interval=PLOT_UPDATE_INTERVAL_MS
-    )
+    # --- Drive all subplots from one GUI timer ---
+    renderer.start(update_plots)
 
     try:
         plt.show()  # This will block until the window is closed
     except Exception as e:
         print(f"An error occurred during plotting: {e}")
     finally:
-        print("Stopping reader thread...")
-        stop_event.set()
-        reader_thread.join(timeout=2)
-        ser.close()
+        renderer.stop()
+        print(f"Plot: {renderer.summary()}")
+        print("Stopping acquisition...")
+        acquisition.close()
+        for line in acquisition.summary():
+            print(line)
         print("Serial port closed.")
 
 
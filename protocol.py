@@ -0,0 +1,376 @@
+import functools
+import numpy as np
+
+
+class Field:
+    """
+    One value inside a frame.
+
+    The field occupies `size` bytes at `offset` (big-endian on the wire). The
+    value is the `bits`-wide group that starts `shift` bits above the LSB of
+    that word, optionally sign-extended.
+    """
+
+    def __init__(self, name, offset, size=2, bits=12, shift=0, signed=False):
+        self.name = name
+        self.offset = offset
+        self.size = size
+        self.bits = bits
+        self.shift = shift
+        self.signed = signed
+        self.mask = (1 << bits) - 1
+
+    def extract(self, words):
+        """Pull the field value out of raw wire words (vectorized)"""
+        values = (words.astype(np.int32) >> self.shift) & self.mask
+        if self.signed:
+            sign = 1 << (self.bits - 1)
+            values = (values ^ sign) - sign
+        return values
+
+    def pack(self, values):
+        """Inverse of extract(): place values into raw wire words"""
+        return (np.asarray(values, dtype=np.int64) & self.mask) << self.shift
+
+
+class FrameSpec:
+    """
+    Declarative description of a fixed-length UART frame.
+
+    The spec is compiled once into a NumPy structured dtype, so a whole block
+    of frames is decoded by viewing the bytes as records and extracting each
+    field as a column - no per-frame Python code.
+
+    `sequence` lists the fields of a frame counter, most significant first.
+    They may share bytes with data fields (the FPGA puts the counter into the
+    unused low nibbles of the left-aligned words).
+    """
+
+    def __init__(self, name, header, fields, length=None, sequence=()):
+        self.name = name
+        self.header = bytes(header)
+        self.fields = list(fields)
+        self.length = length or max(f.offset + f.size for f in self.fields)
+        self.field_names = [f.name for f in self.fields]
+        self.channels = len(self.fields)
+        self.samples_per_frame = 1
+        self.checksum = False
+        self.sequence_fields = list(sequence)
+        self.sequence_bits = sum(f.bits for f in self.sequence_fields)
+
+        self.dtype = np.dtype({
+            "names": ["header"] + self.field_names,
+            "formats": [("u1", len(self.header))] + [f">u{f.size}" for f in self.fields],
+            "offsets": [0] + [f.offset for f in self.fields],
+            "itemsize": self.length,
+        })
+
+        # Fields that are back-to-back words with the same layout (the
+        # multi-channel frame) are decoded as one 2-D array in a single pass
+        first = self.fields[0]
+        self.uniform = all(
+            (f.offset, f.size, f.bits, f.shift, f.signed)
+            == (first.offset + i * first.size, first.size, first.bits, first.shift, first.signed)
+            for i, f in enumerate(self.fields)
+        )
+
+    def byte_labels(self):
+        """Short label for every byte position, e.g. ['0xAE', '0xBC', 'ADC_H', ...]"""
+        labels = [f"0x{b:02X}" for b in self.header]
+        labels += ["?"] * (self.length - len(labels))
+        for f in self.fields:
+            name = f.name.upper()
+            if f.size == 1:
+                labels[f.offset] = name
+            else:
+                labels[f.offset] = f"{name}_H"
+                for i in range(1, f.size):
+                    labels[f.offset + i] = f"{name}_L"
+        return labels
+
+    def describe(self):
+        """Human readable layout, e.g. [0xAE][0xBC][ADC_H][ADC_L]..."""
+        return "".join(f"[{label}]" for label in self.byte_labels())
+
+    def unpack(self, frames):
+        """
+        Decode an (n, length) uint8 block into a (fields, n) int16 array.
+
+        Row i holds field i, so `adc, filtered = spec.unpack(frames)` still
+        works for the two-field formats.
+        """
+        frames = np.ascontiguousarray(frames, dtype=np.uint8).reshape(-1, self.length)
+        if self.uniform:
+            first = self.fields[0]
+            end = first.offset + self.channels * first.size
+            words = frames[:, first.offset : end].view(f">u{first.size}")
+            return first.extract(words.T).astype(np.int16, order="C")
+
+        records = frames.view(self.dtype).reshape(-1)
+        out = np.empty((self.channels, len(records)), dtype=np.int16)
+        for row, f in zip(out, self.fields):
+            row[:] = f.extract(records[f.name])
+        return out
+
+    def verify(self, frames):
+        """Per-frame validity of an (n, length) block (plain frames carry no checksum)"""
+        return np.ones(len(frames), dtype=bool)
+
+    def overruns(self, frames):
+        """Sender-side overrun counter per frame; plain frames have none"""
+        return None
+
+    def _words(self, frames, f):
+        """Writable big-endian view of field f in an (n, length) uint8 array"""
+        return frames[:, f.offset : f.offset + f.size].view(f">u{f.size}")[:, 0]
+
+    def sequence(self, frames):
+        """Frame counter of every frame in an (n, length) block, or None if the format has none"""
+        if not self.sequence_fields:
+            return None
+        frames = np.ascontiguousarray(frames, dtype=np.uint8).reshape(-1, self.length)
+        seq = 0
+        for f in self.sequence_fields:
+            seq = (seq << f.bits) | f.extract(self._words(frames, f))
+        return seq
+
+    def encode(self, *columns, sequence=0):
+        """
+        Build the wire bytes for frames holding the given field columns.
+
+        Takes one array per field, or a single (fields, n) array. Frames are
+        numbered from `sequence` on if the format has a counter.
+        """
+        if len(columns) == 1 and np.ndim(columns[0]) == 2:
+            columns = columns[0]
+        count = len(columns[0])
+        records = np.zeros(count, dtype=self.dtype)
+        records["header"] = np.frombuffer(self.header, dtype=np.uint8)
+        for f, column in zip(self.fields, columns):
+            records[f.name] = f.pack(column)
+
+        if self.sequence_fields:
+            frames = records.view(np.uint8).reshape(count, self.length)
+            seq = sequence + np.arange(count)
+            for f in reversed(self.sequence_fields):
+                self._words(frames, f)[:] |= f.pack(seq).astype(frames.dtype)
+                seq = seq >> f.bits
+        return records.tobytes()
+
+
+# --- Known frame formats ---
+
+# What FP_VHDL.vhd actually sends: 12-bit values left-aligned in 16 bits,
+# value = (d_h << 4) | (d_l >> 4). The low nibbles of D0_L and D1_L carry an
+# 8-bit frame counter (upper half in D0_L).
+FPGA_FRAME = FrameSpec(
+    "fpga",
+    b"\xae\xbc",
+    [
+        Field("adc", offset=2, bits=12, shift=4),
+        Field("filtered", offset=4, bits=12, shift=4),
+    ],
+    sequence=[
+        Field("seq_hi", offset=3, size=1, bits=4),
+        Field("seq_lo", offset=5, size=1, bits=4),
+    ],
+)
+
+# Older fplotter.py layout: right-aligned 12-bit values behind 0xAE 0xAE
+LEGACY_AEAE_FRAME = FrameSpec(
+    "legacy-aeae",
+    b"\xae\xae",
+    [
+        Field("adc", offset=2, bits=12),
+        Field("filtered", offset=4, bits=12),
+    ],
+)
+
+# Older debug.py layout: 12-bit ADC and signed 16-bit filter output behind 0xFF 0xFF
+LEGACY_FFFF_FRAME = FrameSpec(
+    "legacy-ffff",
+    b"\xff\xff",
+    [
+        Field("adc", offset=2, bits=12),
+        Field("filtered", offset=4, bits=16, signed=True),
+    ],
+)
+
+FRAME_SPECS = {spec.name: spec for spec in (FPGA_FRAME, LEGACY_AEAE_FRAME, LEGACY_FFFF_FRAME)}
+
+# FP_VHDL.vhd with MULTI_CHANNEL = TRUE: the third header byte is CHANNEL_MASK,
+# followed by one left-aligned 12-bit word per ADC input whose mask bit is set
+# (lowest channel first) and the FIR output last:
+#   [0xAE][0xBD][MASK][CHa_H][CHa_L]...[FILTERED_H][FILTERED_L]
+# As in the fpga frame the low nibbles of the first two words hold an 8-bit
+# frame counter (only 4 bits with mask 0, where the FIR word is the only one).
+# A full frame is 3 + 2 * (channels + 1) bytes. All eight inputs take 21 bytes,
+# more than fits into one 25 kHz sample period at 3 Mbaud, so the FPGA then
+# sends every second sample (12.5 kHz per channel).
+MULTI_HEADER = b"\xae\xbd"
+PACKED_HEADER = b"\xae\xbe"
+ADC_CHANNELS = 8
+BLOCK_SAMPLES = 16  # FP_VHDL.vhd BLOCK_SAMPLES
+
+
+def multichannel_frame(mask=0xFF):
+    """FrameSpec of the multi-channel frame for a given channel mask"""
+    if not 0 <= mask < 1 << ADC_CHANNELS:
+        raise ValueError(f"Channel mask must fit in {ADC_CHANNELS} bits, got {mask:#x}")
+    header = MULTI_HEADER + bytes([mask])
+    names = [f"ch{i}" for i in range(ADC_CHANNELS) if mask >> i & 1] + ["filtered"]
+    fields = [Field(name, offset=len(header) + 2 * i, bits=12, shift=4)
+              for i, name in enumerate(names)]
+    sequence = [Field(f"seq{i}", offset=f.offset + 1, size=1, bits=4)
+                for i, f in enumerate(fields[:2])]
+    return FrameSpec(f"multi-{mask:02x}", header, fields, sequence=sequence)
+
+
+def _crc8_table(poly=0x07):
+    table = np.zeros(256, dtype=np.uint8)
+    for i in range(256):
+        c = i
+        for _ in range(8):
+            c = ((c << 1) ^ poly) & 0xFF if c & 0x80 else (c << 1) & 0xFF
+        table[i] = c
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def _crc8_positions(length):
+    """(length, 256) table: CRC of a message that is zero except byte value b at position p"""
+    table = np.empty((length, 256), dtype=np.uint8)
+    table[-1] = CRC8_TABLE
+    for p in range(length - 2, -1, -1):
+        table[p] = CRC8_TABLE[table[p + 1]]  # Every following zero byte shifts the CRC once more
+    return table
+
+
+def crc8(data):
+    """
+    CRC-8 (polynomial 0x07, init 0) of every row of an (n, m) uint8 array.
+
+    Same value as the byte-serial CRC in FP_VHDL.vhd. The CRC is linear, so
+    it is the XOR of one table entry per byte position - a single gather and
+    reduction for all rows instead of a loop over the bytes.
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    length = data.shape[-1]
+    terms = _crc8_positions(length)[np.arange(length), data]
+    return np.bitwise_xor.reduce(terms, axis=-1)
+
+
+CRC8_TABLE = _crc8_table()
+
+
+class PackedBlockSpec:
+    """
+    Block of packed 12-bit samples (FP_VHDL.vhd with PACKED_BLOCKS = TRUE).
+
+        [0xAE][0xBE][MASK][SEQ][OVR][payload][CRC]
+
+    MASK selects the ADC inputs like the multi-channel frame, each sample
+    is those channel words plus the FIR output. The payload holds
+    block_samples samples back to back, two 12-bit words in three bytes:
+    [a11..a4][a3..a0 b11..b8][b7..b0]. SEQ counts blocks modulo 256, OVR
+    counts (modulo 256) the samples the FPGA overwrote before they could be
+    sent, and the CRC-8 covers MASK through the last payload byte.
+
+    Works with FrameDecoder like a FrameSpec: a "frame" is one block and
+    unpack() returns its samples_per_frame samples per channel.
+    """
+
+    def __init__(self, mask=0x01, block_samples=BLOCK_SAMPLES):
+        names = [f"ch{i}" for i in range(ADC_CHANNELS) if mask >> i & 1] + ["filtered"]
+        if block_samples * len(names) % 2:
+            raise ValueError("Packed blocks need an even number of words")
+        self.name = f"packed-{mask:02x}"
+        self.mask = mask
+        self.header = PACKED_HEADER + bytes([mask])
+        self.field_names = names
+        self.channels = len(names)
+        self.samples_per_frame = block_samples
+        self.checksum = True
+        self.sequence_bits = 8
+
+        self.sequence_offset = len(self.header)
+        self.overrun_offset = len(self.header) + 1
+        self.payload_offset = len(self.header) + 2
+        self.payload_size = 3 * block_samples * self.channels // 2
+        self.length = self.payload_offset + self.payload_size + 1
+
+    def byte_labels(self):
+        labels = [f"0x{b:02X}" for b in self.header] + ["SEQ", "OVR"]
+        labels += [f"P{i}" for i in range(self.payload_size)]
+        return labels + ["CRC"]
+
+    def describe(self):
+        return (f"[0x{self.header[0]:02X}][0x{self.header[1]:02X}][MASK=0x{self.mask:02X}][SEQ][OVR]"
+                f"[{self.samples_per_frame} x {'/'.join(self.field_names)}, "
+                f"packed {self.payload_size} bytes][CRC]")
+
+    def verify(self, frames):
+        """True for every block whose CRC matches"""
+        frames = np.asarray(frames, dtype=np.uint8)
+        return crc8(frames[:, len(PACKED_HEADER):-1]) == frames[:, -1]
+
+    def sequence(self, frames):
+        """Block sequence numbers of an (n, length) block"""
+        return np.asarray(frames)[:, self.sequence_offset].astype(np.int32)
+
+    def overruns(self, frames):
+        """Running count (modulo 256) of samples the FPGA overwrote, one per block"""
+        return np.asarray(frames)[:, self.overrun_offset].astype(np.int32)
+
+    def unpack(self, frames):
+        """Decode (n, length) blocks into a (channels, n * samples_per_frame) int16 array"""
+        frames = np.asarray(frames, dtype=np.uint8).reshape(-1, self.length)
+        n = len(frames)
+        triples = frames[:, self.payload_offset : self.payload_offset + self.payload_size]
+        triples = triples.reshape(n, self.payload_size // 3, 3).astype(np.int16)  # Explicit: n may be 0
+
+        words = np.empty(triples.shape[:2] + (2,), dtype=np.int16)
+        words[..., 0] = (triples[..., 0] << 4) | (triples[..., 1] >> 4)
+        words[..., 1] = ((triples[..., 1] & 0x0F) << 8) | triples[..., 2]
+        # Word stream is sample-major: s0 ch.., s1 ch.., ...
+        return np.ascontiguousarray(words.reshape(-1, self.channels).T)
+
+    def encode(self, *columns, sequence=0, overruns=0):
+        """Wire bytes for whole blocks; the sample count must fill the blocks exactly"""
+        if len(columns) == 1 and np.ndim(columns[0]) == 2:
+            columns = columns[0]
+        words = np.asarray(columns, dtype=np.int64).T.reshape(-1, 2) & 0xFFF
+        count = len(words) * 2 // (self.channels * self.samples_per_frame)
+        if count * self.channels * self.samples_per_frame != len(words) * 2:
+            raise ValueError(f"{self.name} needs a multiple of {self.samples_per_frame} samples")
+
+        triples = np.empty((len(words), 3), dtype=np.uint8)
+        triples[:, 0] = words[:, 0] >> 4
+        triples[:, 1] = ((words[:, 0] & 0x0F) << 4) | (words[:, 1] >> 8)
+        triples[:, 2] = words[:, 1] & 0xFF
+
+        blocks = np.empty((count, self.length), dtype=np.uint8)
+        blocks[:, : len(self.header)] = np.frombuffer(self.header, dtype=np.uint8)
+        blocks[:, self.sequence_offset] = (sequence + np.arange(count)) & 0xFF
+        blocks[:, self.overrun_offset] = np.asarray(overruns) & 0xFF
+        blocks[:, self.payload_offset : -1] = triples.reshape(count, -1)
+        blocks[:, -1] = crc8(blocks[:, len(PACKED_HEADER):-1])
+        return blocks.tobytes()
+
+
+def packed_frame(mask=0x01, block_samples=BLOCK_SAMPLES):
+    """PackedBlockSpec for a channel mask (0x01: ADC channel 0 + FIR, the default build)"""
+    if not 0 <= mask < 1 << ADC_CHANNELS:
+        raise ValueError(f"Channel mask must fit in {ADC_CHANNELS} bits, got {mask:#x}")
+    return PackedBlockSpec(mask, block_samples)
+
+
+def frame_spec(name):
+    """Look up a spec by name: one of FRAME_SPECS, 'multi-<hex mask>' or 'packed-<hex mask>'"""
+    if name in FRAME_SPECS:
+        return FRAME_SPECS[name]
+    if name.startswith("multi-"):
+        return multichannel_frame(int(name[len("multi-"):], 16))
+    if name.startswith("packed-"):
+        return packed_frame(int(name[len("packed-"):], 16))
+    raise KeyError(f"Unknown frame format {name!r}")
@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class HistoryBuffer:
+    """
+    Fixed-size circular history of the most recent samples.
+
+    The storage is twice the capacity and every sample is written to both
+    halves, so the last `len(self)` samples are always one contiguous slice.
+    view() therefore returns them oldest-first without copying, however long
+    the window is.
+
+    With channels=N the buffer holds N channels side by side: extend() takes
+    (N, n) blocks and view() returns an (N, len) array.
+    """
+
+    def __init__(self, capacity, dtype=np.int16, channels=None):
+        self.capacity = capacity
+        self.channels = channels
+        shape = (2 * capacity,) if channels is None else (channels, 2 * capacity)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.head = 0  # Next write position in the first half
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def append(self, value):
+        """Add a single sample (one value per channel)"""
+        self.data[..., self.head] = value
+        self.data[..., self.head + self.capacity] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, values):
+        """Add a block of samples, keeping only the newest `capacity`"""
+        values = np.asarray(values)[..., -self.capacity :]
+        n = values.shape[-1]
+        if n == 0:
+            return
+
+        first = min(n, self.capacity - self.head)
+        for base in (0, self.capacity):
+            self.data[..., base + self.head : base + self.head + first] = values[..., :first]
+            self.data[..., base : base + n - first] = values[..., first:]
+
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def view(self):
+        """Oldest-to-newest view of the stored samples (valid until the next write)"""
+        end = self.head + self.capacity
+        return self.data[..., end - self.count : end]
@@ -0,0 +1,182 @@
+import numpy as np
+
+from ring_buffer import HistoryBuffer
+
+
+class SlidingExtreme:
+    """
+    Sliding-window maximum (or minimum, sign=-1) as a monotonic deque.
+
+    The deque holds the samples that can still become the window maximum:
+    strictly decreasing values with increasing absolute indices, so the
+    front is the current maximum. A block is pushed in one go: the block's
+    own candidates are the samples larger than everything after them
+    (reverse running maximum), older entries not above the block maximum
+    are cut off with a binary search, and expired entries are dropped from
+    the front.
+
+    Like HistoryBuffer the entries live in preallocated arrays, here between
+    a head and a tail index: survivors stay where they are and new candidates
+    are written behind them. Values are stored negated (increasing), so the
+    binary searches run on views without a copy. The deque never holds more
+    than `window` entries, so with twice that capacity the live part only
+    has to be moved to the front after at least `window` new entries. Each
+    sample enters and leaves the deque once, so the cost is O(new samples)
+    amortized.
+    """
+
+    def __init__(self, window, sign=1):
+        self.window = window
+        self.sign = sign
+        capacity = 2 * window
+        self.keys = np.zeros(capacity, dtype=np.int64)  # -sign * sample, increasing
+        self.indices = np.zeros(capacity, dtype=np.int64)  # Absolute sample index, increasing
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def clear(self):
+        self.head = 0
+        self.tail = 0
+
+    def extend(self, block, start):
+        """Push samples with absolute indices start, start + 1, ..."""
+        n = len(block)
+        if n == 0:
+            return
+        skip = max(0, n - self.window)  # Samples that are out of the window once the block is in
+        keys = -self.sign * block[skip:].astype(np.int64)
+
+        # Within the block: keep samples greater than every later sample (smaller key)
+        later = np.empty(len(keys), dtype=np.int64)
+        later[-1] = np.iinfo(np.int64).max
+        later[:-1] = np.minimum.accumulate(keys[:0:-1])[::-1]
+        keep = np.flatnonzero(keys < later)
+
+        # Older entries are dominated unless they exceed the block maximum
+        tail = self.head + np.searchsorted(self.keys[self.head : self.tail], keys[keep[0]], side="left")
+        count = len(keep)
+        if tail + count > len(self.keys):
+            size = tail - self.head
+            self.keys[:size] = self.keys[self.head : tail]
+            self.indices[:size] = self.indices[self.head : tail]
+            self.head, tail = 0, size
+        self.keys[tail : tail + count] = keys[keep]
+        self.indices[tail : tail + count] = start + skip + keep
+        self.tail = tail + count
+
+        # Drop entries that slid out of the window
+        oldest = start + n - 1 - self.window
+        self.head += np.searchsorted(self.indices[self.head : self.tail], oldest, side="right")
+
+    def value(self):
+        return -self.sign * int(self.keys[self.head]) if self.tail > self.head else 0
+
+
+class RunningStats:
+    """
+    Per-channel statistics of the newest `window` samples, updated in O(new samples).
+
+    Sum and sum of squares (of the sample minus mid-scale, exact in int64)
+    are updated by adding the new block and subtracting the samples it
+    pushes out of the window; those come from a HistoryBuffer copy of the
+    window. Minimum and maximum come from SlidingExtreme deques, clipping
+    is a running count of samples at the ADC rails.
+
+    With channels=N, extend() takes (N, n) blocks and every statistic is an
+    array with one entry per channel.
+    """
+
+    def __init__(self, window, channels=None, midscale=2048, clip_low=0, clip_high=4095):
+        self.window = window
+        self.channels = channels
+        self.midscale = midscale  # 12-bit offset binary: 2048 is 0 V
+        self.clip_low = clip_low
+        self.clip_high = clip_high
+
+        self.history = HistoryBuffer(window, np.int16, channels)
+        self.rows = 1 if channels is None else channels
+        self.maxima = [SlidingExtreme(window) for _ in range(self.rows)]
+        self.minima = [SlidingExtreme(window, sign=-1) for _ in range(self.rows)]
+        self.total = 0  # Absolute index of the next sample
+        self.clear()
+
+    def __len__(self):
+        return len(self.history)
+
+    def clear(self):
+        self.history.clear()
+        for extreme in self.maxima + self.minima:
+            extreme.clear()
+        self.sum = np.zeros(self.rows, dtype=np.int64)
+        self.sum_squares = np.zeros(self.rows, dtype=np.int64)
+        self.clip_count = np.zeros(self.rows, dtype=np.int64)
+
+    def _totals(self, block):
+        """(sum, sum of squares, clipped samples) per row of a (rows, n) block"""
+        centered = block.astype(np.int64) - self.midscale
+        clipped = (block <= self.clip_low) | (block >= self.clip_high)
+        return centered.sum(axis=1), (centered * centered).sum(axis=1), clipped.sum(axis=1)
+
+    def extend(self, values):
+        """Fold a block of new samples into the window statistics"""
+        values = np.asarray(values)
+        n = values.shape[-1]
+        if n == 0:
+            return
+        values = values[..., -self.window :]  # Older samples of a huge block never count
+        start = self.total + n - values.shape[-1]
+        self.total += n
+
+        # The oldest samples the block pushes out of the window
+        evicted = max(0, len(self.history) + values.shape[-1] - self.window)
+        old = self.history.view()[..., :evicted].reshape(self.rows, -1)
+        new = values.reshape(self.rows, -1)
+
+        add_sum, add_squares, add_clipped = self._totals(new)
+        sub_sum, sub_squares, sub_clipped = self._totals(old)
+        self.sum += add_sum - sub_sum
+        self.sum_squares += add_squares - sub_squares
+        self.clip_count += add_clipped - sub_clipped
+        self.history.extend(values)
+
+        for row, maximum, minimum in zip(new, self.maxima, self.minima):
+            maximum.extend(row, start)
+            minimum.extend(row, start)
+
+    def _result(self, values):
+        values = np.asarray(values)
+        return values if self.channels is not None else values[0]
+
+    def minimum(self):
+        return self._result([extreme.value() for extreme in self.minima])
+
+    def maximum(self):
+        return self._result([extreme.value() for extreme in self.maxima])
+
+    def peak_to_peak(self):
+        return self.maximum() - self.minimum()
+
+    def dc_offset(self):
+        """Mean relative to mid-scale, in ADC counts"""
+        return self._result(self.sum / max(1, len(self)))
+
+    def mean(self):
+        """Mean in ADC counts"""
+        return self.dc_offset() + self.midscale
+
+    def rms(self):
+        """RMS relative to mid-scale (includes the DC offset)"""
+        return self._result(np.sqrt(self.sum_squares / max(1, len(self))))
+
+    def std(self):
+        """Standard deviation - the AC RMS around the mean"""
+        count = max(1, len(self))
+        variance = self.sum_squares / count - (self.sum / count) ** 2
+        return self._result(np.sqrt(np.maximum(variance, 0)))
+
+    def clipped(self):
+        """Samples in the window at or beyond the clip limits"""
+        return self._result(self.clip_count.copy())
@@ -0,0 +1,127 @@
+import functools
+
+import numpy as np
+import scipy.fft
+from scipy import signal
+
+from ring_buffer import HistoryBuffer
+
+
+@functools.lru_cache(maxsize=None)
+def fft_window(name, nfft):
+    """(window, power scale) for one FFT frame, computed once per name and size"""
+    window = signal.get_window(name, nfft).astype(np.float32)
+    # A full-scale sine (amplitude 1 after normalization) reads 0 dB at its bin
+    scale = (2.0 / window.sum()) ** 2
+    return window, scale
+
+
+class StreamingSpectrum:
+    """
+    Short-time spectrum of a live sample stream.
+
+    Incoming blocks are appended to a short pending buffer; every complete
+    frame of `nfft` samples (stepping by nfft - overlap) is cut out of it as
+    a 2-D strided view and all of them go through one batched rfft with the
+    cached window. scipy.fft keeps the plan for the fixed nfft, so per block
+    the work is one multiply and one FFT call, whatever the frame count.
+
+    Every new frame is added to a waterfall (a HistoryBuffer per channel
+    with one row per frequency bin, so view() is the spectrogram image) and
+    to an exponentially averaged spectrum. Levels are dB relative to a
+    full-scale sine: samples are centred on `midscale` and divided by
+    `full_scale` before the transform.
+
+    With channels=N, extend() takes (N, n) blocks; average() and the
+    waterfall views then have one entry per channel.
+    """
+
+    def __init__(self, sample_rate, nfft=1024, overlap=512, channels=None, window="hann",
+                 averaging=0.25, history=256, midscale=2048, full_scale=2048, floor_db=-140.0):
+        self.sample_rate = sample_rate
+        self.nfft = nfft
+        self.hop = nfft - overlap
+        self.channels = channels
+        self.averaging = averaging  # Weight of a new frame in the averaged spectrum
+        self.midscale = midscale
+        self.full_scale = full_scale
+        self.floor_db = floor_db
+
+        self.window, self.scale = fft_window(window, nfft)
+        self.frequencies = scipy.fft.rfftfreq(nfft, 1 / sample_rate)
+        self.bins = len(self.frequencies)
+        self.rows = 1 if channels is None else channels
+
+        self.pending = np.zeros((self.rows, 0), dtype=np.float32)
+        self.power = np.zeros((self.rows, self.bins))
+        self.frames = 0  # Frames transformed so far
+
+        # Waterfall: newest `history` spectra, pre-filled with the floor so the image size never changes
+        self.waterfalls = [HistoryBuffer(history, np.float32, channels=self.bins) for _ in range(self.rows)]
+        for waterfall in self.waterfalls:
+            waterfall.extend(np.full((self.bins, history), floor_db, dtype=np.float32))
+
+    def frame_rate(self):
+        """Spectra per second (waterfall rows per second)"""
+        return self.sample_rate / self.hop
+
+    def extend(self, values):
+        """Transform every frame completed by a block of new samples; returns the frame count"""
+        values = np.asarray(values).reshape(self.rows, -1)
+        if values.shape[1] == 0:
+            return 0
+        new = (values.astype(np.float32) - self.midscale) / self.full_scale
+        data = np.concatenate((self.pending, new), axis=1)
+
+        count = (data.shape[1] - self.nfft) // self.hop + 1 if data.shape[1] >= self.nfft else 0
+        if count > 0:
+            # (rows, count, nfft) view of the overlapping frames - no copy until the window multiply
+            frames = np.lib.stride_tricks.sliding_window_view(data, self.nfft, axis=1)[:, :: self.hop][:, :count]
+            spectra = scipy.fft.rfft(frames * self.window, axis=-1)
+            power = (spectra.real ** 2 + spectra.imag ** 2) * self.scale
+            self.add_frames(power)
+        self.pending = data[:, count * self.hop :].copy()
+        return count
+
+    def add_frames(self, power):
+        """Fold (rows, count, bins) frame powers into the average and the waterfall"""
+        count = power.shape[1]
+        # Exponential average over all new frames at once: newest frame has weight `averaging`
+        if self.frames == 0:
+            self.power[:] = power[:, 0]
+        decay = 1 - self.averaging
+        weights = self.averaging * decay ** np.arange(count - 1, -1, -1)
+        self.power = self.power * decay ** count + np.einsum("k,rkb->rb", weights, power)
+        self.frames += count
+
+        history = self.waterfalls[0].capacity
+        levels = self.to_db(power[:, -history:])
+        for waterfall, rows in zip(self.waterfalls, levels):
+            waterfall.extend(rows.T)
+
+    def to_db(self, power):
+        return np.maximum(10 * np.log10(np.maximum(power, 1e-30)), self.floor_db).astype(np.float32)
+
+    def average(self):
+        """Averaged spectrum in dB, (bins,) or (channels, bins)"""
+        levels = self.to_db(self.power)
+        return levels if self.channels is not None else levels[0]
+
+    def waterfall(self, channel=0):
+        """(bins, history) spectrogram in dB, oldest column first (valid until the next extend)"""
+        return self.waterfalls[channel].view()
+
+    def peak(self):
+        """(frequency, dB) of the strongest averaged bin above DC, per channel"""
+        index = np.argmax(self.power[:, 1:], axis=1) + 1
+        levels = self.to_db(self.power[np.arange(self.rows), index])
+        frequencies = self.frequencies[index]
+        if self.channels is None:
+            return frequencies[0], levels[0]
+        return frequencies, levels
+
+    def level_at(self, frequency):
+        """Averaged level in dB at the bin nearest to `frequency`, per channel"""
+        index = int(round(frequency * self.nfft / self.sample_rate))
+        levels = self.to_db(self.power[:, index])
+        return levels if self.channels is not None else levels[0]
@@ -0,0 +1,139 @@
+import matplotlib.pyplot as plt
+
+from acquisition import DROP_OLDEST, Acquisition
+from live_plot import LiveRenderer
+from plotter import open_decoder, setup_serial
+from spectrum import StreamingSpectrum
+
+# --- Configuration ---
+# IMPORTANT: Set these values to match your hardware setup.
+SERIAL_PORT = "/dev/ttyUSB0"  # Or "synthetic:" / "replay:capture.bin" (see byte_source.py)
+RECORD_FILE = None  # Set to a filename to also save the raw byte stream
+BAUD_RATE = 3000000
+FRAME_FORMAT = "fpga"  # Frame format name (see protocol.py), None to detect from the stream
+SAMPLE_RATE = 25000  # Hz, 50 MHz / SAMPLE_RATE_DIV in FP_VHDL.vhd
+
+# Spectrum settings
+FFT_SIZE = 1024  # Samples per FFT frame (SAMPLE_RATE / FFT_SIZE Hz per bin)
+FFT_OVERLAP = 512  # Samples shared by consecutive frames
+FFT_WINDOW = "hann"  # Any scipy.signal.get_window name
+AVERAGING = 0.25  # Weight of the newest frame in the averaged spectrum (1 = no averaging)
+WATERFALL_SECONDS = 10  # Spectrogram history
+DB_RANGE = (-100, 5)  # dB relative to a full-scale sine
+CUTOFF_HZ = 1100  # FIR cutoff, marked on the spectrum (see fir_designer16.SPEC)
+
+PLOT_UPDATE_INTERVAL_MS = 50
+SPECTROGRAM_UPDATE_INTERVAL_MS = 250  # Spectrogram and readout refresh (images are slow to draw)
+PLOT_QUEUE_BLOCKS = 256  # Blocks buffered between acquisition and GUI (~2.5 s)
+
+
+def main():
+    ser = setup_serial(SERIAL_PORT, BAUD_RATE, RECORD_FILE)
+    if not ser:
+        return
+
+    decoder = open_decoder(ser, FRAME_FORMAT)
+    spec = decoder.spec
+    print(f"Frame format: {spec.describe()} ({spec.channels} channels)")
+
+    history = int(WATERFALL_SECONDS * SAMPLE_RATE / (FFT_SIZE - FFT_OVERLAP))
+    spectrum = StreamingSpectrum(SAMPLE_RATE, FFT_SIZE, FFT_OVERLAP, channels=spec.channels,
+                                 window=FFT_WINDOW, averaging=AVERAGING, history=history)
+    acquisition = Acquisition()
+    board = acquisition.add_board(ser, decoder, name="reader")
+    plot_queue = board.subscribe(PLOT_QUEUE_BLOCKS, policy=DROP_OLDEST)
+
+    # The filtered channel is compared with the first raw ADC channel (the FIR input)
+    names = spec.field_names
+    reference = next((ch for ch, name in enumerate(names) if name != "filtered"), None)
+    filtered = names.index("filtered") if "filtered" in names else None
+
+    # --- One row per channel: averaged spectrum left, spectrogram right ---
+    fig, axes = plt.subplots(spec.channels, 2, figsize=(15, 4 * min(spec.channels, 2)),
+                             squeeze=False, gridspec_kw={"width_ratios": (1, 1.4)}, layout="constrained")
+    nyquist = SAMPLE_RATE / 2
+    lines = []
+    images = []
+    texts = []
+    for ch, name in enumerate(names):
+        label = "FIR Output (Filtered)" if name == "filtered" else f"ADC {name.upper()}"
+        ax, wax = axes[ch]
+
+        (line,) = ax.plot(spectrum.frequencies, spectrum.average()[ch], linewidth=0.8)
+        ax.axvline(CUTOFF_HZ, color="r", linestyle="--", linewidth=0.8, label=f"Cutoff {CUTOFF_HZ} Hz")
+        ax.set_title(f"Spectrum - {label}", fontsize=12 if spec.channels <= 2 else 9)
+        ax.set_ylabel("dBFS")
+        ax.set_ylim(*DB_RANGE)
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc="upper right")
+        lines.append(line)
+        texts.append(ax.text(0.02, 0.98, "", transform=ax.transAxes, verticalalignment="top",
+                             bbox=dict(boxstyle="round", facecolor="wheat", alpha=0.8), fontsize=9))
+
+        image = wax.imshow(spectrum.waterfall(ch), aspect="auto", origin="lower", interpolation="nearest",
+                           extent=(-WATERFALL_SECONDS, 0, 0, nyquist), vmin=DB_RANGE[0], vmax=DB_RANGE[1])
+        wax.axhline(CUTOFF_HZ, color="w", linestyle="--", linewidth=0.8)
+        wax.set_title(f"Spectrogram - {label}", fontsize=12 if spec.channels <= 2 else 9)
+        wax.set_ylabel("Frequency (Hz)")
+        images.append(image)
+    axes[-1, 0].set_xlabel("Frequency (Hz)")
+    axes[-1, 1].set_xlabel("Time (s)")
+    fig.colorbar(images[0], ax=axes[:, 1], label="dBFS")
+
+    # Blitted: the spectra change every frame, spectrograms and readouts are a cached
+    # overlay refreshed every SPECTROGRAM_UPDATE_INTERVAL_MS
+    renderer = LiveRenderer(fig, axes[:, 0], lines, nyquist,
+                            interval_ms=PLOT_UPDATE_INTERVAL_MS, overlays=(*images, *texts))
+    overlay_every = max(1, SPECTROGRAM_UPDATE_INTERVAL_MS // PLOT_UPDATE_INTERVAL_MS)
+    frame_count = 0
+
+    def update_plots():
+        nonlocal frame_count
+
+        if spectrum.extend(plot_queue.drain()) == 0:
+            return
+        for line, levels in zip(lines, spectrum.average()):
+            line.set_ydata(levels)
+
+        frame_count += 1
+        if frame_count % overlay_every:
+            return
+
+        for ch, image in enumerate(images):
+            image.set_data(spectrum.waterfall(ch))
+
+        # Peak per channel, and how far the FIR pulled the reference channel's peak down
+        frequencies, peaks = spectrum.peak()
+        for ch, text in enumerate(texts):
+            readout = f"Peak: {frequencies[ch]:.0f} Hz, {peaks[ch]:.1f} dBFS"
+            if ch == filtered and reference is not None:
+                tone = frequencies[reference]
+                gain = spectrum.level_at(tone)
+                readout += f"\nAt {tone:.0f} Hz: {gain[filtered] - gain[reference]:+.1f} dB vs input"
+            text.set_text(readout)
+        renderer.refresh_overlays()
+
+    # --- Start Acquisition Thread ---
+    acquisition.start()
+
+    print(f"FFT: {FFT_SIZE} samples ({SAMPLE_RATE / FFT_SIZE:.1f} Hz bins), {FFT_WINDOW} window, "
+          f"{spectrum.frame_rate():.0f} spectra/s, {WATERFALL_SECONDS} s spectrogram")
+    print("Starting spectrum view... Close the plot window to stop.")
+    renderer.start(update_plots)
+
+    try:
+        plt.show()  # This will block until the window is closed
+    except Exception as e:
+        print(f"An error occurred during plotting: {e}")
+    finally:
+        renderer.stop()
+        print(f"Plot: {renderer.summary()}")
+        print("Stopping acquisition...")
+        acquisition.close()
+        for line in acquisition.summary():
+            print(line)
+        print("Serial port closed.")
+
+
+if __name__ == "__main__":
+    main()
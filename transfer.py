@@ -0,0 +1,105 @@
+import numpy as np
+import scipy.fft
+
+from capture import input_channel as input_column, open_capture
+from fir_model import FRAME_LATENCY
+from spectrum import fft_window
+
+
+class TransferEstimate:
+    """
+    Welch estimate of the transfer function from an input to an output stream.
+
+    Both streams are cut into overlapping windowed frames (2-D strided view,
+    batched rfft, as in spectrum.StreamingSpectrum), each frame with its mean
+    removed. The auto- and cross-spectra are summed over all frames and
+    H1 = Sxy / Sxx. Only the sums and a partial frame are kept, so captures
+    of any length can be fed through extend() block by block.
+    """
+
+    def __init__(self, sample_rate, nfft=4096, overlap=2048, window="hann"):
+        self.sample_rate = sample_rate
+        self.nfft = nfft
+        self.hop = nfft - overlap
+        self.window, _ = fft_window(window, nfft)
+        self.frequencies = scipy.fft.rfftfreq(nfft, 1 / sample_rate)
+
+        self.pending = np.zeros((2, 0), dtype=np.float32)
+        self.sxx = np.zeros(len(self.frequencies))
+        self.syy = np.zeros(len(self.frequencies))
+        self.sxy = np.zeros(len(self.frequencies), dtype=np.complex128)
+        self.frames = 0
+
+    def extend(self, x, y):
+        """Add a block of input samples and the output samples that belong to them"""
+        block = np.vstack((x, y)).astype(np.float32)
+        data = np.concatenate((self.pending, block), axis=1)
+        count = (data.shape[1] - self.nfft) // self.hop + 1 if data.shape[1] >= self.nfft else 0
+        if count > 0:
+            frames = np.lib.stride_tricks.sliding_window_view(data, self.nfft, axis=1)[:, :: self.hop][:, :count]
+            frames = frames - frames.mean(axis=-1, keepdims=True)  # ADC offset and drift
+            spectra = scipy.fft.rfft(frames * self.window, axis=-1)
+            sx, sy = spectra
+            self.sxx += (sx.real ** 2 + sx.imag ** 2).sum(axis=0)
+            self.syy += (sy.real ** 2 + sy.imag ** 2).sum(axis=0)
+            self.sxy += (np.conj(sx) * sy).sum(axis=0)
+            self.frames += count
+        self.pending = data[:, count * self.hop :].copy()
+
+    def response(self):
+        """Complex H1 transfer function per frequency bin"""
+        return self.sxy / np.maximum(self.sxx, 1e-30)
+
+    def magnitude_db(self):
+        return 20 * np.log10(np.maximum(np.abs(self.response()), 1e-12))
+
+    def coherence(self):
+        """Magnitude-squared coherence: 1 where the output is fully explained by the input"""
+        return np.abs(self.sxy) ** 2 / np.maximum(self.sxx * self.syy, 1e-30)
+
+
+def measure_capture(filename, input_channel=None, output_channel="filtered", latency=FRAME_LATENCY,
+                    chunk_rows=1 << 20, verbose=True, **kwargs):
+    """
+    TransferEstimate of output/input for a capture written by fplotter.save_data.
+
+    The capture is memory-mapped and read chunk_rows at a time, so memory use
+    does not depend on its length. The output is shifted by `latency` frames
+    (fir_model.FRAME_LATENCY) so the phase is that of the filter alone.
+    input_channel=None measures from the first channel that is not
+    "filtered" (capture.input_channel), so every frame format works.
+    """
+    samples, header = open_capture(filename)
+    channels = header["channels"]
+    x = samples[:, input_column(header, input_channel)]
+    y = samples[:, channels.index(output_channel)]
+    estimate = TransferEstimate(header["sample_rate"], **kwargs)
+
+    total = len(samples) - latency
+    last_progress = 0
+    for start in range(0, max(total, 0), chunk_rows):
+        end = min(start + chunk_rows, total)
+        estimate.extend(x[start:end], y[start + latency : end + latency])
+
+        progress = 100 * end // total
+        if verbose and progress >= last_progress + 10:
+            print(f"Progress: {progress}% ({end / header['sample_rate']:.0f} s of capture)")
+            last_progress = progress
+    return estimate, header
+
+
+def design_at(frequencies, design_frequencies, h):
+    """Design response (complex) interpolated onto the measurement bins"""
+    magnitude = np.interp(frequencies, design_frequencies, np.abs(h))
+    phase = np.interp(frequencies, design_frequencies, np.unwrap(np.angle(h)))
+    return magnitude * np.exp(1j * phase)
+
+
+def excess_delay(estimate, designed, mask):
+    """Delay in samples between measurement and design, from the slope of their phase difference"""
+    if np.count_nonzero(mask) < 2:
+        return 0.0
+    difference = np.unwrap(np.angle(estimate.response()[mask] / designed[mask]))
+    omega = 2 * np.pi * estimate.frequencies[mask] / estimate.sample_rate
+    slope = np.polyfit(omega, difference, 1)[0]
+    return -slope